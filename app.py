@@ -1,66 +1,263 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g
+from flask.json.provider import DefaultJSONProvider
+import cProfile
+import io
 import json
-import sqlite3
 import os
+import pstats
+import random
+import secrets
+import tempfile
+import threading
+import time
+import numpy as np
 from simulation_engine import TrafficFlowSimulator, TrafficLightManager, MapManager, GeocodingService, RealStreetImporter
+from simulation.queue_engine import QueueFlowSimulator
+from simulation.ensemble import EnsembleRunner
+from simulation.signal_optimizer import SignalOptimizer
+from simulation.jobs import JobManager
+from simulation.road_graph import RoadGraph
+from simulation.assignment import TrafficAssignment
+from simulation.incremental import IncrementalFlowState
+from simulation.daily import DailyProfileSimulator
+from simulation.scenarios import ScenarioRunner, RANKINGS
+from models.demand import default_profiles, normalize_profile, BIN_MINUTES
+from models.network import NetworkSnapshot, intersection_key, intersection_street_ids
+from models.osm import OSMStreetReader, merge_shared_vertices
+from metrics import REGISTRY, REQUEST_DURATION, STAGE_DURATION, CACHE_REQUESTS
+from response_cache import ResponseCache, negotiate_encoding
+from models.database import Database
+from models.geometry import SimplifiedGeometryCache, coordinates_to_list, unpack_coordinates, zoom_tolerance
+from models.geocoding_cache import GeocodingCache
+from models.repositories import StreetRepository, TrafficLightRepository, IntersectionRepository, RevisionRepository, DemandProfileRepository
+
+class InstrumentedJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask com a duração de cada (de)serialização registrada em /metrics"""
+    
+    def dumps(self, obj, **kwargs):
+        with STAGE_DURATION.time(stage='json_dumps'):
+            return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        with STAGE_DURATION.time(stage='json_loads'):
+            return super().loads(s, **kwargs)
 
 app = Flask(__name__)
+app.json = InstrumentedJSONProvider(app)
+# Perfil cProfile por requisição (?profile=1): só quando habilitado explicitamente
+app.config['PROFILING_ENABLED'] = os.environ.get('TRAFFIC_PROFILING') == '1'
 traffic_simulator = TrafficFlowSimulator()
 traffic_light_manager = TrafficLightManager()
 map_manager = MapManager()
-real_street_importer = RealStreetImporter()
+
+# Acesso ao banco: pool de conexões WAL e repositórios por tabela
+db = Database('traffic.db')
+street_repository = StreetRepository()
+traffic_light_repository = TrafficLightRepository()
+intersection_repository = IntersectionRepository()
+revision_repository = RevisionRepository()
+demand_profile_repository = DemandProfileRepository()
+simplified_geometry_cache = SimplifiedGeometryCache()
+
+# Buscas no Nominatim: LRU em memória + tabela geocoding_cache
+real_street_importer = RealStreetImporter(GeocodingService(cache=GeocodingCache(db)))
+
+# Simulações em segundo plano (pool limitado; resultados retidos para novas leituras)
+job_manager = JobManager(max_workers=2, retention=100)
+
+# Snapshot compilado da rede, reaproveitado enquanto a revisão não muda
+network_cache = {'snapshot': None}
+network_cache_lock = threading.Lock()
+
+# Corpos das rotas de leitura da rede por revisão; o token distingue revisões de outro processo/banco no ETag
+response_cache = ResponseCache()
+etag_token = secrets.token_hex(4)
+
+# Últimos resultados de simulate-flow incremental, por configuração (modo, seed, tick)
+flow_states = {}
+flow_states_lock = threading.Lock()
 
 # Configuração do banco SQLite
-def init_db():
-    conn = sqlite3.connect('traffic.db')
-    cursor = conn.cursor()
-    
-    # Criar tabela streets
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS streets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            coordinates TEXT,
-            length_km REAL DEFAULT 0.1,
-            lanes INTEGER DEFAULT 2,
-            vehicles_per_hour INTEGER DEFAULT 500,
-            average_speed REAL DEFAULT 50,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Tabela para semáforos de intersecção
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS intersection_traffic_lights (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            intersection_id TEXT NOT NULL,
-            street_id INTEGER NOT NULL,
-            cycle_time INTEGER DEFAULT 90,
-            green_time INTEGER DEFAULT 45,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (street_id) REFERENCES streets (id),
-            UNIQUE(intersection_id, street_id)
-        )
-    ''')
-    
-    # Verificar e adicionar colunas faltantes
-    cursor.execute("PRAGMA table_info(streets)")
-    existing_columns = [column[1] for column in cursor.fetchall()]
-    
-    required_columns = ['length_km', 'vehicles_per_hour', 'average_speed']
-    for column in required_columns:
-        if column not in existing_columns:
-            if column == 'length_km':
-                cursor.execute(f'ALTER TABLE streets ADD COLUMN {column} REAL DEFAULT 0.1')
-            elif column == 'vehicles_per_hour':
-                cursor.execute(f'ALTER TABLE streets ADD COLUMN {column} INTEGER DEFAULT 500')
-            elif column == 'average_speed':
-                cursor.execute(f'ALTER TABLE streets ADD COLUMN {column} REAL DEFAULT 50')
-    
-    conn.commit()
-    conn.close()
+def init_db(database=None):
+    """Cria ou atualiza o esquema de `database` (padrão: o banco do app)"""
+    if database is None:
+        database = db
+    intersections_table_created = database.init_schema()
+    
+    # Banco antigo: calcular uma única vez as intersecções das ruas já existentes
+    if intersections_table_created:
+        with database.transaction() as cursor:
+            streets = street_repository.geometries(cursor)
+            intersection_repository.save(cursor, map_manager.find_intersections(streets))
+            revision_repository.bump(cursor)
+    
     print("✅ Banco de dados inicializado/verificado!")
 
+def update_street_intersections(cursor, street):
+    """Calcula e grava apenas os cruzamentos de uma rua recém-inserida"""
+    other_streets = street_repository.geometries_near(cursor, [street['coordinates']], before_id=street['id'])
+    
+    intersections = map_manager.find_street_intersections(street, other_streets)
+    intersection_repository.save(cursor, intersections)
+    return intersections
+
+def insert_streets(cursor, streets, shared_vertices=False):
+    """
+    Insere ruas (dicionários com name, coordinates e atributos opcionais) e grava
+    os cruzamentos novos. Retorna (ids, intersecções encontradas). Com shared_vertices
+    (vias do OSM), os cruzamentos repetidos num nó comum viram um só.
+    """
+    # Comprimentos de todas as ruas numa única passada
+    lengths = map_manager.calculate_street_lengths([street['coordinates'] for street in streets])
+    
+    street_ids = street_repository.insert_many(cursor, [
+        (street['name'], street['coordinates'], length_km, street.get('lanes', 2),
+         street.get('vehicles_per_hour', 500), street.get('average_speed', 50))
+        for street, length_km in zip(streets, lengths)
+    ])
+    
+    new_streets = [{'id': street_id, 'name': street['name'], 'coordinates': street['coordinates']}
+                   for street_id, street in zip(street_ids, streets)]
+    # Só as ruas existentes cuja caixa envolvente toca a de alguma rua nova (índice street_bbox)
+    existing_streets = street_repository.geometries_near(cursor, [street['coordinates'] for street in streets],
+                                                         before_id=street_ids[0])
+    
+    intersections = map_manager.find_new_intersections(new_streets, existing_streets)
+    if shared_vertices:
+        intersections = merge_shared_vertices(intersections)
+    intersection_repository.save(cursor, intersections)
+    
+    # Perfis de demanda opcionais (já validados pela rota)
+    demand_profile_repository.save_many(cursor, {
+        street_id: normalize_profile(street['demand_profile'])
+        for street_id, street in zip(street_ids, streets) if street.get('demand_profile') is not None
+    })
+    return street_ids, intersections
+
+def load_network_subset(street_pairs=None, bbox=None):
+    """
+    NetworkSnapshot só com as intersecções pedidas (pares de ruas ou caixa
+    [min_lat, min_lon, max_lat, max_lon]) e as ruas e semáforos envolvidos
+    """
+    with db.read() as cursor:
+        if street_pairs:
+            intersections = intersection_repository.for_street_pairs(cursor, street_pairs)
+        else:
+            intersections = intersection_repository.in_bbox(cursor, bbox)
+        return network_for_intersections(cursor, intersections)
+
+def network_for_intersections(cursor, intersections, revision=None):
+    """NetworkSnapshot com as intersecções dadas e as ruas e semáforos envolvidos"""
+    street_ids = sorted({street_id for intersection in intersections for street_id in intersection['streets']})
+    streets = street_repository.records_by_ids(cursor, street_ids)
+    traffic_lights = traffic_light_repository.records_for_streets(cursor, street_ids)
+    return NetworkSnapshot(streets, traffic_lights, intersections, revision=revision)
+
+def load_network():
+    """NetworkSnapshot da revisão atual da rede, compilado uma única vez por revisão"""
+    with network_cache_lock, db.read() as cursor:
+        # Leitura consistente: revisão e dados da mesma transação
+        revision = revision_repository.current(cursor)
+        
+        snapshot = network_cache['snapshot']
+        if snapshot is not None and snapshot.revision == revision:
+            CACHE_REQUESTS.inc(cache='network_snapshot', result='hit')
+            return snapshot
+        CACHE_REQUESTS.inc(cache='network_snapshot', result='miss')
+        
+        snapshot = NetworkSnapshot(street_repository.all_records(cursor),
+                                   traffic_light_repository.all_records(cursor),
+                                   intersection_repository.all(cursor),
+                                   revision=revision)
+        network_cache['snapshot'] = snapshot
+        return snapshot
+
+def select_network(data):
+    """
+    Rede a simular conforme o corpo da requisição: intersection_id, lista intersection_ids,
+    bbox ou a rede inteira. Retorna (network, None) ou (None, mensagem de erro).
+    """
+    intersection_ids = data.get('intersection_ids') or ([data['intersection_id']] if data.get('intersection_id') else None)
+    bbox = data.get('bbox')
+    
+    if intersection_ids:
+        if not isinstance(intersection_ids, list):
+            return None, 'intersection_ids deve ser uma lista'
+        try:
+            street_pairs = [intersection_street_ids(intersection_id) for intersection_id in intersection_ids]
+        except ValueError as e:
+            return None, str(e)
+        if any(len(pair) != 2 for pair in street_pairs):
+            return None, 'Cada intersecção deve envolver duas ruas'
+        return load_network_subset(street_pairs=street_pairs), None
+    if bbox is not None:
+        if not (isinstance(bbox, list) and len(bbox) == 4 and all(isinstance(v, (int, float)) for v in bbox)):
+            return None, 'bbox deve ser [min_lat, min_lon, max_lat, max_lon]'
+        return load_network_subset(bbox=bbox), None
+    return load_network(), None
+
+def network_read_response(build):
+    """
+    Resposta de uma rota de leitura da rede com ETag da revisão: 304 se o cliente já tem
+    esta revisão; senão o corpo de build(cursor), serializado e comprimido uma vez por
+    revisão e reaproveitado até a próxima escrita
+    """
+    key = request.full_path
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    
+    with db.read() as cursor:
+        # Revisão e dados da mesma transação: o ETag corresponde exatamente ao corpo
+        revision = revision_repository.current(cursor)
+        etag = f'{etag_token}-{revision}'
+        not_modified = request.if_none_match.contains_weak(etag)
+        if not not_modified:
+            cached = response_cache.get(key, revision, encoding)
+            if cached is None:
+                cached = response_cache.put(key, revision, jsonify(build(cursor)).get_data(), encoding)
+    
+    if not_modified:
+        response = app.response_class(status=304)
+    else:
+        body, used = cached
+        response = app.response_class(body, mimetype='application/json')
+        if used:
+            response.headers['Content-Encoding'] = used
+    
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'  # sempre revalidar: a resposta muda a cada escrita
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if app.config['PROFILING_ENABLED'] and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.pop('request_start', time.perf_counter())
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_DURATION.observe(elapsed, method=request.method, route=route, status=response.status_code)
+    
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    
+    # Modo de perfil: a resposta vira o resumo do cProfile (funções mais caras por tempo acumulado)
+    profiler.disable()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(40)
+    summary = f"{request.method} {request.path} → {response.status_code} em {elapsed * 1000:.1f} ms\n\n" + output.getvalue()
+    return app.response_class(summary, mimetype='text/plain',
+                              headers={'X-Profiled-Status': str(response.status_code)})
+
+@app.route('/metrics')
+def metrics():
+    """Métricas do processo no formato texto do Prometheus"""
+    return app.response_class(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -73,62 +270,194 @@ def handle_streets():
         # Calcular comprimento da rua
         length_km = map_manager.calculate_street_length(data['coordinates'])
         
-        conn = sqlite3.connect('traffic.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO streets (name, coordinates, length_km, lanes, vehicles_per_hour, average_speed)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (data['name'], json.dumps(data['coordinates']), length_km,
-              data.get('lanes', 2), data.get('vehicles_per_hour', 500),
-              data.get('average_speed', 50)))
-        
-        conn.commit()
-        street_id = cursor.lastrowid
-        conn.close()
+        with db.transaction() as cursor:
+            street_id = street_repository.insert(cursor, data['name'], data['coordinates'], length_km,
+                                                 data.get('lanes', 2), data.get('vehicles_per_hour', 500),
+                                                 data.get('average_speed', 50))
+            
+            intersections = update_street_intersections(cursor, {
+                'id': street_id,
+                'name': data['name'],
+                'coordinates': data['coordinates']
+            })
+            
+            revision_repository.bump(cursor, [street_id])
         
         return jsonify({
             'id': street_id, 
             'message': 'Rua criada com sucesso!',
-            'length_km': round(length_km, 3)
+            'length_km': round(length_km, 3),
+            'intersections_found': len(intersections)
         })
     
     elif request.method == 'DELETE':
-        street_id = request.args.get('id')
-        conn = sqlite3.connect('traffic.db')
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM streets WHERE id = ?', (street_id,))
-        cursor.execute('DELETE FROM intersection_traffic_lights WHERE street_id = ?', (street_id,))
-        conn.commit()
-        conn.close()
+        street_id = request.args.get('id', type=int)
+        if street_id is None:
+            return jsonify({'error': 'id deve ser o id inteiro da rua'}), 400
+        
+        with db.transaction() as cursor:
+            street_repository.delete(cursor, street_id)
+            revision_repository.bump(cursor, [street_id])
         return jsonify({'message': 'Rua removida com sucesso!'})
     
     else:  # GET
-        conn = sqlite3.connect('traffic.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT s.*, 
-                   (SELECT COUNT(*) FROM intersection_traffic_lights WHERE street_id = s.id) as has_traffic_light
-            FROM streets s
-            ORDER BY s.created_at DESC
-        ''')
-        streets = cursor.fetchall()
-        conn.close()
+        # Com bbox, zoom, cursor ou limit: página das ruas visíveis, com geometria simplificada
+        if any(key in request.args for key in ('bbox', 'zoom', 'cursor', 'limit')):
+            arguments, error = parse_street_page_request(request.args)
+            if error:
+                return jsonify({'error': error}), 400
+            return network_read_response(lambda cursor: street_page(cursor, **arguments))
         
-        street_list = []
-        for s in streets:
-            street_list.append({
-                'id': s[0],
-                'name': s[1],
-                'coordinates': json.loads(s[2]),
-                'length_km': s[3],
-                'lanes': s[4],
-                'vehicles_per_hour': s[5],
-                'average_speed': s[6],
-                'has_traffic_light': s[8] > 0
-            })
+        return network_read_response(street_repository.list_with_light_flag)
+
+def parse_street_page_request(args):
+    """Valida a query de GET /api/streets paginado. Retorna (argumentos de street_page, None) ou (None, erro)"""
+    bbox = None
+    if args.get('bbox'):
+        try:
+            bbox = [float(value) for value in args['bbox'].split(',')]
+        except ValueError:
+            bbox = None
+        if bbox is None or len(bbox) != 4:
+            return None, 'bbox deve ser min_lat,min_lon,max_lat,max_lon'
+    
+    # type=int devolve None quando o valor não é inteiro
+    zoom = args.get('zoom', type=int)
+    cursor = args.get('cursor', type=int) if 'cursor' in args else 0
+    limit = args.get('limit', type=int) if 'limit' in args else 500
+    if 'zoom' in args and (zoom is None or not 0 <= zoom <= 22):
+        return None, 'zoom deve ser um inteiro entre 0 e 22'
+    if cursor is None or cursor < 0:
+        return None, 'cursor inválido'
+    if limit is None or not 1 <= limit <= 5000:
+        return None, 'limit deve estar entre 1 e 5000'
+    return {'bbox': bbox, 'zoom': zoom, 'after_id': cursor, 'limit': limit}, None
+
+def street_page(cursor, bbox=None, zoom=None, after_id=0, limit=500):
+    """
+    Página de ruas em ordem de id. Com zoom, a geometria vem simplificada (Douglas–Peucker,
+    tolerância de um pixel) e, com bbox, ruas menores que um pixel ficam de fora.
+    """
+    min_extent = (0.0, 0.0)
+    if zoom is not None and bbox is not None:
+        min_extent = (zoom_tolerance(zoom, (bbox[0] + bbox[2]) / 2), zoom_tolerance(zoom, 0))
+    
+    rows = street_repository.page(cursor, bbox, after_id, limit + 1, min_extent)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    streets = []
+    for row in rows:
+        coordinates = unpack_coordinates(row['geometry'])
+        streets.append({
+            'id': row['id'],
+            'name': row['name'],
+            'coordinates': (simplified_geometry_cache.get(row['id'], zoom, coordinates) if zoom is not None
+                            else coordinates_to_list(coordinates)),
+            'length_km': row['length_km'],
+            'lanes': row['lanes'],
+            'vehicles_per_hour': row['vehicles_per_hour'],
+            'average_speed': row['average_speed'],
+            'has_traffic_light': bool(row['has_traffic_light'])
+        })
+    
+    return {
+        'streets': streets,
+        'next_cursor': rows[-1]['id'] if has_more else None,
+        'zoom': zoom
+    }
+
+def coordinates_error(coordinates):
+    """Mensagem de erro se coordinates não for uma lista de ao menos dois pares [lat, lon] válidos; senão None"""
+    if not isinstance(coordinates, list) or len(coordinates) < 2:
+        return 'coordinates deve ser uma lista de ao menos dois pontos [lat, lon]'
+    for point in coordinates:
+        if (not isinstance(point, (list, tuple)) or len(point) != 2 or
+                not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in point)):
+            return 'cada ponto de coordinates deve ser um par numérico [lat, lon]'
+        if not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180):
+            return 'latitude deve estar entre -90 e 90 e longitude entre -180 e 180'
+    return None
+
+@app.route('/api/streets/bulk', methods=['POST'])
+def bulk_create_streets():
+    """Cria várias ruas numa única transação (corpo JSON ou NDJSON)"""
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        try:
+            data = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            return jsonify({'error': 'NDJSON inválido'}), 400
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('streets')
+    
+    if not isinstance(data, list) or not data:
+        return jsonify({'error': 'Envie uma lista de ruas'}), 400
+    
+    for index, street in enumerate(data):
+        if not isinstance(street, dict) or not isinstance(street.get('name'), str) or not street['name'].strip():
+            return jsonify({'error': f'Rua {index}: name é obrigatório'}), 400
+        error = coordinates_error(street.get('coordinates'))
+        if error:
+            return jsonify({'error': f'Rua {index}: {error}'}), 400
+        if street.get('demand_profile') is not None:
+            try:
+                normalize_profile(street['demand_profile'])
+            except ValueError as e:
+                return jsonify({'error': f'Rua {index}: {e}'}), 400
+    
+    with db.transaction() as cursor:
+        street_ids, intersections = insert_streets(cursor, data)
+        revision_repository.bump(cursor, street_ids)
+    
+    return jsonify({
+        'ids': street_ids,
+        'count': len(street_ids),
+        'message': f'{len(street_ids)} ruas criadas com sucesso!',
+        'intersections_found': len(intersections)
+    })
+
+@app.route('/api/streets/<int:street_id>/demand-profile', methods=['GET', 'PUT', 'DELETE'])
+def handle_demand_profile(street_id):
+    """Perfil de demanda da rua por horário: 96 volumes (veículos/hora) a cada 15 minutos"""
+    if request.method == 'PUT':
+        data = request.json or {}
+        try:
+            profile = normalize_profile(data.get('vehicles_per_hour'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify(street_list)
+        with db.transaction() as cursor:
+            if not street_repository.records_by_ids(cursor, [street_id]):
+                return jsonify({'error': 'Rua não encontrada'}), 404
+            demand_profile_repository.save_many(cursor, {street_id: profile})
+            revision_repository.bump(cursor, [street_id])
+        return jsonify({'message': 'Perfil de demanda salvo com sucesso!'})
+    
+    elif request.method == 'DELETE':
+        with db.transaction() as cursor:
+            if demand_profile_repository.delete(cursor, street_id):
+                revision_repository.bump(cursor, [street_id])
+        return jsonify({'message': 'Perfil de demanda removido com sucesso!'})
+    
+    else:  # GET
+        with db.read() as cursor:
+            streets = street_repository.records_by_ids(cursor, [street_id])
+            profile = demand_profile_repository.get(cursor, street_id)
+        if not streets:
+            return jsonify({'error': 'Rua não encontrada'}), 404
+        
+        # Sem perfil gravado: o perfil urbano padrão usado por simulate-day
+        custom = profile is not None
+        if not custom:
+            profile = default_profiles([streets[0].vehicles_per_hour])[:, 0]
+        return jsonify({
+            'street_id': street_id,
+            'custom': custom,
+            'interval_minutes': BIN_MINUTES,
+            'vehicles_per_hour': [float(value) for value in profile]
+        })
 
 @app.route('/api/intersection-traffic-lights', methods=['GET', 'POST', 'DELETE'])
 def handle_intersection_traffic_lights():
@@ -145,29 +474,14 @@ def handle_intersection_traffic_lights():
         if green_time >= cycle_time:
             return jsonify({'error': 'Tempo verde deve ser menor que tempo do ciclo'}), 400
         
-        conn = sqlite3.connect('traffic.db')
-        cursor = conn.cursor()
-        
-        # Verificar se já existe
-        cursor.execute('''
-            SELECT * FROM intersection_traffic_lights 
-            WHERE intersection_id = ? AND street_id = ?
-        ''', (intersection_id, street_id))
-        existing = cursor.fetchone()
-        
-        if existing:
-            return jsonify({'error': 'Semáforo já existe nesta intersecção'}), 400
-        
-        # Inserir novo semáforo
-        cursor.execute('''
-            INSERT INTO intersection_traffic_lights 
-            (intersection_id, street_id, cycle_time, green_time)
-            VALUES (?, ?, ?, ?)
-        ''', (intersection_id, street_id, cycle_time, green_time))
-        
-        conn.commit()
-        light_id = cursor.lastrowid
-        conn.close()
+        with db.transaction() as cursor:
+            # Verificar se já existe
+            if traffic_light_repository.exists(cursor, intersection_id, street_id):
+                return jsonify({'error': 'Semáforo já existe nesta intersecção'}), 400
+            
+            # Inserir novo semáforo
+            light_id = traffic_light_repository.insert(cursor, intersection_id, street_id, cycle_time, green_time)
+            revision_repository.bump(cursor, [street_id])
         
         # Atualizar no gerenciador
         traffic_light_manager.add_traffic_light(intersection_id, street_id, green_time, cycle_time)
@@ -185,16 +499,9 @@ def handle_intersection_traffic_lights():
         if not intersection_id or not street_id:
             return jsonify({'error': 'intersection_id e street_id são obrigatórios'}), 400
         
-        conn = sqlite3.connect('traffic.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            DELETE FROM intersection_traffic_lights 
-            WHERE intersection_id = ? AND street_id = ?
-        ''', (intersection_id, street_id))
-        
-        conn.commit()
-        conn.close()
+        with db.transaction() as cursor:
+            traffic_light_repository.delete(cursor, intersection_id, street_id)
+            revision_repository.bump(cursor, [street_id])
         
         # Remover do gerenciador
         traffic_light_manager.remove_traffic_light(intersection_id, street_id)
@@ -203,131 +510,627 @@ def handle_intersection_traffic_lights():
     
     else:  # GET
         intersection_id = request.args.get('intersection_id')
+        return network_read_response(lambda cursor: traffic_light_repository.list_with_street_names(cursor, intersection_id))
+
+@app.route('/api/intersections')
+def get_intersections():
+    return network_read_response(intersection_repository.all)
+
+def parse_number(data, key, default, minimum, maximum, integer=False):
+    """
+    Campo numérico opcional do corpo dentro de [minimum, maximum] (inteiro com `integer`).
+    Retorna (valor ou o padrão, None) ou (None, erro)
+    """
+    value = data.get(key)
+    if value is None:
+        return default, None
+    if isinstance(value, bool) or not isinstance(value, int if integer else (int, float)) or not minimum <= value <= maximum:
+        return None, f"{key} deve ser {'um inteiro' if integer else 'um número'} entre {minimum} e {maximum}"
+    return value if integer else float(value), None
+
+def parse_tick(data):
+    """tick_seconds do modo fila: passos menores que 0,1 s multiplicam o laço sem ganho de precisão"""
+    return parse_number(data, 'tick_seconds', 1.0, 0.1, 60)
+
+def parse_workers(data):
+    """workers (processos) opcional: de 1 até o número de CPUs; None deixa o executor decidir"""
+    return parse_number(data, 'workers', None, 1, os.cpu_count() or 1, integer=True)
+
+def parse_flow_request(data):
+    """Valida o corpo de simulate-flow. Retorna (argumentos de run_flow_simulation, None) ou (None, erro)"""
+    mode = data.get('mode', 'classic')
+    if mode not in ('classic', 'queue'):
+        return None, "mode deve ser 'classic' ou 'queue'"
+    
+    # Com seed a simulação é reprodutível
+    seed = data.get('seed')
+    if seed is not None and (not isinstance(seed, int) or seed < 0):
+        return None, 'seed deve ser um inteiro não negativo'
+    
+    # Propagação pela rede: a vazão de cada intersecção alimenta as seguintes da mesma rua
+    propagate = data.get('propagate', False)
+    turn_share = data.get('turn_share', 0)
+    if not isinstance(propagate, bool):
+        return None, 'propagate deve ser true ou false'
+    if not isinstance(turn_share, (int, float)) or not 0 <= turn_share < 1:
+        return None, 'turn_share deve estar entre 0 e 1'
+    tick, error = parse_tick(data)
+    if error:
+        return None, error
+    
+    network, error = select_network(data)
+    if error:
+        return None, error
+    arguments = {'network': network, 'mode': mode, 'seed': seed, 'tick': tick}
+    if propagate:
+        arguments.update(propagate=True, turn_share=float(turn_share))
+    return arguments, None
+
+def parse_incremental_request(data):
+    """Valida o corpo de simulate-flow incremental. Retorna (argumentos de run_incremental_flow, None) ou (None, erro)"""
+    mode = data.get('mode', 'classic')
+    seed = data.get('seed')
+    since_revision = data.get('since_revision')
+    
+    if mode not in ('classic', 'queue'):
+        return None, "mode deve ser 'classic' ou 'queue'"
+    if seed is not None and (not isinstance(seed, int) or seed < 0):
+        return None, 'seed deve ser um inteiro não negativo'
+    if since_revision is not None and not isinstance(since_revision, int):
+        return None, 'since_revision deve ser um inteiro'
+    if any(data.get(key) for key in ('intersection_id', 'intersection_ids', 'bbox', 'propagate', 'stream')):
+        return None, 'incremental vale só para a rede inteira, sem propagate nem stream'
+    tick, error = parse_tick(data)
+    if error:
+        return None, error
+    
+    return {'mode': mode, 'seed': seed, 'tick': tick,
+            'since_revision': since_revision}, None
+
+def run_incremental_flow(mode='classic', seed=None, tick=1.0, since_revision=None):
+    """
+    Resultados mantidos entre requisições: só as intersecções das ruas alteradas desde a
+    última chamada são simuladas de novo. Se o cliente já tem os resultados de `since_revision`
+    (a revisão anterior do estado), recebe apenas as intersecções alteradas e as removidas.
+    """
+    with flow_states_lock:
+        state = flow_states.get((mode, seed, tick))
+        if state is None:
+            if len(flow_states) >= 8:
+                flow_states.pop(next(iter(flow_states)))  # descarta a configuração mais antiga
+            state = flow_states[(mode, seed, tick)] = IncrementalFlowState(mode, seed, tick)
+        previous = state.revision
         
-        conn = sqlite3.connect('traffic.db')
-        cursor = conn.cursor()
+        updated, removed = [], []
+        with db.read() as cursor:
+            revision = revision_repository.current(cursor)
+            changed = revision_repository.changed_streets(cursor, previous) if previous is not None else None
+            if changed is not None and revision != previous:
+                network = network_for_intersections(cursor, intersection_repository.for_streets(cursor, changed),
+                                                    revision)
+                updated, removed = state.update(network, changed, revision)
         
-        if intersection_id:
-            cursor.execute('''
-                SELECT itl.*, s.name as street_name 
-                FROM intersection_traffic_lights itl
-                JOIN streets s ON itl.street_id = s.id
-                WHERE itl.intersection_id = ?
-            ''', (intersection_id,))
+        if changed is None:
+            # Estado novo ou alterações sem ruas registradas: simula tudo
+            recomputed = state.rebuild(load_network())
+            since_revision = None
         else:
-            cursor.execute('''
-                SELECT itl.*, s.name as street_name 
-                FROM intersection_traffic_lights itl
-                JOIN streets s ON itl.street_id = s.id
-            ''')
-        
-        traffic_lights = cursor.fetchall()
-        conn.close()
+            recomputed = len(updated)
         
-        return jsonify([{
-            'id': tl[0],
-            'intersection_id': tl[1],
-            'street_id': tl[2],
-            'street_name': tl[5],
-            'cycle_time': tl[3],
-            'green_time': tl[4]
-        } for tl in traffic_lights])
+        response = {
+            'revision': state.revision,
+            'recomputed': recomputed,
+            'overall_flow': overall_flow_summary(state.total_cars, state.total_wait)
+        }
+        if since_revision is not None and since_revision in (previous, state.revision):
+            response.update(incremental=True, since_revision=since_revision, intersections=updated,
+                            removed=removed)
+        else:
+            response.update(incremental=False, intersections=state.items())
+        return response
 
-@app.route('/api/intersections')
-def get_intersections():
-    conn = sqlite3.connect('traffic.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM streets')
-    streets_data = cursor.fetchall()
-    conn.close()
+def iter_flow_results(network, mode='classic', seed=None, tick=1.0, progress=None, propagate=False, turn_share=0.0,
+                      demand=None):
+    """
+    Gera (intersecção, resultado) na ordem de network.intersections, assim que cada um fica pronto.
+    `demand` (veículos/hora por aproximação do RoadGraph) substitui vehicles_per_hour.
+    """
+    intersections = network.intersections
     
-    streets = []
-    for s in streets_data:
-        streets.append({
-            'id': s[0],
-            'name': s[1],
-            'coordinates': json.loads(s[2]),
-            'length_km': s[3],
-            'lanes': s[4]
+    graph = RoadGraph.of(network) if propagate or demand is not None else None
+    if propagate:
+        demand = graph.propagate(turn_share)
+    
+    if mode == 'queue':
+        # Filas em passos de tempo, todas as intersecções de uma vez
+        queue_simulator = QueueFlowSimulator(tick=tick, rng=np.random.default_rng(seed) if seed is not None else None,
+                                             progress=progress)
+        yield from zip(intersections, queue_simulator.simulate_network(intersections, network, demand=demand))
+    else:
+        simulator = TrafficFlowSimulator(rng=random.Random(seed)) if seed is not None else traffic_simulator
+        for index, intersection in enumerate(intersections):
+            node_demand = graph.demand_at(index, demand) if demand is not None else None
+            yield intersection, simulator.simulate_intersection_flow(intersection, network, demand=node_demand)
+            if progress is not None:
+                progress((index + 1) / len(intersections))
+
+def overall_flow_summary(total_cars, total_wait):
+    """Estatísticas gerais da simulação"""
+    if total_cars > 0:
+        return {
+            'total_cars_passing': total_cars,
+            'total_waiting_time': total_wait,
+            'average_wait_per_car': total_wait / total_cars
+        }
+    return {'total_cars_passing': 0, 'total_waiting_time': 0, 'average_wait_per_car': 0}
+
+def run_flow_simulation(network, mode='classic', seed=None, tick=1.0, progress=None, propagate=False, turn_share=0.0,
+                        demand=None):
+    """Simula as intersecções da rede; `progress` recebe a fração concluída (jobs em segundo plano)"""
+    results = {'intersections': []}
+    
+    total_cars = 0
+    total_wait = 0
+    
+    for intersection, intersection_result in iter_flow_results(network, mode, seed, tick, progress,
+                                                               propagate, turn_share, demand):
+        results['intersections'].append({
+            'intersection_data': intersection,
+            'flow_results': intersection_result
         })
+        
+        total_cars += intersection_result['total_cars_passing']
+        total_wait += intersection_result['total_waiting_time']
+    
+    results['overall_flow'] = overall_flow_summary(total_cars, total_wait)
+    return results
+
+def stream_flow_simulation(arguments, stream_format):
+    """
+    Registros da simulação um a um, em NDJSON ou Server-Sent Events: 'start' (com o total
+    de intersecções), um 'intersection' por intersecção e, por último, 'overall_flow'
+    """
+    def encode(record):
+        payload = app.json.dumps(record)
+        if stream_format == 'sse':
+            return f"event: {record['type']}\ndata: {payload}\n\n"
+        return payload + '\n'
+    
+    yield encode({'type': 'start', 'count': len(arguments['network'].intersections)})
     
-    intersections = map_manager.find_intersections(streets)
-    return jsonify(intersections)
+    total_cars = 0
+    total_wait = 0
+    try:
+        for intersection, intersection_result in iter_flow_results(**arguments):
+            total_cars += intersection_result['total_cars_passing']
+            total_wait += intersection_result['total_waiting_time']
+            yield encode({'type': 'intersection', 'intersection_data': intersection, 'flow_results': intersection_result})
+    except Exception as e:
+        # O status HTTP já foi enviado: o erro vira o último registro do fluxo
+        yield encode({'type': 'error', 'error': str(e)})
+        return
+    
+    yield encode({'type': 'overall_flow', 'overall_flow': overall_flow_summary(total_cars, total_wait)})
+
+def parse_ensemble_request(data):
+    """Valida o corpo de simulate-ensemble. Retorna (argumentos de run_ensemble, None) ou (None, erro)"""
+    mode = data.get('mode', 'classic')
+    seed = data.get('seed', 0)
+    replications = data.get('replications', 30)
+    
+    if mode not in ('classic', 'queue'):
+        return None, "mode deve ser 'classic' ou 'queue'"
+    if not isinstance(seed, int) or seed < 0:
+        return None, 'seed deve ser um inteiro não negativo'
+    if not isinstance(replications, int) or not 2 <= replications <= 1000:
+        return None, 'replications deve estar entre 2 e 1000'
+    tick, error = parse_tick(data)
+    if error:
+        return None, error
+    workers, error = parse_workers(data)
+    if error:
+        return None, error
+    
+    return {'network': load_network(), 'seed': seed, 'replications': replications, 'mode': mode,
+            'tick': tick, 'workers': workers}, None
+
+def run_ensemble(network, seed, replications, mode='classic', tick=1.0, workers=None, progress=None):
+    runner = EnsembleRunner(max_workers=workers)
+    return runner.run(network, seed, replications, mode=mode, tick=tick, progress=progress)
 
 @app.route('/api/simulate-flow', methods=['POST'])
 def simulate_traffic_flow():
     """Nova rota para simulação de fluxo"""
-    data = request.json
+    data = request.json or {}
     
-    conn = sqlite3.connect('traffic.db')
-    cursor = conn.cursor()
+    # Modo incremental: reaproveita os resultados da última chamada com a mesma configuração
+    if data.get('incremental'):
+        arguments, error = parse_incremental_request(data)
+        if error:
+            return jsonify({'error': error}), 400
+        return jsonify(run_incremental_flow(**arguments))
     
-    # Buscar ruas
-    cursor.execute('SELECT * FROM streets')
-    streets_data = cursor.fetchall()
+    arguments, error = parse_flow_request(data)
+    if error:
+        return jsonify({'error': error}), 400
     
-    # Buscar semáforos
-    cursor.execute('SELECT * FROM intersection_traffic_lights')
-    traffic_lights_data = cursor.fetchall()
-    conn.close()
+    # Streaming opcional: {"stream": "ndjson" | "sse"} ou cabeçalho Accept correspondente
+    stream_format = data.get('stream')
+    if stream_format is None:
+        accepted = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson', 'text/event-stream'])
+        stream_format = {'application/x-ndjson': 'ndjson', 'text/event-stream': 'sse'}.get(accepted)
+    elif stream_format is True:
+        stream_format = 'ndjson'
     
-    # Preparar dados
-    streets = []
-    for s in streets_data:
-        streets.append({
-            'id': s[0],
-            'name': s[1],
-            'coordinates': json.loads(s[2]),
-            'length_km': s[3],
-            'lanes': s[4],
-            'vehicles_per_hour': s[5],
-            'average_speed': s[6]
-        })
+    if stream_format:
+        if stream_format not in ('ndjson', 'sse'):
+            return jsonify({'error': "stream deve ser 'ndjson' ou 'sse'"}), 400
+        mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+        return app.response_class(stream_flow_simulation(arguments, stream_format), mimetype=mimetype,
+                                  headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
     
-    traffic_lights = []
-    for tl in traffic_lights_data:
-        traffic_lights.append({
-            'street_id': tl[2],
-            'intersection_id': tl[1],
-            'green_time': tl[4],
-            'cycle_time': tl[3]
-        })
+    return jsonify(run_flow_simulation(**arguments))
+
+@app.route('/api/simulate-ensemble', methods=['POST'])
+def simulate_ensemble():
+    """Réplicas Monte Carlo semeadas com média, desvio e IC de 95%"""
+    arguments, error = parse_ensemble_request(request.json or {})
+    if error:
+        return jsonify({'error': error}), 400
     
-    # Encontrar intersecções
-    intersections = map_manager.find_intersections(streets)
+    return jsonify(run_ensemble(**arguments))
+
+@app.route('/api/optimize-signals', methods=['POST'])
+def optimize_signals():
+    """Ciclo e verdes sugeridos (Webster + busca local) para as intersecções escolhidas"""
+    data = request.json or {}
     
-    # Simular cada intersecção
-    results = {
-        'intersections': [],
-        'overall_flow': {
-            'total_cars_passing': 0,
-            'total_waiting_time': 0,
-            'average_wait_per_car': 0
+    tick, error = parse_tick(data)
+    if error:
+        return jsonify({'error': error}), 400
+    workers, error = parse_workers(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    network, error = select_network(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    optimizer = SignalOptimizer(tick=tick, max_workers=workers)
+    intersections = optimizer.optimize(network)
+    
+    optimized = [result for result in intersections if 'baseline' in result]
+    baseline_wait = sum(result['baseline']['total_waiting_time'] for result in optimized)
+    predicted_wait = sum(result['predicted']['total_waiting_time'] for result in optimized)
+    
+    return jsonify({
+        'intersections': intersections,
+        'overall': {
+            'baseline_waiting_time': baseline_wait,
+            'predicted_waiting_time': predicted_wait,
+            'wait_change': predicted_wait - baseline_wait,
+            'wait_change_percent': (predicted_wait - baseline_wait) / baseline_wait * 100 if baseline_wait > 0 else 0
         }
+    })
+
+def parse_assignment_request(data):
+    """Valida o corpo de assign-traffic. Retorna (argumentos de run_assignment, None) ou (None, erro)"""
+    od = data.get('od')
+    mode = data.get('mode', 'classic')
+    seed = data.get('seed')
+    two_way = data.get('two_way', True)
+    max_iterations = data.get('max_iterations', TrafficAssignment.MAX_ITERATIONS)
+    gap = data.get('gap', TrafficAssignment.GAP)
+    
+    if not isinstance(od, list) or not od:
+        return None, 'od deve ser uma lista de {origin, destination, vehicles_per_hour}'
+    if len(od) > 10000:
+        return None, 'Máximo de 10000 pares origem-destino por requisição'
+    if mode not in ('classic', 'queue'):
+        return None, "mode deve ser 'classic' ou 'queue'"
+    if seed is not None and (not isinstance(seed, int) or seed < 0):
+        return None, 'seed deve ser um inteiro não negativo'
+    if not isinstance(two_way, bool):
+        return None, 'two_way deve ser true ou false'
+    if not isinstance(max_iterations, int) or not 1 <= max_iterations <= 500:
+        return None, 'max_iterations deve estar entre 1 e 500'
+    if not isinstance(gap, (int, float)) or gap <= 0:
+        return None, 'gap deve ser positivo'
+    tick, error = parse_tick(data)
+    if error:
+        return None, error
+    
+    # Intersecção → nó do grafo (ruas que se cruzam duas vezes: vale o primeiro cruzamento)
+    network = load_network()
+    nodes = {}
+    for node, intersection in enumerate(network.intersections):
+        nodes.setdefault(intersection_key(traffic_simulator._get_intersection_id(intersection)), node)
+    
+    demand = []
+    for index, pair in enumerate(od):
+        if not isinstance(pair, dict):
+            return None, f'od[{index}] deve ser um objeto'
+        origin = nodes.get(intersection_key(pair.get('origin', '')))
+        destination = nodes.get(intersection_key(pair.get('destination', '')))
+        volume = pair.get('vehicles_per_hour')
+        if origin is None or destination is None:
+            return None, f'od[{index}]: intersecção de origem ou destino não encontrada'
+        if not isinstance(volume, (int, float)) or volume < 0:
+            return None, f'od[{index}]: vehicles_per_hour deve ser um número não negativo'
+        demand.append((origin, destination, float(volume)))
+    
+    return {'network': network, 'demand': demand, 'mode': mode, 'seed': seed,
+            'tick': tick, 'two_way': two_way,
+            'max_iterations': max_iterations, 'gap': float(gap)}, None
+
+def run_assignment(network, demand, mode='classic', seed=None, tick=1.0, two_way=True, max_iterations=None,
+                   gap=None, progress=None):
+    """Alocação de equilíbrio da matriz OD e simulação da rede com os fluxos resultantes"""
+    assignment = TrafficAssignment(network, two_way=two_way, max_iterations=max_iterations, gap=gap)
+    result = assignment.assign(demand, progress)
+    approach_flow = assignment.approach_demand(result['link_flow'])
+    
+    graph = assignment.graph
+    intersection_ids = [traffic_simulator._get_intersection_id(intersection) for intersection in network.intersections]
+    street_flows = [{
+        'intersection_id': intersection_ids[graph.approach_node[k]],
+        'street_id': graph.approach_street_id[k],
+        'vehicles_per_hour': float(approach_flow[k])
+    } for k in np.flatnonzero(approach_flow > 0).tolist()]
+    
+    simulation = run_flow_simulation(network, mode, seed, tick, demand=approach_flow)
+    return {
+        'assignment': {
+            'iterations': result['iterations'],
+            'relative_gap': result['relative_gap'],
+            'total_travel_time': result['total_travel_time'],
+            'unassigned': [{'origin': intersection_ids[origin], 'destination': intersection_ids[destination],
+                            'vehicles_per_hour': volume} for origin, destination, volume in result['unreachable']]
+        },
+        'street_flows': street_flows,
+        'intersections': simulation['intersections'],
+        'overall_flow': simulation['overall_flow']
     }
+
+@app.route('/api/assign-traffic', methods=['POST'])
+def assign_traffic():
+    """Fluxos de equilíbrio (Frank–Wolfe) de uma matriz origem-destino, simulados na rede"""
+    arguments, error = parse_assignment_request(request.json or {})
+    if error:
+        return jsonify({'error': error}), 400
     
-    total_cars = 0
-    total_wait = 0
+    return jsonify(run_assignment(**arguments))
+
+def parse_day_request(data):
+    """Valida o corpo de simulate-day. Retorna (argumentos de run_day_simulation, None) ou (None, erro)"""
+    default_profile = data.get('default_profile', 'urban')
+    if default_profile not in ('urban', 'flat'):
+        return None, "default_profile deve ser 'urban' ou 'flat'"
     
-    for intersection in intersections:
-        intersection_result = traffic_simulator.simulate_intersection_flow(
-            intersection, streets, traffic_lights
-        )
-        results['intersections'].append({
-            'intersection_data': intersection,
-            'flow_results': intersection_result
-        })
+    network, error = select_network(data)
+    if error:
+        return None, error
+    return {'network': network, 'default_profile': default_profile}, None
+
+def run_day_simulation(network, default_profile='urban', progress=None):
+    """
+    Simula as 24 horas (intervalos de 15 min) com os perfis gravados; ruas sem perfil
+    usam o perfil padrão a partir de vehicles_per_hour
+    """
+    with db.read() as cursor:
+        profiles = demand_profile_repository.for_streets(cursor, [street.id for street in network.streets])
+    
+    matrix = default_profiles([street.vehicles_per_hour for street in network.streets], default_profile)
+    for street_id, profile in profiles.items():
+        matrix[:, network.street_index[street_id]] = profile
+    
+    result = DailyProfileSimulator().simulate_day(network.intersections, network, matrix)
+    if progress is not None:
+        progress(1.0)
+    result['custom_profiles'] = len(profiles)
+    return result
+
+@app.route('/api/simulate-day', methods=['POST'])
+def simulate_day():
+    """Dia inteiro em intervalos de 15 minutos: indicadores por intervalo e hora de pico"""
+    arguments, error = parse_day_request(request.json or {})
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return jsonify(run_day_simulation(**arguments))
+
+def parse_scenario(index, scenario, network, intersection_keys):
+    """
+    Valida um cenário de compare-scenarios (add_lights, remove_lights, timings, demand).
+    Retorna ({name, lights, demand}, None) ou (None, erro).
+    """
+    if not isinstance(scenario, dict):
+        return None, f'scenarios[{index}] deve ser um objeto'
+    label = f'scenarios[{index}]'
+    lights = {}   # (id canônico, street_id) → (verde, ciclo) ou None (removido)
+    
+    def light_key(light, operation):
+        if not isinstance(light, dict):
+            return None, f'{label}.{operation}: cada item deve ser um objeto'
+        street_id = light.get('street_id')
+        try:
+            streets = intersection_street_ids(light.get('intersection_id'))
+        except ValueError as e:
+            return None, f'{label}.{operation}: {e}'
+        if intersection_key(light['intersection_id']) not in intersection_keys:
+            return None, f"{label}.{operation}: intersecção {light['intersection_id']} não encontrada"
+        if not isinstance(street_id, int) or street_id not in streets:
+            return None, f"{label}.{operation}: street_id deve ser uma das ruas de {light['intersection_id']}"
+        return ('intersection_' + '-'.join(str(street) for street in streets), street_id), None
+    
+    def has_light(key):
+        return lights[key] is not None if key in lights else network.light_at(*key) is not None
+    
+    def timing(light, operation, defaults=(45, 90)):
+        green_time = light.get('green_time', defaults[0])
+        cycle_time = light.get('cycle_time', defaults[1])
+        if not all(isinstance(value, int) and value > 0 for value in (green_time, cycle_time)):
+            return None, f'{label}.{operation}: green_time e cycle_time devem ser inteiros positivos'
+        if green_time >= cycle_time:
+            return None, f'{label}.{operation}: tempo verde deve ser menor que tempo do ciclo'
+        return (green_time, cycle_time), None
+    
+    for operation in ('remove_lights', 'add_lights', 'timings'):
+        items = scenario.get(operation, [])
+        if not isinstance(items, list):
+            return None, f'{label}.{operation} deve ser uma lista'
+        for light in items:
+            key, error = light_key(light, operation)
+            if error:
+                return None, error
+            if operation == 'remove_lights':
+                if not has_light(key):
+                    return None, f'{label}.remove_lights: não há semáforo da rua {key[1]} em {key[0]}'
+                lights[key] = None
+                continue
+            if operation == 'add_lights' and has_light(key):
+                return None, f'{label}.add_lights: semáforo já existe na rua {key[1]} em {key[0]}'
+            if operation == 'timings' and not has_light(key):
+                return None, f'{label}.timings: não há semáforo da rua {key[1]} em {key[0]}'
+            defaults = (45, 90)
+            if operation == 'timings':
+                # Tempos omitidos continuam os do semáforo (da base ou adicionado no cenário)
+                current = network.light_at(*key)
+                defaults = lights.get(key) or (current.green_time, current.cycle_time)
+            values, error = timing(light, operation, defaults)
+            if error:
+                return None, error
+            lights[key] = values
+    
+    demand = {}
+    multipliers = scenario.get('demand', {})
+    if not isinstance(multipliers, dict):
+        return None, f'{label}.demand deve ser um objeto {{street_id: multiplicador}}'
+    for street_id, factor in multipliers.items():
+        try:
+            street_id = int(street_id)
+        except ValueError:
+            return None, f'{label}.demand: id de rua inválido: {street_id}'
+        if network.street(street_id) is None:
+            return None, f'{label}.demand: rua {street_id} não encontrada'
+        if not isinstance(factor, (int, float)) or isinstance(factor, bool) or factor < 0:
+            return None, f'{label}.demand: multiplicadores devem ser números não negativos'
+        demand[street_id] = float(factor)
+    
+    name = scenario.get('name', f'Cenário {index + 1}')
+    return {'name': str(name), 'lights': lights, 'demand': demand}, None
+
+def parse_scenarios_request(data):
+    """Valida o corpo de compare-scenarios. Retorna (argumentos de run_scenarios, None) ou (None, erro)"""
+    scenarios = data.get('scenarios')
+    mode = data.get('mode', 'queue')
+    seed = data.get('seed', 0)
+    rank_by = data.get('rank_by', 'average_wait_per_car')
+    
+    if not isinstance(scenarios, list) or not scenarios:
+        return None, 'scenarios deve ser uma lista de cenários'
+    if len(scenarios) > 100:
+        return None, 'Máximo de 100 cenários por requisição'
+    if mode not in ('classic', 'queue'):
+        return None, "mode deve ser 'classic' ou 'queue'"
+    if not isinstance(seed, int) or seed < 0:
+        return None, 'seed deve ser um inteiro não negativo'
+    if rank_by not in RANKINGS:
+        return None, f"rank_by deve ser um de: {', '.join(RANKINGS)}"
+    tick, error = parse_tick(data)
+    if error:
+        return None, error
+    workers, error = parse_workers(data)
+    if error:
+        return None, error
+    
+    network, error = select_network(data)
+    if error:
+        return None, error
+    intersection_keys = {intersection_key(traffic_simulator._get_intersection_id(intersection))
+                         for intersection in network.intersections}
+    parsed = []
+    for index, scenario in enumerate(scenarios):
+        scenario, error = parse_scenario(index, scenario, network, intersection_keys)
+        if error:
+            return None, error
+        parsed.append(scenario)
+    
+    return {'network': network, 'scenarios': parsed, 'mode': mode, 'seed': seed,
+            'tick': tick, 'rank_by': rank_by, 'workers': workers}, None
+
+def run_scenarios(network, scenarios, mode='queue', seed=0, tick=1.0, rank_by='average_wait_per_car', workers=None,
+                  progress=None):
+    runner = ScenarioRunner(max_workers=workers)
+    return runner.run(network, scenarios, mode=mode, seed=seed, tick=tick, rank_by=rank_by, progress=progress)
+
+@app.route('/api/compare-scenarios', methods=['POST'])
+def compare_scenarios():
+    """Cenários "e se" (semáforos e demanda) sobre a rede atual, sem gravar nada, em ordem de desempenho"""
+    arguments, error = parse_scenarios_request(request.json or {})
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return jsonify(run_scenarios(**arguments))
+
+# Simulações em segundo plano: tipo do job → (validação do corpo, execução)
+JOB_TYPES = {
+    'simulate-flow': (parse_flow_request, run_flow_simulation),
+    'simulate-ensemble': (parse_ensemble_request, run_ensemble),
+    'assign-traffic': (parse_assignment_request, run_assignment),
+    'simulate-day': (parse_day_request, run_day_simulation),
+    'compare-scenarios': (parse_scenarios_request, run_scenarios)
+}
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+def handle_jobs():
+    if request.method == 'POST':
+        data = request.json or {}
+        kind = data.get('type', 'simulate-flow')
+        if kind not in JOB_TYPES:
+            return jsonify({'error': f"type deve ser um de: {', '.join(JOB_TYPES)}"}), 400
         
-        total_cars += intersection_result['total_cars_passing']
-        total_wait += intersection_result['total_waiting_time']
+        # A rede é carregada agora: o job simula a revisão vigente no envio
+        parse, run = JOB_TYPES[kind]
+        arguments, error = parse(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        job = job_manager.submit(kind, run, **arguments)
+        return jsonify(job.to_dict()), 202, {'Location': f'/api/jobs/{job.id}'}
     
-    # Estatísticas gerais
-    if total_cars > 0:
-        results['overall_flow']['total_cars_passing'] = total_cars
-        results['overall_flow']['total_waiting_time'] = total_wait
-        results['overall_flow']['average_wait_per_car'] = total_wait / total_cars
+    else:  # GET
+        return jsonify([job.to_dict() for job in job_manager.list()])
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Estado e progresso do job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if job.status == 'failed':
+        return jsonify({'error': job.error, 'job': job.to_dict()}), 500
+    if job.status != 'done':
+        return jsonify(job.to_dict()), 202 if not job.finished else 409
     
-    return jsonify(results)
+    # Serializado uma única vez; leituras seguintes só reenviam os bytes
+    if job.body is None:
+        job.body = jsonify(job.result).get_data()
+    return app.response_class(job.body, mimetype='application/json')
 
 @app.route('/api/search-street', methods=['POST'])
 def search_street():
@@ -366,53 +1169,24 @@ def import_street():
         return jsonify({'error': message}), 404
     
     # Salvar no banco
-    conn = sqlite3.connect('traffic.db')
-    cursor = conn.cursor()
-    
     length_km = map_manager.calculate_street_length(street_data['coordinates'])
     
-    cursor.execute('''
-        INSERT INTO streets (name, coordinates, length_km, lanes, vehicles_per_hour, average_speed)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (street_data['name'], json.dumps(street_data['coordinates']), length_km,
-          lanes, vehicles_per_hour, average_speed))
-    
-    conn.commit()
-    street_id = cursor.lastrowid
-    conn.close()
-    
-    # Buscar intersecções com ruas existentes
-    conn = sqlite3.connect('traffic.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM streets WHERE id != ?', (street_id,))
-    existing_streets_data = cursor.fetchall()
-    conn.close()
-    
-    existing_streets = []
-    for s in existing_streets_data:
-        existing_streets.append({
-            'id': s[0],
-            'name': s[1],
-            'coordinates': json.loads(s[2]),
-            'length_km': s[3],
-            'lanes': s[4]
-        })
-    
-    imported_street = {
-        'id': street_id,
-        'name': street_data['name'],
-        'coordinates': street_data['coordinates'],
-        'length_km': length_km,
-        'lanes': lanes
-    }
-    
-    intersections = map_manager.find_intersections(existing_streets + [imported_street])
-    
-    # Filtrar apenas intersecções envolvendo a rua importada
-    street_intersections = []
-    for intersection in intersections:
-        if imported_street['id'] in intersection['streets']:
-            street_intersections.append(intersection)
+    with db.transaction() as cursor:
+        street_id = street_repository.insert(cursor, street_data['name'], street_data['coordinates'], length_km,
+                                             lanes, vehicles_per_hour, average_speed)
+        
+        imported_street = {
+            'id': street_id,
+            'name': street_data['name'],
+            'coordinates': street_data['coordinates'],
+            'length_km': length_km,
+            'lanes': lanes
+        }
+        
+        # Intersecções apenas com a rua importada
+        street_intersections = update_street_intersections(cursor, imported_street)
+        
+        revision_repository.bump(cursor, [street_id])
     
     return jsonify({
         'success': True,
@@ -429,6 +1203,128 @@ def import_street():
         }
     })
 
+@app.route('/api/import-street/bulk', methods=['POST'])
+def bulk_import_streets():
+    """Importa várias ruas reais: geocodificação concorrente e limitada, gravação numa única transação"""
+    data = request.get_json(silent=True) or {}
+    default_city = data.get('city', 'São Paulo')
+    entries = data.get('streets')
+    
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'Envie uma lista de ruas em "streets"'}), 400
+    if len(entries) > 1000:
+        return jsonify({'error': 'No máximo 1000 ruas por importação'}), 400
+    
+    items = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {'street_name': entry}
+        if not isinstance(entry, dict) or not entry.get('street_name'):
+            return jsonify({'error': f'Rua {index}: street_name é obrigatório'}), 400
+        items.append({
+            'street_name': entry['street_name'],
+            'city': entry.get('city', default_city),
+            'vehicles_per_hour': entry.get('vehicles_per_hour', data.get('vehicles_per_hour', 800)),
+            'average_speed': entry.get('average_speed', data.get('average_speed', 50)),
+            'lanes': entry.get('lanes', data.get('lanes', 2))
+        })
+    
+    imported = real_street_importer.import_real_streets(items, max_workers=4)
+    
+    found = [result['street_data'] for result in imported if result['street_data'] is not None]
+    street_ids, intersections = [], []
+    if found:
+        with db.transaction() as cursor:
+            street_ids, intersections = insert_streets(cursor, found)
+            revision_repository.bump(cursor, street_ids)
+    
+    # Status por nome, na ordem enviada; repetidas apontam para a rua da entrada original
+    new_ids = iter(street_ids)
+    results = []
+    for item, result in zip(items, imported):
+        status = {
+            'street_name': item['street_name'],
+            'city': item['city'],
+            'status': result['status'],
+            'message': result['message']
+        }
+        if result['status'] == 'imported':
+            status['street_id'] = next(new_ids)
+        elif result['status'] == 'duplicate':
+            status['duplicate_of'] = result['duplicate_of']
+            status['street_id'] = results[result['duplicate_of']].get('street_id')
+        results.append(status)
+    
+    return jsonify({
+        'results': results,
+        'imported': len(street_ids),
+        'failed': sum(1 for result in results if result['status'] in ('not_found', 'error')),
+        'intersections_found': len(intersections)
+    })
+
+def import_osm_extract(path, batch_size=1000, progress=None, database=None):
+    """
+    Importa as ruas de um extrato .osm local (ver OSMStreetReader) em `database` (padrão:
+    o banco do app), gravando cada lote de `batch_size` ruas na sua própria transação:
+    lotes já gravados permanecem se o job for cancelado ou falhar no meio.
+    """
+    if database is None:
+        database = db
+    reader = OSMStreetReader(path)
+    imported = intersections_found = 0
+    batch = []
+    
+    def write_batch():
+        nonlocal imported, intersections_found
+        with database.transaction() as cursor:
+            street_ids, intersections = insert_streets(cursor, batch, shared_vertices=True)
+            revision_repository.bump(cursor, street_ids)
+        imported += len(street_ids)
+        intersections_found += len(intersections)
+        batch.clear()
+        if progress is not None:
+            progress(0.6 + 0.4 * imported / max(reader.way_count - reader.skipped, imported))
+    
+    for street in reader.streets(progress):
+        batch.append(street)
+        if len(batch) >= batch_size:
+            write_batch()
+    if batch:
+        write_batch()
+    
+    return {
+        'ways_found': reader.way_count,
+        'imported': imported,
+        'skipped': reader.skipped,
+        'intersections_found': intersections_found
+    }
+
+@app.route('/api/import-osm', methods=['POST'])
+def import_osm():
+    """Importa um extrato OpenStreetMap enviado (campo "file": .osm, .osm.gz ou .osm.bz2) como job"""
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'Envie o extrato .osm no campo "file"'}), 400
+    
+    suffix = next((suffix for suffix in ('.osm.gz', '.osm.bz2', '.osm') if upload.filename.lower().endswith(suffix)), None)
+    if suffix is None:
+        return jsonify({'error': 'O arquivo deve ser .osm, .osm.gz ou .osm.bz2'}), 400
+    try:
+        batch_size = int(request.form.get('batch_size', 1000))
+    except ValueError:
+        batch_size = 0
+    if not 1 <= batch_size <= 10000:
+        return jsonify({'error': 'batch_size deve estar entre 1 e 10000'}), 400
+    
+    # O job lê do disco em fluxo; o arquivo temporário sai quando ele termina ou é cancelado na fila
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(handle, 'wb') as target:
+        upload.save(target)
+    
+    job = job_manager.submit('import-osm', import_osm_extract, path, batch_size)
+    job.future.add_done_callback(lambda _: os.remove(path))
+    return jsonify(job.to_dict()), 202, {'Location': f'/api/jobs/{job.id}'}
+
 if __name__ == '__main__':
     init_db()
     print("✅ Banco de dados inicializado!")
@@ -0,0 +1,92 @@
+"""
+Benchmark de MapManager.find_intersections: índice espacial vs. varredura por pares.
+
+Uso:
+    python benchmarks/bench_intersections.py
+    python benchmarks/bench_intersections.py --sizes 1000 5000 20000 --max-bruteforce 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_engine import MapManager
+from synthetic import random_polylines
+
+
+def generate_streets(count, seed=42, center=(-23.55, -46.63), span_deg=0.4):
+    """Gera polilinhas aleatórias (3 a 6 pontos, ~1 km) numa área da cidade"""
+    return random_polylines(count, seed=seed, center=center, span_deg=span_deg)
+
+
+def segment_pairs_scalar(map_manager, coords1, coords2):
+    """Laço escalar original sobre todos os pares de segmentos (sem o caminho vetorizado)"""
+    found = []
+    for i in range(len(coords1) - 1):
+        for j in range(len(coords2) - 1):
+            point = map_manager.segment_intersection(coords1[i], coords1[i + 1], coords2[j], coords2[j + 1])
+            if point:
+                found.append(point)
+    return found
+
+
+def find_intersections_bruteforce(map_manager, streets):
+    """Implementação original (todos os pares de ruas, laço escalar), usada como referência"""
+    intersections = []
+    for i, street1 in enumerate(streets):
+        for j, street2 in enumerate(streets):
+            if i >= j:
+                continue
+            found = segment_pairs_scalar(map_manager, street1.get('coordinates', []), street2.get('coordinates', []))
+            for point in found:
+                intersections.append({
+                    'point': point,
+                    'streets': [street1['id'], street2['id']],
+                    'street_names': [street1.get('name', 'Rua ' + str(street1['id'])),
+                                     street2.get('name', 'Rua ' + str(street2['id']))],
+                    'type': 'INTERSECTION'
+                })
+    return intersections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--max-bruteforce', type=int, default=1000,
+                        help='acima deste tamanho o tempo da varredura por pares é extrapolado (O(n²))')
+    args = parser.parse_args()
+
+    map_manager = MapManager()
+    reference = None
+
+    print(f"{'ruas':>8} {'intersecções':>13} {'índice (s)':>11} {'pares (s)':>11} {'ganho':>8}")
+    for size in args.sizes:
+        streets = generate_streets(size)
+
+        start = time.perf_counter()
+        indexed = map_manager.find_intersections(streets)
+        indexed_time = time.perf_counter() - start
+
+        if size <= args.max_bruteforce:
+            start = time.perf_counter()
+            brute = find_intersections_bruteforce(map_manager, streets)
+            brute_time = time.perf_counter() - start
+            if brute != indexed:
+                raise SystemExit(f"Resultado divergente para {size} ruas")
+            reference = (size, brute_time)
+            brute_label = f"{brute_time:11.3f}"
+        elif reference:
+            brute_time = reference[1] * (size / reference[0]) ** 2
+            brute_label = f"{'~' + format(brute_time, '.1f'):>11}"
+        else:
+            brute_time = None
+            brute_label = f"{'-':>11}"
+
+        speedup = f"{brute_time / indexed_time:7.0f}x" if brute_time else f"{'-':>8}"
+        print(f"{size:8d} {len(indexed):13d} {indexed_time:11.3f} {brute_label} {speedup}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+Benchmarks dos caminhos críticos e das rotas principais sobre cidades sintéticas.
+
+Mede MapManager (intersecções e comprimentos), os dois simuladores e as rotas da API
+(via test client do Flask, com um banco temporário) para cada traçado e tamanho,
+e grava os tempos em JSON para comparar execuções ao longo do tempo.
+
+Uso:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --layouts grid --sizes 100 1000 --repeat 5
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/bench-20250101-120000.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from models.network import NetworkSnapshot, TrafficLightRecord
+from simulation_engine import MapManager, TrafficFlowSimulator
+from simulation.queue_engine import QueueFlowSimulator
+from simulation.road_graph import RoadGraph
+from simulation.daily import DailyProfileSimulator
+from models.demand import default_profiles
+from synthetic import LAYOUTS, generate_network, with_traffic_attributes
+
+LIGHT_SHARE = 0.25  # fração das intersecções que recebe semáforos
+
+
+def measure(function, repeat):
+    """Executa `function` `repeat` vezes; retorna (último resultado, menor tempo, tempo médio)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings), sum(timings) / len(timings)
+
+
+def traffic_lights_for(intersections, seed):
+    """Semáforos em LIGHT_SHARE das intersecções, com verdes em sequência no ciclo de 90 s"""
+    rng = random.Random(seed)
+    lights = {}
+    for intersection in intersections:
+        # Ruas que se cruzam mais de uma vez compartilham o id da intersecção
+        intersection_id = 'intersection_' + '-'.join(str(street_id) for street_id in sorted(intersection['streets']))
+        if rng.random() < LIGHT_SHARE and intersection_id not in lights:
+            lights[intersection_id] = [TrafficLightRecord(intersection_id, street_id, 40, 90)
+                                       for street_id in intersection['streets']]
+    return [light for group in lights.values() for light in group]
+
+
+def bench_hot_paths(streets, args, record):
+    map_manager = MapManager()
+    coordinates = [street['coordinates'] for street in streets]
+
+    _, best, mean = measure(lambda: [map_manager.calculate_street_length(c) for c in coordinates], args.repeat)
+    record('calculate_street_length', best, mean, count=len(streets))
+
+    _, best, mean = measure(lambda: map_manager.calculate_street_lengths(coordinates), args.repeat)
+    record('calculate_street_lengths', best, mean, count=len(streets))
+
+    intersections, best, mean = measure(lambda: map_manager.find_intersections(streets), args.repeat)
+    record('find_intersections', best, mean, count=len(intersections))
+
+    # Simulação limitada às primeiras intersecções nas redes muito grandes
+    simulated = intersections[:args.max_simulated]
+    network = NetworkSnapshot(streets, traffic_lights_for(simulated, args.seed), simulated)
+
+    simulator = TrafficFlowSimulator(rng=random.Random(args.seed))
+    _, best, mean = measure(lambda: [simulator.simulate_intersection_flow(intersection, network)
+                                     for intersection in simulated], args.repeat)
+    record('simulate_intersection_flow', best, mean, count=len(simulated))
+
+    queue_simulator = QueueFlowSimulator(rng=np.random.default_rng(args.seed))
+    _, best, mean = measure(lambda: queue_simulator.simulate_network(simulated, network), args.repeat)
+    record('queue_simulate_network', best, mean, count=len(simulated))
+
+    # Grafo e propagação sobre a rede inteira (custo linear no número de arestas)
+    full_network = NetworkSnapshot(streets, traffic_lights_for(intersections, args.seed), intersections)
+    graph, best, mean = measure(lambda: RoadGraph(full_network), args.repeat)
+    record('RoadGraph', best, mean, count=graph.edge_count)
+
+    _, best, mean = measure(graph.propagate, args.repeat)
+    record('RoadGraph.propagate', best, mean, count=graph.edge_count)
+
+    # Dia inteiro (96 intervalos) com o perfil urbano padrão
+    profiles = default_profiles([street.vehicles_per_hour for street in full_network.streets])
+    _, best, mean = measure(lambda: DailyProfileSimulator().simulate_day(intersections, full_network, profiles),
+                            args.repeat)
+    record('simulate_day', best, mean, count=len(intersections))
+    return intersections
+
+
+def bench_api(streets, intersections, args, record):
+    """Rotas principais pelo test client, sobre um banco SQLite temporário"""
+    import app as app_module
+    from models.database import Database
+    from models.geometry import SimplifiedGeometryCache
+    from response_cache import ResponseCache
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Cada banco novo recomeça na revisão 1: nada pode vir dos caches da execução anterior
+        app_module.db = Database(os.path.join(directory, 'bench.db'))
+        app_module.network_cache['snapshot'] = None
+        app_module.response_cache = ResponseCache()
+        app_module.simplified_geometry_cache = SimplifiedGeometryCache()
+        app_module.flow_states.clear()
+        app_module.init_db()
+        client = app_module.app.test_client()
+
+        def request(method, url, **kwargs):
+            response = client.open(url, method=method, **kwargs)
+            if response.status_code != 200:
+                raise SystemExit(f"{method} {url}: HTTP {response.status_code}")
+            return response
+
+        payload = [{key: street[key] for key in ('name', 'coordinates', 'lanes', 'vehicles_per_hour', 'average_speed')}
+                   for street in streets]
+        response, best, mean = measure(lambda: request('POST', '/api/streets/bulk', json={'streets': payload}), 1)
+        record('POST /api/streets/bulk', best, mean, count=response.json['intersections_found'])
+
+        # Semáforos gravados direto pelo repositório (não é o que se mede aqui)
+        with app_module.db.transaction() as cursor:
+            for light in traffic_lights_for(intersections, args.seed):
+                app_module.traffic_light_repository.insert(cursor, light.intersection_id, light.street_id,
+                                                           light.cycle_time, light.green_time)
+            app_module.revision_repository.bump(cursor)
+
+        for method, url, body in (('GET', '/api/streets', None),
+                                  ('GET', '/api/intersections', None),
+                                  ('POST', '/api/simulate-flow', {'seed': args.seed}),
+                                  ('POST', '/api/simulate-flow', {'seed': args.seed, 'mode': 'queue'})):
+            response, best, mean = measure(lambda: request(method, url, json=body), args.repeat)
+            label = f"{method} {url}" + (f" ({body['mode']})" if body and 'mode' in body else '')
+            record(label, best, mean, count=None, response_bytes=len(response.data))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_path):
+    """Imprime a razão novo/anterior para os casos presentes nas duas execuções"""
+    with open(previous_path) as previous_file:
+        previous = {(r['layout'], r['streets'], r['case']): r['seconds'] for r in json.load(previous_file)['results']}
+
+    print(f"\n{'traçado':>8} {'ruas':>7} {'caso':<40} {'antes (s)':>10} {'agora (s)':>10} {'razão':>7}")
+    for result in results:
+        before = previous.get((result['layout'], result['streets'], result['case']))
+        if before:
+            ratio = result['seconds'] / before
+            flag = '  ← mais lento' if ratio > 1.2 else ''
+            print(f"{result['layout']:>8} {result['streets']:7d} {result['case']:<40} "
+                  f"{before:10.4f} {result['seconds']:10.4f} {ratio:6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--layouts', nargs='+', choices=list(LAYOUTS), default=list(LAYOUTS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+    parser.add_argument('--segments', type=int, default=None, help='segmentos por rua (padrão de cada traçado)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help='execuções por caso (vale o menor tempo)')
+    parser.add_argument('--max-simulated', type=int, default=20000,
+                        help='intersecções simuladas nos benchmarks dos simuladores')
+    parser.add_argument('--max-api-streets', type=int, default=10000,
+                        help='acima deste tamanho as rotas da API não são medidas')
+    parser.add_argument('--output', help='arquivo JSON (padrão: benchmarks/results/bench-<data>.json)')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc)
+    results = []
+
+    print(f"{'traçado':>8} {'ruas':>7} {'caso':<40} {'melhor (s)':>11} {'qtd':>9}")
+    for layout in args.layouts:
+        for size in args.sizes:
+            def record(case, best, mean, count=None, **extra):
+                results.append({'layout': layout, 'streets': size, 'case': case, 'seconds': best,
+                                'mean_seconds': mean, 'count': count, **extra})
+                print(f"{layout:>8} {size:7d} {case:<40} {best:11.4f} {count if count is not None else '-':>9}")
+
+            streets, best, mean = measure(lambda: with_traffic_attributes(
+                generate_network(layout, size, segments=args.segments, seed=args.seed), seed=args.seed), 1)
+            record('generate_network', best, mean, count=len(streets))
+
+            intersections = bench_hot_paths(streets, args, record)
+            if size <= args.max_api_streets:
+                bench_api(streets, intersections, args, record)
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"bench-{started.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as output_file:
+        json.dump({
+            'meta': {
+                'started_at': started.isoformat(),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'arguments': vars(args)
+            },
+            'results': results
+        }, output_file, indent=2)
+    print(f"\nResultados gravados em {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Cidades sintéticas reprodutíveis para benchmarks e testes manuais.
+
+Três traçados, todos no formato de rua aceito por MapManager e por /api/streets/bulk:
+    grid    - malha ortogonal (Manhattan)
+    radial  - anéis e avenidas radiais em torno de um centro
+    random  - polilinhas aleatórias
+"""
+import math
+import random
+
+CENTER = (-23.55, -46.63)
+BLOCK_DEG = 0.001  # ~110 m entre ruas paralelas
+
+
+def generate_network(layout, count, segments=None, seed=42, center=CENTER):
+    """Gera `count` ruas com o traçado escolhido; mesma semente → mesma cidade"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"traçado desconhecido: {layout} (use {', '.join(LAYOUTS)})")
+    return LAYOUTS[layout](count, segments=segments, seed=seed, center=center)
+
+
+def manhattan_grid(count, segments=None, seed=42, center=CENTER, block_deg=BLOCK_DEG):
+    """
+    Malha ortogonal: cada rua cobre `segments` quarteirões de uma linha da malha
+    (linhas longas são divididas em várias ruas, como numa cidade real)
+    """
+    segments = segments or 8
+
+    def to_lat_lon(row, col, lines):
+        return [center[0] + (row - lines / 2) * block_deg, center[1] + (col - lines / 2) * block_deg]
+
+    return _lattice_streets(count, segments, seed, to_lat_lon, ('Rua', 'Avenida'))
+
+
+def radial_city(count, segments=None, seed=42, center=CENTER, block_deg=BLOCK_DEG):
+    """
+    Anéis concêntricos cortados por avenidas radiais; cada rua cobre `segments`
+    intervalos (arco de anel ou trecho de avenida)
+    """
+    segments = segments or 8
+
+    def to_lat_lon(ring, spoke, lines):
+        radius = (ring + 1) * block_deg
+        angle = 2 * math.pi * spoke / lines
+        return [center[0] + radius * math.sin(angle),
+                center[1] + radius * math.cos(angle) / math.cos(math.radians(center[0]))]
+
+    return _lattice_streets(count, segments, seed, to_lat_lon, ('Anel', 'Radial'))
+
+
+def random_polylines(count, segments=None, seed=42, center=CENTER, span_deg=None):
+    """
+    Polilinhas aleatórias de ~1 km. Sem `segments`, cada rua tem de 2 a 5 segmentos;
+    sem `span_deg`, a área cresce com `count` para manter a densidade de cruzamentos
+    """
+    rng = random.Random(seed)
+    if span_deg is None:
+        span_deg = 0.4 * math.sqrt(count / 20000)
+    streets = []
+    for street_id in range(1, count + 1):
+        lat = center[0] + rng.uniform(-span_deg / 2, span_deg / 2)
+        lon = center[1] + rng.uniform(-span_deg / 2, span_deg / 2)
+        heading = rng.uniform(0, 2 * math.pi)
+        coordinates = [[lat, lon]]
+        for _ in range(segments or rng.randint(2, 5)):
+            heading += rng.uniform(-0.4, 0.4)
+            step = rng.uniform(0.001, 0.003)
+            lat += step * math.sin(heading)
+            lon += step * math.cos(heading)
+            coordinates.append([lat, lon])
+        streets.append({'id': street_id, 'name': f'Rua {street_id}', 'coordinates': coordinates})
+    return streets
+
+
+def with_traffic_attributes(streets, seed=42):
+    """Acrescenta faixas, volume e velocidade variados (mesma semente → mesmos valores)"""
+    rng = random.Random(seed)
+    for street in streets:
+        street['lanes'] = rng.randint(1, 4)
+        street['vehicles_per_hour'] = rng.randrange(200, 1600, 50)
+        street['average_speed'] = rng.choice((30, 40, 50, 60))
+    return streets
+
+
+def _lattice_streets(count, segments, seed, to_lat_lon, names):
+    """
+    Ruas ao longo das linhas (eixo 0) e colunas (eixo 1) de uma malha lines × lines, cada uma
+    com `segments` intervalos. Os vértices ficam no meio dos quarteirões, então cada cruzamento
+    cai no interior de um segmento e é contado uma única vez. O tamanho da malha é escolhido
+    para chegar a `count` ruas.
+    """
+    # 2 · lines · (lines / segments) ≈ count
+    lines = max(segments, math.ceil(math.sqrt(count * segments / 2)))
+
+    pieces = [(axis, line, start, min(start + segments, lines))
+              for axis in (0, 1) for line in range(lines) for start in range(0, lines, segments)]
+
+    # Amostra reprodutível quando a malha gera mais ruas que o pedido
+    if len(pieces) > count:
+        rng = random.Random(seed)
+        pieces = [pieces[index] for index in sorted(rng.sample(range(len(pieces)), count))]
+
+    streets = []
+    for street_id, (axis, line, start, stop) in enumerate(pieces, start=1):
+        if axis == 0:
+            coordinates = [to_lat_lon(line, col - 0.5, lines) for col in range(start, stop + 1)]
+        else:
+            coordinates = [to_lat_lon(row - 0.5, line, lines) for row in range(start, stop + 1)]
+        streets.append({
+            'id': street_id,
+            'name': f'{names[axis]} {line + 1}-{start // segments + 1}',
+            'coordinates': coordinates
+        })
+    return streets
+
+
+LAYOUTS = {
+    'grid': manhattan_grid,
+    'radial': radial_city,
+    'random': random_polylines
+}
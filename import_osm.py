@@ -0,0 +1,39 @@
+"""
+Importa as ruas de um extrato OpenStreetMap local (.osm, .osm.gz ou .osm.bz2) direto
+no banco, sem rede: leitura em fluxo, geometria real das vias e gravação em lotes.
+
+Uso:
+    python import_osm.py sao-paulo.osm.bz2
+    python import_osm.py bairro.osm --database traffic.db --batch-size 2000
+"""
+import argparse
+import time
+
+import app
+from models.database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='extrato .osm (pode estar compactado em .gz ou .bz2)')
+    parser.add_argument('--database', default='traffic.db')
+    parser.add_argument('--batch-size', type=int, default=1000, help='ruas por transação')
+    args = parser.parse_args()
+
+    # Banco passado explicitamente: o módulo app continua com o seu próprio
+    database = Database(args.database)
+    app.init_db(database)
+
+    started = time.perf_counter()
+
+    def progress(fraction):
+        print(f'\r  {fraction:6.1%}  {time.perf_counter() - started:7.1f}s', end='', flush=True)
+
+    summary = app.import_osm_extract(args.path, args.batch_size, progress, database=database)
+    print()
+    print(f"✅ {summary['imported']} ruas importadas de {summary['ways_found']} vias "
+          f"({summary['skipped']} sem nós no extrato), {summary['intersections_found']} intersecções")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+import json
+import queue
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from metrics import STAGE_DURATION
+from models.geometry import bounding_box, pack_coordinates, unpack_coordinates
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor que soma em `elapsed` o tempo gasto no SQLite (execute, executemany e fetch*)"""
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.elapsed = 0.0
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def execute(self, *args):
+        return self._timed(super().execute, *args)
+
+    def executemany(self, *args):
+        return self._timed(super().executemany, *args)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+
+class Database:
+    """
+    Pool de conexões SQLite em modo WAL, compartilhado por todas as rotas.
+    Leitores não bloqueiam o escritor (e vice-versa) enquanto simulações gravam.
+    """
+    PRAGMAS = (
+        'PRAGMA journal_mode = WAL',
+        'PRAGMA synchronous = NORMAL',    # seguro em WAL, sem fsync a cada commit
+        'PRAGMA busy_timeout = 5000',     # espera o lock de escrita em vez de falhar
+        'PRAGMA temp_store = MEMORY',
+        'PRAGMA cache_size = -20000',     # ~20 MB de cache de páginas por conexão
+        'PRAGMA mmap_size = 268435456'    # 256 MB mapeados em memória
+    )
+
+    def __init__(self, path='traffic.db', pool_size=8):
+        self.path = path
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        # isolation_level=None: as transações são abertas explicitamente abaixo
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão do pool (o servidor de desenvolvimento cria uma thread por requisição)"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def read(self):
+        """Cursor para leituras consistentes: todas as consultas veem o mesmo snapshot"""
+        with self.connection() as conn:
+            cursor = conn.cursor(TimedCursor)
+            cursor.execute('BEGIN')
+            try:
+                yield cursor
+            finally:
+                conn.rollback()
+                # Só o tempo dentro do SQLite, não o trabalho do chamador no bloco with
+                STAGE_DURATION.observe(cursor.elapsed, stage='sqlite_read')
+
+    @contextmanager
+    def transaction(self):
+        """Cursor de escrita: BEGIN IMMEDIATE, commit ao sair e rollback em caso de erro"""
+        with self.connection() as conn:
+            cursor = conn.cursor(TimedCursor)
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+            except BaseException:
+                conn.rollback()
+                raise
+            start = time.perf_counter()
+            conn.commit()
+            cursor.elapsed += time.perf_counter() - start
+            STAGE_DURATION.observe(cursor.elapsed, stage='sqlite_write')
+
+    def init_schema(self):
+        """
+        Cria/migra tabelas e índices. Retorna True se a tabela de intersecções
+        acabou de ser criada (banco antigo que precisa de preenchimento inicial).
+        """
+        with self.transaction() as cursor:
+            # Criar tabela streets
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS streets (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    coordinates TEXT,
+                    geometry BLOB,
+                    length_km REAL DEFAULT 0.1,
+                    lanes INTEGER DEFAULT 2,
+                    vehicles_per_hour INTEGER DEFAULT 500,
+                    average_speed REAL DEFAULT 50,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Tabela para semáforos de intersecção
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS intersection_traffic_lights (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    intersection_id TEXT NOT NULL,
+                    street_id INTEGER NOT NULL,
+                    cycle_time INTEGER DEFAULT 90,
+                    green_time INTEGER DEFAULT 45,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (street_id) REFERENCES streets (id),
+                    UNIQUE(intersection_id, street_id)
+                )
+            ''')
+
+            # Tabela de intersecções pré-calculadas (mantida incrementalmente)
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'intersections'")
+            intersections_table_exists = cursor.fetchone() is not None
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS intersections (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    street_a_id INTEGER NOT NULL,
+                    street_b_id INTEGER NOT NULL,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    FOREIGN KEY (street_a_id) REFERENCES streets (id),
+                    FOREIGN KEY (street_b_id) REFERENCES streets (id)
+                )
+            ''')
+
+            # Revisão da rede: incrementada a cada escrita em ruas, semáforos ou intersecções
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS network_revision (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    revision INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            cursor.execute('INSERT OR IGNORE INTO network_revision (id, revision) VALUES (1, 0)')
+            
+            # Ruas alteradas em cada revisão (NULL: alteração sem ruas conhecidas), para re-simulação incremental
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS network_changes (
+                    revision INTEGER PRIMARY KEY,
+                    street_ids TEXT
+                )
+            ''')
+
+            # Caixa envolvente de cada rua (R*Tree) para consultas por área visível do mapa
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS street_bbox USING rtree (
+                    id, min_lat, max_lat, min_lon, max_lon
+                )
+            ''')
+            
+            # Perfis de demanda por rua: volumes (veículos/hora) a cada 15 min, float32 compactado
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS street_demand_profiles (
+                    street_id INTEGER PRIMARY KEY,
+                    profile BLOB NOT NULL,
+                    FOREIGN KEY (street_id) REFERENCES streets (id)
+                )
+            ''')
+            
+            # Cache persistente das buscas no Nominatim (JSON dos resultados já filtrados)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS geocoding_cache (
+                    key TEXT PRIMARY KEY,
+                    results TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+
+            # Verificar e adicionar colunas faltantes
+            cursor.execute("PRAGMA table_info(streets)")
+            existing_columns = [column[1] for column in cursor.fetchall()]
+
+            required_columns = {
+                'geometry': 'BLOB',
+                'length_km': 'REAL DEFAULT 0.1',
+                'vehicles_per_hour': 'INTEGER DEFAULT 500',
+                'average_speed': 'REAL DEFAULT 50'
+            }
+            for column, definition in required_columns.items():
+                if column not in existing_columns:
+                    cursor.execute(f'ALTER TABLE streets ADD COLUMN {column} {definition}')
+
+            # Migração: coordenadas em JSON (coluna antiga) → geometria binária
+            cursor.execute('SELECT id, coordinates FROM streets WHERE geometry IS NULL AND coordinates IS NOT NULL')
+            cursor.executemany('UPDATE streets SET geometry = ?, coordinates = NULL WHERE id = ?',
+                               [(pack_coordinates(json.loads(row[1])), row[0]) for row in cursor.fetchall()])
+
+            # Migração: caixas das ruas criadas antes do índice espacial
+            cursor.execute('''
+                SELECT id, geometry FROM streets
+                WHERE geometry IS NOT NULL AND id NOT IN (SELECT id FROM street_bbox)
+            ''')
+            boxes = [(row[0], bounding_box(unpack_coordinates(row[1]))) for row in cursor.fetchall()]
+            cursor.executemany('INSERT INTO street_bbox (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)',
+                               [(street_id, *box) for street_id, box in boxes if box is not None])
+
+            # Índices usados pelas consultas dos repositórios
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_streets_created_at ON streets (created_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_traffic_lights_street ON intersection_traffic_lights (street_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_intersections_street_a ON intersections (street_a_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_intersections_street_b ON intersections (street_b_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_intersections_lat_lon ON intersections (lat, lon)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_geocoding_cache_created_at ON geocoding_cache (created_at)')
+
+        return not intersections_table_exists
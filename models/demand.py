@@ -0,0 +1,49 @@
+import numpy as np
+
+BINS = 96            # intervalos de 15 minutos em 24 horas
+BIN_MINUTES = 24 * 60 // BINS
+
+# Perfil urbano típico (fração do volume da hora de pico, hora a hora): picos às 8 h e às 18 h
+URBAN_HOURLY = (0.15, 0.10, 0.08, 0.07, 0.10, 0.25, 0.55, 0.90, 1.00, 0.80, 0.65, 0.65,
+                0.70, 0.70, 0.65, 0.70, 0.80, 0.95, 1.00, 0.80, 0.60, 0.45, 0.35, 0.25)
+
+
+def normalize_profile(values):
+    """
+    Lista de volumes (veículos/hora) por intervalo → array (BINS,) float32.
+    Aceita 96 valores (15 min) ou 24 (um por hora, repetido nos quatro intervalos).
+    ValueError se o tamanho ou algum valor for inválido.
+    """
+    if not isinstance(values, (list, tuple)) or len(values) not in (24, BINS):
+        raise ValueError(f'o perfil deve ter 24 (por hora) ou {BINS} (a cada 15 min) valores')
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0 for value in values):
+        raise ValueError('os volumes do perfil devem ser números não negativos')
+    profile = np.asarray(values, dtype=np.float32)
+    return np.repeat(profile, BINS // 24) if len(profile) == 24 else profile
+
+
+def pack_profile(profile):
+    """Perfil → BLOB de float32 little-endian (384 bytes)"""
+    return np.asarray(profile, dtype='<f4').tobytes()
+
+
+def unpack_profile(blob):
+    return np.frombuffer(blob, dtype='<f4')
+
+
+def default_profiles(vehicles_per_hour, shape='urban'):
+    """
+    Perfis (BINS, ruas) das ruas sem perfil gravado: 'urban' trata vehicles_per_hour como
+    o volume da hora de pico; 'flat' repete vehicles_per_hour o dia inteiro
+    """
+    vehicles_per_hour = np.asarray(vehicles_per_hour, dtype=float)
+    if shape == 'flat':
+        return np.broadcast_to(vehicles_per_hour, (BINS, len(vehicles_per_hour))).copy()
+    factors = np.repeat(np.asarray(URBAN_HOURLY), BINS // 24)
+    return factors[:, None] * vehicles_per_hour[None, :]
+
+
+def bin_label(index):
+    """Início do intervalo como 'HH:MM'"""
+    minutes = (index % BINS) * BIN_MINUTES
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import CACHE_REQUESTS
+
+
+def normalize_query(text):
+    """Minúsculas e espaços colapsados: 'Av.  Paulista ' e 'av. paulista' viram a mesma chave"""
+    return ' '.join(str(text).casefold().split())
+
+
+def cache_key(street_name, city, country, limit):
+    return '|'.join((normalize_query(street_name), normalize_query(city), normalize_query(country), str(int(limit))))
+
+
+class GeocodingCache:
+    """
+    Cache de buscas do Nominatim em dois níveis: LRU em memória (por processo)
+    e tabela geocoding_cache no SQLite, com TTL e limite de entradas
+    """
+
+    def __init__(self, database=None, ttl_seconds=7 * 24 * 3600, memory_size=512, max_entries=10000):
+        self.database = database
+        self.ttl_seconds = ttl_seconds
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self._memory = OrderedDict()  # chave → (expira_em, resultados)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Resultados ainda válidos para a chave, ou None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    CACHE_REQUESTS.inc(cache='geocoding_memory', result='hit')
+                    return [dict(result) for result in entry[1]]
+                del self._memory[key]
+        CACHE_REQUESTS.inc(cache='geocoding_memory', result='miss')
+
+        if self.database is None:
+            return None
+
+        with self.database.read() as cursor:
+            cursor.execute('SELECT results, expires_at FROM geocoding_cache WHERE key = ?', (key,))
+            row = cursor.fetchone()
+        if row is None or row['expires_at'] <= now:
+            CACHE_REQUESTS.inc(cache='geocoding_sqlite', result='miss')
+            return None  # expiradas são removidas na próxima gravação
+        CACHE_REQUESTS.inc(cache='geocoding_sqlite', result='hit')
+
+        results = json.loads(row['results'])
+        self._remember(key, row['expires_at'], results)
+        return [dict(result) for result in results]
+
+    def put(self, key, results):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, expires_at, results)
+
+        if self.database is None:
+            return
+
+        with self.database.transaction() as cursor:
+            cursor.execute('''
+                INSERT OR REPLACE INTO geocoding_cache (key, results, created_at, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', (key, json.dumps(results), time.time(), expires_at))
+
+            # Remove expiradas e, acima do limite, as mais antigas
+            cursor.execute('DELETE FROM geocoding_cache WHERE expires_at <= ?', (time.time(),))
+            cursor.execute('''
+                DELETE FROM geocoding_cache WHERE key IN (
+                    SELECT key FROM geocoding_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.database is not None:
+            with self.database.transaction() as cursor:
+                cursor.execute('DELETE FROM geocoding_cache')
+
+    def _remember(self, key, expires_at, results):
+        with self._lock:
+            self._memory[key] = (expires_at, [dict(result) for result in results])
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
@@ -0,0 +1,113 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import CACHE_REQUESTS
+
+
+def pack_coordinates(coordinates):
+    """Lista de [lat, lon] → BLOB de float64 little-endian (lat0, lon0, lat1, lon1, ...)"""
+    return np.asarray(coordinates, dtype='<f8').reshape(-1, 2).tobytes()
+
+
+def unpack_coordinates(blob):
+    """BLOB → coordenadas sem cópia: array (N, 2) somente leitura sobre os bytes"""
+    if blob is None:
+        return np.empty((0, 2))
+    return np.frombuffer(blob, dtype='<f8').reshape(-1, 2)
+
+
+def coordinates_to_list(coordinates):
+    """Coordenadas (array ou lista) → lista de [lat, lon] para serializar em JSON"""
+    return coordinates.tolist() if hasattr(coordinates, 'tolist') else coordinates
+
+
+def bounding_box(coordinates):
+    """(min_lat, max_lat, min_lon, max_lon) das coordenadas, ou None se não houver pontos"""
+    points = coordinates_to_list(coordinates)
+    if not points:
+        return None
+    lats = [point[0] for point in points]
+    lons = [point[1] for point in points]
+    return min(lats), max(lats), min(lons), max(lons)
+
+
+def zoom_tolerance(zoom, latitude, pixels=1.0):
+    """Altura em graus de latitude de `pixels` pixels no zoom dado (tiles de 256 px, Web Mercator)"""
+    return pixels * 360.0 / (256 * 2 ** zoom) * math.cos(math.radians(latitude))
+
+
+def simplify_coordinates(coordinates, tolerance):
+    """
+    Douglas–Peucker iterativo: mantém os pontos a mais de `tolerance` (graus de latitude)
+    da reta entre os extremos do trecho. A longitude é escalada por cos(lat) para que a
+    tolerância valha igualmente nos dois eixos. Retorna uma lista de [lat, lon].
+    """
+    points = coordinates_to_list(coordinates)
+    if len(points) <= 2 or tolerance <= 0:
+        return [list(point[:2]) for point in points]
+
+    scale = math.cos(math.radians(sum(point[0] for point in points) / len(points)))
+    xs = [point[1] * scale for point in points]
+    ys = [point[0] for point in points]
+    squared_tolerance = tolerance * tolerance
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        dx, dy = xs[last] - xs[first], ys[last] - ys[first]
+        length = dx * dx + dy * dy
+        farthest, farthest_distance = None, squared_tolerance
+        for index in range(first + 1, last):
+            px, py = xs[index] - xs[first], ys[index] - ys[first]
+            if length > 0:
+                # Distância ao segmento (projeção limitada aos extremos)
+                t = min(max((px * dx + py * dy) / length, 0.0), 1.0)
+                px, py = px - t * dx, py - t * dy
+            distance = px * px + py * py
+            if distance > farthest_distance:
+                farthest, farthest_distance = index, distance
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [list(point[:2]) for point, kept in zip(points, keep) if kept]
+
+
+class SimplifiedGeometryCache:
+    """
+    Geometrias simplificadas por (rua, zoom) num LRU em memória. A geometria de uma
+    rua não muda depois de criada e os ids não são reaproveitados (AUTOINCREMENT),
+    então as entradas só saem por limite de tamanho.
+    """
+
+    def __init__(self, max_entries=100000, pixels=1.0):
+        self.max_entries = max_entries
+        self.pixels = pixels
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, street_id, zoom, coordinates):
+        """Coordenadas da rua simplificadas para o zoom (calculadas uma vez por zoom)"""
+        key = (street_id, zoom)
+        with self._lock:
+            simplified = self._entries.get(key)
+            if simplified is not None:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.inc(cache='simplified_geometry', result='hit')
+                return simplified
+        CACHE_REQUESTS.inc(cache='simplified_geometry', result='miss')
+
+        points = coordinates_to_list(coordinates)
+        latitude = sum(point[0] for point in points) / len(points) if points else 0.0
+        simplified = simplify_coordinates(points, zoom_tolerance(zoom, latitude, self.pixels))
+        with self._lock:
+            self._entries[key] = simplified
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return simplified
@@ -0,0 +1,158 @@
+class StreetRecord:
+    """Rua compacta (sem __dict__), lida do banco uma vez por revisão da rede"""
+    __slots__ = ('id', 'name', 'coordinates', 'length_km', 'lanes', 'vehicles_per_hour', 'average_speed')
+
+    def __init__(self, id, name=None, coordinates=None, length_km=0.1, lanes=2, vehicles_per_hour=500, average_speed=50):
+        self.id = id
+        self.name = name if name is not None else 'Rua ' + str(id)
+        self.coordinates = coordinates if coordinates is not None else []
+        self.length_km = length_km
+        self.lanes = lanes
+        self.vehicles_per_hour = vehicles_per_hour
+        self.average_speed = average_speed
+
+    @classmethod
+    def from_dict(cls, street):
+        return cls(street['id'], street.get('name'), street.get('coordinates'), street.get('length_km', 0.1),
+                   street.get('lanes', 2), street.get('vehicles_per_hour', 500), street.get('average_speed', 50))
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class TrafficLightRecord:
+    """Semáforo de uma rua em uma intersecção"""
+    __slots__ = ('intersection_id', 'street_id', 'green_time', 'cycle_time')
+
+    def __init__(self, intersection_id, street_id, green_time=45, cycle_time=90):
+        self.intersection_id = intersection_id
+        self.street_id = street_id
+        self.green_time = green_time
+        self.cycle_time = cycle_time
+
+    @classmethod
+    def from_dict(cls, light):
+        return cls(light['intersection_id'], light['street_id'], light.get('green_time', 45), light.get('cycle_time', 90))
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def intersection_key(intersection_id):
+    """Chave de intersecção independente da ordem dos ids (o frontend ordena como texto)"""
+    return frozenset(str(intersection_id).split('_', 1)[-1].split('-'))
+
+
+def intersection_street_ids(intersection_id):
+    """Ids das ruas de 'intersection_<a>-<b>' em ordem numérica; ValueError se o id for inválido"""
+    prefix, _, streets = str(intersection_id).partition('_')
+    if prefix != 'intersection' or not streets:
+        raise ValueError(f'id de intersecção inválido: {intersection_id}')
+    return tuple(sorted(int(street_id) for street_id in streets.split('-')))
+
+
+class NetworkSnapshot:
+    """
+    Rede compilada uma vez por revisão: registros compactos de ruas e semáforos,
+    mapas id → índice e bitmap de ruas com semáforo, para consultas O(1)
+    """
+    __slots__ = ('revision', 'streets', 'traffic_lights', 'intersections',
+                 'street_index', 'light_bitmap', 'lights_by_approach', 'road_graph')
+
+    def __init__(self, streets, traffic_lights=(), intersections=(), revision=None):
+        self.revision = revision
+        self.streets = [street if isinstance(street, StreetRecord) else StreetRecord.from_dict(street)
+                        for street in streets]
+        self.traffic_lights = [light if isinstance(light, TrafficLightRecord) else TrafficLightRecord.from_dict(light)
+                               for light in traffic_lights]
+        self.intersections = list(intersections)
+        self.road_graph = None  # RoadGraph compilado sob demanda (simulation.road_graph)
+
+        self.street_index = {street.id: index for index, street in enumerate(self.streets)}
+
+        # 1 byte por rua: a rua tem semáforo em alguma intersecção
+        self.light_bitmap = bytearray(len(self.streets))
+        self.lights_by_approach = {}
+        for light in self.traffic_lights:
+            index = self.street_index.get(light.street_id)
+            if index is not None:
+                self.light_bitmap[index] = 1
+            self.lights_by_approach[(intersection_key(light.intersection_id), light.street_id)] = light
+
+    @classmethod
+    def coerce(cls, streets, traffic_lights=()):
+        """Aceita um snapshot pronto ou listas de dicionários (chamadas antigas)"""
+        if isinstance(streets, cls):
+            return streets
+        return cls(streets, traffic_lights)
+
+    def street(self, street_id):
+        """Registro da rua pelo id, ou None"""
+        index = self.street_index.get(street_id)
+        return self.streets[index] if index is not None else None
+
+    def has_traffic_light(self, street_id):
+        """A rua tem semáforo em alguma intersecção"""
+        index = self.street_index.get(street_id)
+        return index is not None and self.light_bitmap[index] == 1
+
+    def light_at(self, intersection_id, street_id):
+        """Semáforo da rua naquela intersecção, ou None"""
+        return self.lights_by_approach.get((intersection_key(intersection_id), street_id))
+
+
+class NetworkOverlay(NetworkSnapshot):
+    """
+    Cenário sobre um NetworkSnapshot sem copiar a rede: ruas, intersecções e índices
+    são os da base; o overlay guarda só os semáforos e as ruas alterados (copy-on-write).
+    Aceito pelos simuladores de intersecção (que consultam street e light_at) no lugar do snapshot.
+    """
+    __slots__ = ('base', 'light_overrides', 'street_overrides')
+
+    def __init__(self, base, lights=None, streets=None):
+        """
+        `lights` é {(intersection_id, street_id): TrafficLightRecord ou None (removido)};
+        `streets` é {street_id: StreetRecord} com as ruas alteradas
+        """
+        self.base = base
+        self.revision = base.revision
+        self.streets = base.streets
+        self.intersections = base.intersections
+        self.street_index = base.street_index
+        self.road_graph = None  # capacidades mudam com os semáforos: grafo próprio
+        self.street_overrides = dict(streets or {})
+        self.light_overrides = {(intersection_key(intersection_id), street_id): light
+                                for (intersection_id, street_id), light in (lights or {}).items()}
+        self.lights_by_approach = base.lights_by_approach
+        self.traffic_lights = base.traffic_lights
+        self.light_bitmap = base.light_bitmap
+        if not self.light_overrides:
+            return
+
+        # Bitmap copiado só quando os semáforos mudam: a rua tem semáforo se restar algum
+        self.light_bitmap = bytearray(base.light_bitmap)
+        remaining = {}
+        for key, light in base.lights_by_approach.items():
+            if key not in self.light_overrides:
+                remaining[light.street_id] = remaining.get(light.street_id, 0) + 1
+        for (_, street_id), light in self.light_overrides.items():
+            if light is not None:
+                remaining[street_id] = remaining.get(street_id, 0) + 1
+        for _, street_id in self.light_overrides:
+            index = self.street_index.get(street_id)
+            if index is not None:
+                self.light_bitmap[index] = 1 if remaining.get(street_id) else 0
+
+        self.traffic_lights = [light for key, light in base.lights_by_approach.items()
+                               if key not in self.light_overrides]
+        self.traffic_lights.extend(light for light in self.light_overrides.values() if light is not None)
+
+    def street(self, street_id):
+        street = self.street_overrides.get(street_id)
+        return street if street is not None else self.base.street(street_id)
+
+    def light_at(self, intersection_id, street_id):
+        key = (intersection_key(intersection_id), street_id)
+        if key in self.light_overrides:
+            return self.light_overrides[key]
+        return self.lights_by_approach.get(key)
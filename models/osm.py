@@ -0,0 +1,197 @@
+import bz2
+import gzip
+import re
+import xml.etree.ElementTree as ET
+from array import array
+
+import numpy as np
+
+# highway → (faixas, velocidade média em km/h, veículos/hora) usados quando a via não informa
+HIGHWAY_DEFAULTS = {
+    'motorway': (3, 90, 1800),
+    'trunk': (3, 70, 1500),
+    'primary': (2, 50, 1000),
+    'secondary': (2, 45, 800),
+    'tertiary': (2, 40, 600),
+    'unclassified': (1, 35, 300),
+    'residential': (1, 30, 200),
+    'living_street': (1, 15, 80),
+    'service': (1, 20, 100)
+}
+LINK_SUFFIX = '_link'  # acessos (motorway_link, ...) usam a classe principal com uma faixa
+MPH_TO_KMH = 1.609344
+NODE_CHUNK = 65536     # nós acumulados antes de cada busca vetorizada nas refs
+JUNCTION_DECIMALS = 7  # casas decimais ao comparar pontos de junção (~1 cm em graus)
+
+
+def open_extract(path):
+    """Abre o extrato em binário, descompactando .gz e .bz2 em fluxo"""
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def parse_lanes(value, default):
+    """'2', '3;2' (por trecho), ' 4 ' → primeiro inteiro positivo; senão o padrão da classe"""
+    match = re.match(r'\s*(\d+)', value or '')
+    lanes = int(match.group(1)) if match else 0
+    return lanes if lanes > 0 else default
+
+
+def parse_speed(value, default):
+    """maxspeed em km/h: '50', '50 km/h', '30 mph'; valores simbólicos ('BR:urban', 'walk') usam o padrão"""
+    match = re.match(r'\s*(\d+(?:\.\d+)?)\s*(mph)?', value or '')
+    if not match:
+        return default
+    speed = float(match.group(1)) * (MPH_TO_KMH if match.group(2) else 1)
+    return round(speed, 1) if speed > 0 else default
+
+
+def highway_attributes(highway, tags):
+    """(faixas, velocidade média, veículos/hora) de uma via, a partir de highway, lanes e maxspeed"""
+    base = highway[:-len(LINK_SUFFIX)] if highway.endswith(LINK_SUFFIX) else highway
+    lanes, speed, vehicles_per_hour = HIGHWAY_DEFAULTS[base]
+    if highway != base:
+        lanes, vehicles_per_hour = 1, vehicles_per_hour // 2
+    return parse_lanes(tags.get('lanes'), lanes), parse_speed(tags.get('maxspeed'), speed), vehicles_per_hour
+
+
+
+def merge_shared_vertices(intersections):
+    """
+    Uma intersecção por par de ruas e ponto. Duas vias que compartilham um nó interno se
+    tocam ali em quatro pares de segmentos, e cada par reporta o mesmo ponto.
+    """
+    unique, seen = [], set()
+    for intersection in intersections:
+        point = intersection['point']
+        key = (*intersection['streets'], round(point[0], JUNCTION_DECIMALS), round(point[1], JUNCTION_DECIMALS))
+        if key not in seen:
+            seen.add(key)
+            unique.append(intersection)
+    return unique
+
+
+class OSMStreetReader:
+    """
+    Ruas de um extrato OpenStreetMap em XML (.osm, .osm.gz ou .osm.bz2), lidas em fluxo
+    com iterparse em duas passadas, limpando cada elemento depois de lido:
+
+    1. vias com highway de veículos: só as refs dos nós (array compacto) e as tags usadas;
+    2. coordenadas apenas dos nós referenciados por essas vias, em arrays NumPy.
+
+    A memória cresce com o número de nós das vias importadas, não com o tamanho do arquivo.
+    """
+
+    def __init__(self, path, highways=None):
+        self.path = path
+        self.highways = set(highways) if highways is not None else (
+            set(HIGHWAY_DEFAULTS) | {name + LINK_SUFFIX for name in ('motorway', 'trunk', 'primary', 'secondary',
+                                                                       'tertiary')})
+        self.way_count = 0
+        self.skipped = 0  # vias com menos de dois nós presentes no extrato
+
+    def _elements(self, tag):
+        """Elementos `tag` de primeiro nível; o documento é esvaziado a cada elemento lido"""
+        with open_extract(self.path) as source:
+            context = ET.iterparse(source, events=('start', 'end'))
+            _, root = next(context)
+            for event, element in context:
+                if event != 'end' or element.tag not in ('node', 'way', 'relation'):
+                    continue
+                if element.tag == tag:
+                    yield element
+                elif tag == 'node' and element.tag == 'way':
+                    yield element  # fim dos nós num arquivo ordenado (ver _node_coordinates)
+                root.clear()
+
+    def _read_ways(self):
+        """Passada 1: (refs concatenadas, início de cada via, [(id, highway, tags)])"""
+        refs = array('q')
+        starts = array('q', [0])
+        ways = []
+        for way in self._elements('way'):
+            tags = {tag.get('k'): tag.get('v') for tag in way.iter('tag')}
+            highway = tags.get('highway')
+            if highway not in self.highways or tags.get('area') == 'yes':
+                continue
+            way_refs = [int(nd.get('ref')) for nd in way.iter('nd')]
+            if len(way_refs) < 2:
+                continue
+            refs.extend(way_refs)
+            starts.append(len(refs))
+            ways.append((int(way.get('id')), highway,
+                         {key: tags[key] for key in ('name', 'ref', 'lanes', 'maxspeed') if key in tags}))
+        return np.frombuffer(refs, dtype=np.int64), np.frombuffer(starts, dtype=np.int64), ways
+
+    def _node_coordinates(self, needed):
+        """Passada 2: lat/lon (NaN se ausente) de cada id em `needed` (ordenado, sem repetição)"""
+        lat = np.full(len(needed), np.nan)
+        lon = np.full(len(needed), np.nan)
+        found = 0
+        ids, lats, lons = array('q'), array('d'), array('d')
+
+        def flush():
+            nonlocal found
+            chunk = np.array(ids, dtype=np.int64)
+            position = np.minimum(np.searchsorted(needed, chunk), len(needed) - 1)
+            hit = needed[position] == chunk
+            found += int(np.count_nonzero(hit & np.isnan(lat[position])))
+            lat[position[hit]] = np.array(lats, dtype=float)[hit]
+            lon[position[hit]] = np.array(lons, dtype=float)[hit]
+            del ids[:], lats[:], lons[:]
+
+        for element in self._elements('node'):
+            if element.tag == 'way':
+                # Extratos do OSM trazem todos os nós antes das vias: se já temos tudo, para aqui
+                flush()
+                if found == len(needed):
+                    break
+                continue
+            ids.append(int(element.get('id')))
+            lats.append(float(element.get('lat')))
+            lons.append(float(element.get('lon')))
+            if len(ids) >= NODE_CHUNK:
+                flush()
+        if ids:
+            flush()
+        return lat, lon
+
+    def streets(self, progress=None):
+        """
+        Gera as ruas no formato de insert_streets (name, coordinates, lanes, vehicles_per_hour,
+        average_speed, osm_id). `progress` recebe a fração concluída (0,3 após cada passada).
+        """
+        refs, starts, ways = self._read_ways()
+        self.way_count = len(ways)
+        if progress is not None:
+            progress(0.3)
+        if not ways:
+            return
+
+        needed = np.unique(refs)
+        lat, lon = self._node_coordinates(needed)
+        if progress is not None:
+            progress(0.6)
+
+        position = np.searchsorted(needed, refs)
+        points = np.column_stack((lat[position], lon[position]))
+        present = ~np.isnan(points[:, 0])
+        for index, (way_id, highway, tags) in enumerate(ways):
+            start, end = starts[index], starts[index + 1]
+            # Vias que saem do recorte perdem os nós de fora
+            coordinates = points[start:end][present[start:end]]
+            if len(coordinates) < 2:
+                self.skipped += 1
+                continue
+            lanes, average_speed, vehicles_per_hour = highway_attributes(highway, tags)
+            yield {
+                'name': f"{tags.get('name') or tags.get('ref') or f'{highway} {way_id}'} (Real)",
+                'coordinates': coordinates.tolist(),
+                'lanes': lanes,
+                'vehicles_per_hour': vehicles_per_hour,
+                'average_speed': average_speed,
+                'osm_id': way_id
+            }
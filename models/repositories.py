@@ -0,0 +1,324 @@
+import json
+
+from models.demand import pack_profile, unpack_profile
+from models.geometry import bounding_box, coordinates_to_list, pack_coordinates, unpack_coordinates
+from models.network import StreetRecord, TrafficLightRecord
+
+
+def fetch_by_ids(cursor, query, ids, chunk_size=500):
+    """Executa `query` (com {placeholders}) em lotes de ids, respeitando o limite de parâmetros do SQLite"""
+    ids = list(ids)
+    rows = []
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        cursor.execute(query.format(placeholders=', '.join('?' * len(chunk))), chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+class StreetRepository:
+    """Consultas da tabela streets"""
+    COLUMNS = 'id, name, geometry, length_km, lanes, vehicles_per_hour, average_speed'
+
+    @staticmethod
+    def to_record(row):
+        return StreetRecord(row['id'], row['name'], unpack_coordinates(row['geometry']), row['length_km'],
+                            row['lanes'], row['vehicles_per_hour'], row['average_speed'])
+
+    @staticmethod
+    def to_geometry(row):
+        """Somente o necessário para cálculo de intersecções"""
+        return {'id': row['id'], 'name': row['name'], 'coordinates': unpack_coordinates(row['geometry'])}
+
+    def insert(self, cursor, name, coordinates, length_km, lanes=2, vehicles_per_hour=500, average_speed=50):
+        cursor.execute('''
+            INSERT INTO streets (name, geometry, length_km, lanes, vehicles_per_hour, average_speed)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, pack_coordinates(coordinates), length_km, lanes, vehicles_per_hour, average_speed))
+        street_id = cursor.lastrowid
+        self.index_bounds(cursor, [(street_id, coordinates)])
+        return street_id
+
+    def insert_many(self, cursor, streets):
+        """
+        Insere (name, coordinates, length_km, lanes, vehicles_per_hour, average_speed) em lote
+        e retorna os ids na mesma ordem. Deve rodar numa transação de escrita.
+        """
+        cursor.executemany('''
+            INSERT INTO streets (name, geometry, length_km, lanes, vehicles_per_hour, average_speed)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(name, pack_coordinates(coordinates), length_km, lanes, vehicles_per_hour, average_speed)
+              for name, coordinates, length_km, lanes, vehicles_per_hour, average_speed in streets])
+
+        # A transação segura o lock de escrita: os ids mais altos são os recém-inseridos
+        cursor.execute('SELECT id FROM streets ORDER BY id DESC LIMIT ?', (len(streets),))
+        street_ids = [row['id'] for row in reversed(cursor.fetchall())]
+        self.index_bounds(cursor, [(street_id, street[1]) for street_id, street in zip(street_ids, streets)])
+        return street_ids
+
+    def index_bounds(self, cursor, streets):
+        """Grava a caixa envolvente de cada (id, coordinates) no índice espacial street_bbox"""
+        boxes = [(street_id, bounding_box(coordinates)) for street_id, coordinates in streets]
+        cursor.executemany('INSERT OR REPLACE INTO street_bbox (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)',
+                           [(street_id, *box) for street_id, box in boxes if box is not None])
+
+    def delete(self, cursor, street_id):
+        """Remove a rua junto com seus semáforos e intersecções"""
+        cursor.execute('DELETE FROM streets WHERE id = ?', (street_id,))
+        cursor.execute('DELETE FROM street_bbox WHERE id = ?', (street_id,))
+        cursor.execute('DELETE FROM intersection_traffic_lights WHERE street_id = ?', (street_id,))
+        cursor.execute('DELETE FROM intersections WHERE street_a_id = ? OR street_b_id = ?', (street_id, street_id))
+        cursor.execute('DELETE FROM street_demand_profiles WHERE street_id = ?', (street_id,))
+
+    def list_with_light_flag(self, cursor):
+        """Ruas mais recentes primeiro, com has_traffic_light via agregação (sem subconsulta por linha)"""
+        cursor.execute(f'''
+            SELECT {', '.join('s.' + column for column in self.COLUMNS.split(', '))},
+                   tl.street_id IS NOT NULL AS has_traffic_light
+            FROM streets s
+            LEFT JOIN (SELECT DISTINCT street_id FROM intersection_traffic_lights) tl ON tl.street_id = s.id
+            ORDER BY s.created_at DESC
+        ''')
+        return [{
+            'id': row['id'],
+            'name': row['name'],
+            'coordinates': coordinates_to_list(unpack_coordinates(row['geometry'])),
+            'length_km': row['length_km'],
+            'lanes': row['lanes'],
+            'vehicles_per_hour': row['vehicles_per_hour'],
+            'average_speed': row['average_speed'],
+            'has_traffic_light': bool(row['has_traffic_light'])
+        } for row in cursor.fetchall()]
+
+    def page(self, cursor, bbox=None, after_id=0, limit=500, min_extent=(0.0, 0.0)):
+        """
+        Até `limit` ruas com id > after_id, em ordem de id (paginação por cursor), com a
+        geometria ainda compactada. Com bbox [min_lat, min_lon, max_lat, max_lon], só as
+        que cruzam a caixa (índice street_bbox), ignorando as menores que `min_extent`
+        (graus de latitude, graus de longitude) nos dois eixos.
+        """
+        columns = ', '.join('s.' + column for column in self.COLUMNS.split(', '))
+        # Poucas linhas por página: subconsulta pelo índice de street_id em vez de agregar a tabela inteira
+        light_flag = 'EXISTS (SELECT 1 FROM intersection_traffic_lights tl WHERE tl.street_id = s.id) AS has_traffic_light'
+        if bbox is None:
+            cursor.execute(f'''
+                SELECT {columns}, {light_flag} FROM streets s
+                WHERE s.id > ? ORDER BY s.id LIMIT ?
+            ''', (after_id, limit))
+        else:
+            cursor.execute(f'''
+                SELECT {columns}, {light_flag}
+                FROM street_bbox b JOIN streets s ON s.id = b.id
+                WHERE b.max_lat >= ? AND b.min_lat <= ? AND b.max_lon >= ? AND b.min_lon <= ?
+                  AND b.id > ? AND (b.max_lat - b.min_lat >= ? OR b.max_lon - b.min_lon >= ?)
+                ORDER BY b.id LIMIT ?
+            ''', (bbox[0], bbox[2], bbox[1], bbox[3], after_id, *min_extent, limit))
+        return cursor.fetchall()
+
+    def all_records(self, cursor):
+        cursor.execute(f'SELECT {self.COLUMNS} FROM streets')
+        return [self.to_record(row) for row in cursor.fetchall()]
+
+    def records_by_ids(self, cursor, street_ids):
+        return [self.to_record(row) for row in
+                fetch_by_ids(cursor, f'SELECT {self.COLUMNS} FROM streets WHERE id IN ({{placeholders}})', street_ids)]
+
+    def geometries(self, cursor, exclude_id=None, before_id=None):
+        """Geometria das ruas (todas, exceto uma, ou anteriores a um id)"""
+        if exclude_id is not None:
+            cursor.execute('SELECT id, name, geometry FROM streets WHERE id != ?', (exclude_id,))
+        elif before_id is not None:
+            cursor.execute('SELECT id, name, geometry FROM streets WHERE id < ?', (before_id,))
+        else:
+            cursor.execute('SELECT id, name, geometry FROM streets')
+        return [self.to_geometry(row) for row in cursor.fetchall()]
+
+    def geometries_near(self, cursor, coordinates_list, before_id, padding=1e-9):
+        """
+        Geometria, em ordem de id, das ruas anteriores a before_id cuja caixa envolvente
+        (índice street_bbox) toca a de alguma das linhas em `coordinates_list`
+        """
+        street_ids = set()
+        for coordinates in coordinates_list:
+            box = bounding_box(coordinates)
+            if box is None:
+                continue
+            cursor.execute('''
+                SELECT id FROM street_bbox
+                WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ? AND id < ?
+            ''', (box[0] - padding, box[1] + padding, box[2] - padding, box[3] + padding, before_id))
+            street_ids.update(row['id'] for row in cursor.fetchall())
+        rows = fetch_by_ids(cursor, 'SELECT id, name, geometry FROM streets WHERE id IN ({placeholders})',
+                            sorted(street_ids))
+        return [self.to_geometry(row) for row in sorted(rows, key=lambda row: row['id'])]
+
+
+class TrafficLightRepository:
+    """Consultas da tabela intersection_traffic_lights"""
+
+    @staticmethod
+    def to_record(row):
+        return TrafficLightRecord(row['intersection_id'], row['street_id'], row['green_time'], row['cycle_time'])
+
+    def exists(self, cursor, intersection_id, street_id):
+        cursor.execute('''
+            SELECT 1 FROM intersection_traffic_lights
+            WHERE intersection_id = ? AND street_id = ?
+        ''', (intersection_id, street_id))
+        return cursor.fetchone() is not None
+
+    def insert(self, cursor, intersection_id, street_id, cycle_time, green_time):
+        cursor.execute('''
+            INSERT INTO intersection_traffic_lights
+            (intersection_id, street_id, cycle_time, green_time)
+            VALUES (?, ?, ?, ?)
+        ''', (intersection_id, street_id, cycle_time, green_time))
+        return cursor.lastrowid
+
+    def delete(self, cursor, intersection_id, street_id):
+        cursor.execute('''
+            DELETE FROM intersection_traffic_lights
+            WHERE intersection_id = ? AND street_id = ?
+        ''', (intersection_id, street_id))
+
+    def list_with_street_names(self, cursor, intersection_id=None):
+        query = '''
+            SELECT itl.id, itl.intersection_id, itl.street_id, itl.cycle_time, itl.green_time,
+                   s.name AS street_name
+            FROM intersection_traffic_lights itl
+            JOIN streets s ON itl.street_id = s.id
+        '''
+        if intersection_id:
+            cursor.execute(query + ' WHERE itl.intersection_id = ?', (intersection_id,))
+        else:
+            cursor.execute(query)
+        return [{
+            'id': row['id'],
+            'intersection_id': row['intersection_id'],
+            'street_id': row['street_id'],
+            'street_name': row['street_name'],
+            'cycle_time': row['cycle_time'],
+            'green_time': row['green_time']
+        } for row in cursor.fetchall()]
+
+    def all_records(self, cursor):
+        cursor.execute('SELECT intersection_id, street_id, cycle_time, green_time FROM intersection_traffic_lights')
+        return [self.to_record(row) for row in cursor.fetchall()]
+
+    def records_for_streets(self, cursor, street_ids):
+        return [self.to_record(row) for row in fetch_by_ids(cursor, '''
+            SELECT intersection_id, street_id, cycle_time, green_time
+            FROM intersection_traffic_lights WHERE street_id IN ({placeholders})
+        ''', street_ids)]
+
+
+class IntersectionRepository:
+    """Consultas da tabela intersections (pré-calculada)"""
+
+    def save(self, cursor, intersections):
+        """Grava intersecções no formato de MapManager.find_intersections"""
+        cursor.executemany('''
+            INSERT INTO intersections (street_a_id, street_b_id, lat, lon)
+            VALUES (?, ?, ?, ?)
+        ''', [(i['streets'][0], i['streets'][1], i['point'][0], i['point'][1]) for i in intersections])
+
+    def _load(self, cursor, condition=None, params=()):
+        cursor.execute(f'''
+            SELECT i.lat, i.lon, i.street_a_id, i.street_b_id, sa.name AS name_a, sb.name AS name_b
+            FROM intersections i
+            JOIN streets sa ON sa.id = i.street_a_id
+            JOIN streets sb ON sb.id = i.street_b_id
+            {'WHERE ' + condition if condition else ''}
+            ORDER BY i.street_a_id, i.street_b_id, i.id
+        ''', params)
+        return [{
+            'point': [row['lat'], row['lon']],
+            'streets': [row['street_a_id'], row['street_b_id']],
+            'street_names': [row['name_a'], row['name_b']],
+            'type': 'INTERSECTION'
+        } for row in cursor.fetchall()]
+
+    def all(self, cursor):
+        return self._load(cursor)
+
+    def for_street_pairs(self, cursor, street_pairs):
+        """Intersecções entre os pares de ruas informados (em qualquer ordem)"""
+        pairs = [pair for a, b in street_pairs for pair in ((a, b), (b, a))]
+        condition = '(i.street_a_id, i.street_b_id) IN (VALUES {})'.format(', '.join(['(?, ?)'] * len(pairs)))
+        return self._load(cursor, condition, [street_id for pair in pairs for street_id in pair])
+
+    def for_streets(self, cursor, street_ids):
+        """Intersecções que envolvem alguma das ruas"""
+        street_ids = list(street_ids)
+        intersections = {}
+        for start in range(0, len(street_ids), 400):
+            chunk = street_ids[start:start + 400]
+            placeholders = ', '.join('?' * len(chunk))
+            for intersection in self._load(cursor, f'i.street_a_id IN ({placeholders}) OR i.street_b_id IN ({placeholders})',
+                                           chunk + chunk):
+                intersections.setdefault((*intersection['streets'], *intersection['point']), intersection)
+        return list(intersections.values())
+
+    def in_bbox(self, cursor, bbox):
+        """Intersecções dentro de [min_lat, min_lon, max_lat, max_lon]"""
+        return self._load(cursor, 'i.lat BETWEEN ? AND ? AND i.lon BETWEEN ? AND ?',
+                          (bbox[0], bbox[2], bbox[1], bbox[3]))
+
+
+class DemandProfileRepository:
+    """Perfis de demanda por horário (tabela street_demand_profiles)"""
+
+    def save_many(self, cursor, profiles):
+        """Grava {street_id: perfil (BINS,)}, substituindo os existentes"""
+        cursor.executemany('INSERT OR REPLACE INTO street_demand_profiles (street_id, profile) VALUES (?, ?)',
+                           [(street_id, pack_profile(profile)) for street_id, profile in profiles.items()])
+
+    def delete(self, cursor, street_id):
+        cursor.execute('DELETE FROM street_demand_profiles WHERE street_id = ?', (street_id,))
+        return cursor.rowcount > 0
+
+    def get(self, cursor, street_id):
+        cursor.execute('SELECT profile FROM street_demand_profiles WHERE street_id = ?', (street_id,))
+        row = cursor.fetchone()
+        return unpack_profile(row['profile']) if row else None
+
+    def for_streets(self, cursor, street_ids):
+        """{street_id: perfil} das ruas que têm perfil gravado"""
+        return {row['street_id']: unpack_profile(row['profile']) for row in fetch_by_ids(cursor, '''
+            SELECT street_id, profile FROM street_demand_profiles WHERE street_id IN ({placeholders})
+        ''', street_ids)}
+
+
+class RevisionRepository:
+    """Contador de revisão da rede (tabela network_revision) e ruas alteradas em cada uma (network_changes)"""
+    HISTORY = 1000  # revisões mantidas em network_changes
+
+    def current(self, cursor):
+        cursor.execute('SELECT revision FROM network_revision WHERE id = 1')
+        return cursor.fetchone()['revision']
+
+    def bump(self, cursor, street_ids=None):
+        """
+        Incrementa a revisão; chamar na mesma transação da escrita. `street_ids` são as ruas
+        cujos dados, semáforos ou intersecções mudaram (None: desconhecidas). Retorna a nova revisão.
+        """
+        cursor.execute('UPDATE network_revision SET revision = revision + 1 WHERE id = 1')
+        revision = self.current(cursor)
+        cursor.execute('INSERT OR REPLACE INTO network_changes (revision, street_ids) VALUES (?, ?)',
+                       (revision, json.dumps(sorted({int(street_id) for street_id in street_ids}))
+                        if street_ids is not None else None))
+        cursor.execute('DELETE FROM network_changes WHERE revision <= ?', (revision - self.HISTORY,))
+        return revision
+
+    def changed_streets(self, cursor, since_revision):
+        """
+        Ruas alteradas depois de `since_revision`, ou None se alguma revisão do intervalo
+        não registrou as ruas (ou já saiu do histórico)
+        """
+        current = self.current(cursor)
+        cursor.execute('SELECT street_ids FROM network_changes WHERE revision > ? ORDER BY revision',
+                       (since_revision,))
+        rows = cursor.fetchall()
+        if len(rows) != current - since_revision or any(row['street_ids'] is None for row in rows):
+            return None
+        return {street_id for row in rows for street_id in json.loads(row['street_ids'])}
@@ -0,0 +1,95 @@
+import gzip
+import threading
+
+from metrics import CACHE_REQUESTS
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só gzip é oferecido
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024  # corpos menores vão sem compressão
+
+COMPRESSORS = {'gzip': lambda body: gzip.compress(body, compresslevel=6)}
+if brotli is not None:
+    COMPRESSORS['br'] = lambda body: brotli.compress(body, quality=5)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Melhor codificação aceita pelo cliente (cabeçalho Accept-Encoding): 'br' quando
+    disponível, senão 'gzip', senão None. Codificações com q=0 são recusadas.
+    """
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    for encoding in ('br', 'gzip'):
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in COMPRESSORS and quality > 0:
+            return encoding
+    return None
+
+
+def encode(body, encoding):
+    """(corpo, codificação usada): corpos pequenos ou sem codificação aceita vão como estão"""
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    return COMPRESSORS[encoding](body), encoding
+
+
+class ResponseCache:
+    """
+    Corpos JSON das rotas de leitura da rede, por URL, válidos enquanto a revisão da rede
+    não muda. Cada corpo é serializado uma vez e comprimido uma vez por codificação.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.revision = None
+        self._bodies = {}  # url → {codificação pedida: (corpo, codificação usada)}
+        self._lock = threading.Lock()
+
+    def get(self, key, revision, encoding=None):
+        """(corpo, codificação usada) para a URL nesta revisão, comprimido uma vez por codificação; None se ausente"""
+        with self._lock:
+            variants = self._bodies.get(key) if revision == self.revision else None
+            if variants is None:
+                CACHE_REQUESTS.inc(cache='response_body', result='miss')
+                return None
+            CACHE_REQUESTS.inc(cache='response_body', result='hit')
+            if encoding in variants:
+                return variants[encoding]
+            raw = variants[None][0]
+
+        encoded = encode(raw, encoding)
+        with self._lock:
+            if revision == self.revision and key in self._bodies:
+                self._bodies[key][encoding] = encoded
+        return encoded
+
+    def put(self, key, revision, body, encoding=None):
+        """
+        Guarda o JSON serializado (uma revisão nova descarta todos os corpos anteriores)
+        e retorna (corpo, codificação usada) na codificação pedida
+        """
+        encoded = encode(body, encoding)
+        with self._lock:
+            if self.revision is not None and revision < self.revision:
+                return encoded  # resposta de uma revisão já superada
+            if revision != self.revision:
+                self._bodies.clear()
+                self.revision = revision
+            if len(self._bodies) >= self.max_entries:
+                self._bodies.pop(next(iter(self._bodies)))
+            self._bodies[key] = {None: (body, None), encoding: encoded}
+        return encoded
@@ -0,0 +1,262 @@
+import heapq
+from collections import defaultdict
+
+import numpy as np
+
+from simulation.road_graph import RoadGraph
+from simulation_engine import haversine_km
+
+INFINITY = float('inf')
+
+
+class TrafficAssignment:
+    """
+    Alocação de uma matriz origem–destino (entre intersecções) na rede, no equilíbrio
+    do usuário: Frank–Wolfe com tempos de viagem BPR e caminhos mínimos por A*.
+
+    Os arcos são as arestas do RoadGraph (e, com two_way, também no sentido contrário).
+    O tempo livre vem de length_km e average_speed; a capacidade é a da aproximação
+    em que o arco termina (semáforo reduz a capacidade pela fração de verde).
+    """
+    BPR_ALPHA = 0.15
+    BPR_BETA = 4
+    MAX_ITERATIONS = 50
+    GAP = 1e-4           # gap relativo para parar
+    LINE_SEARCH_STEPS = 30
+
+    def __init__(self, network, two_way=True, max_iterations=None, gap=None):
+        self.network = network
+        self.graph = graph = RoadGraph.of(network)
+        self.max_iterations = max_iterations or self.MAX_ITERATIONS
+        self.gap = gap if gap is not None else self.GAP
+        self._heuristics = {}
+
+        speeds = np.array([max(street.average_speed, 1) for street in network.streets], dtype=float)
+        tail = graph.approach_node[graph.edge_source]
+        head = graph.indices
+        approach = graph.edge_target
+        free_time = graph.edge_length_km / speeds[graph.edge_street] * 3600  # segundos
+        if two_way:
+            # Sentido contrário: chega à aproximação da mesma rua no nó de origem
+            tail, head = np.concatenate((tail, head)), np.concatenate((head, tail))
+            approach = np.concatenate((approach, graph.edge_source))
+            free_time = np.concatenate((free_time, free_time))
+
+        extra = self._continuations(speeds, two_way)
+        tail, head, approach, free_time = (np.concatenate((values, np.asarray(added, dtype=values.dtype)))
+                                           for values, added in zip((tail, head, approach, free_time), extra))
+
+        # Arcos ordenados pelo nó de saída (CSR nó → arcos)
+        order = np.argsort(tail, kind='stable')
+        self.link_tail = tail[order]
+        self.link_head = head[order]
+        self.link_approach = approach[order]
+        self.link_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.link_tail, minlength=graph.node_count))))
+        # Cópias em listas para o laço do A* (indexar arrays elemento a elemento é lento)
+        self._adjacency = (self.link_ptr.tolist(), self.link_head.tolist(), self.link_tail.tolist())
+
+        self.free_time = free_time[order]
+        self.capacity = np.maximum(graph.capacity()[self.link_approach], 1.0)
+
+        # Heurística do A*: distância em linha reta × o menor tempo por km entre os arcos,
+        # limite inferior do tempo restante mesmo com congestionamento (admissível e consistente)
+        straight = haversine_km(graph.node_point[self.link_tail], graph.node_point[self.link_head])
+        valid = straight > 0
+        self.seconds_per_km = float(np.min(self.free_time[valid] / straight[valid])) if valid.any() else 0.0
+
+    def _continuations(self, speeds, two_way):
+        """
+        Arcos entre ruas que continuam uma à outra (uma termina onde a outra começa, sem
+        cruzamento no ponto): da última intersecção de uma à primeira da outra.
+        Retorna listas (origem, destino, aproximação de chegada, tempo livre).
+        """
+        graph = self.graph
+        streets = self.network.streets
+        tails, heads, approaches, times = [], [], [], []
+
+        # Aproximações extremas de cada rua: (aproximação, distância em km até a ponta)
+        ends = {}
+        for k in np.flatnonzero(graph.upstream < 0).tolist():
+            street = streets[graph.approach_street[k]]
+            ends[(street.id, 0)] = (k, graph.approach_position[k] * street.length_km)
+        for k in np.flatnonzero(graph.downstream < 0).tolist():
+            street = streets[graph.approach_street[k]]
+            ends[(street.id, 1)] = (k, (1 - graph.approach_position[k]) * street.length_km)
+
+        # Ruas agrupadas pelas pontas (0 = início, 1 = fim) em cada ponto
+        by_point = defaultdict(list)
+        for (street_id, side), end in ends.items():
+            coordinates = streets[graph.network.street_index[street_id]].coordinates
+            point = coordinates[-1] if side else coordinates[0]
+            by_point[(round(float(point[0]), 7), round(float(point[1]), 7))].append((street_id, side, end))
+
+        for members in by_point.values():
+            for street_a, side_a, (approach_a, distance_a) in members:
+                for street_b, side_b, (approach_b, distance_b) in members:
+                    # Mão única: só do fim de uma rua para o início da seguinte
+                    if street_a == street_b or (not two_way and (side_a, side_b) != (1, 0)):
+                        continue
+                    tails.append(graph.approach_node[approach_a])
+                    heads.append(graph.approach_node[approach_b])
+                    approaches.append(approach_b)
+                    times.append((distance_a / speeds[graph.approach_street[approach_a]] +
+                                  distance_b / speeds[graph.approach_street[approach_b]]) * 3600)
+        return tails, heads, approaches, times
+
+    def travel_time(self, flow):
+        """Tempo de viagem BPR de cada arco (s) para o fluxo dado (veículos/hora)"""
+        return self.free_time * (1 + self.BPR_ALPHA * (flow / self.capacity) ** self.BPR_BETA)
+
+    def shortest_path(self, origin, destination, times, heuristic=None):
+        """Arcos do caminho de menor tempo entre dois nós (A*), ou None se não houver caminho"""
+        if hasattr(times, 'tolist'):
+            times = times.tolist()
+        if heuristic is None:
+            heuristic = self._heuristic(destination)
+        ptr, heads, _ = self._adjacency
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        best = {origin: 0.0}
+        parent = {}
+        heap = [(heuristic[origin], 0.0, origin)]
+        while heap:
+            _, cost, node = heappop(heap)
+            if node == destination:
+                return self._walk_back(parent, origin, destination)
+            if cost > best[node]:
+                continue  # entrada antiga do heap
+            for link in range(ptr[node], ptr[node + 1]):
+                neighbor = heads[link]
+                candidate = cost + times[link]
+                if candidate < best.get(neighbor, INFINITY):
+                    best[neighbor] = candidate
+                    parent[neighbor] = link
+                    heappush(heap, (candidate + heuristic[neighbor], candidate, neighbor))
+        return None
+
+    def shortest_path_tree(self, origin, destinations, times):
+        """
+        Dijkstra a partir de `origin`, parando quando todos os destinos foram fixados.
+        Retorna {destino: arcos do caminho} só para os destinos alcançáveis.
+        """
+        ptr, heads, _ = self._adjacency
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        pending = set(destinations)
+        best = {origin: 0.0}
+        parent = {}
+        heap = [(0.0, origin)]
+        while heap and pending:
+            cost, node = heappop(heap)
+            if cost > best[node]:
+                continue
+            pending.discard(node)
+            for link in range(ptr[node], ptr[node + 1]):
+                neighbor = heads[link]
+                candidate = cost + times[link]
+                if candidate < best.get(neighbor, INFINITY):
+                    best[neighbor] = candidate
+                    parent[neighbor] = link
+                    heappush(heap, (candidate, neighbor))
+        return {destination: self._walk_back(parent, origin, destination)
+                for destination in destinations if destination in best}
+
+    def _walk_back(self, parent, origin, destination):
+        tails = self._adjacency[2]
+        path = []
+        node = destination
+        while node != origin:
+            link = parent[node]
+            path.append(link)
+            node = tails[link]
+        return path[::-1]
+
+    def _heuristic(self, destination):
+        """Limite inferior do tempo (s) de cada nó até o destino, calculado uma vez por destino"""
+        heuristic = self._heuristics.get(destination)
+        if heuristic is None:
+            points = self.graph.node_point
+            distance = haversine_km(points, np.broadcast_to(points[destination], points.shape))
+            heuristic = self._heuristics[destination] = (distance * self.seconds_per_km).tolist()
+        return heuristic
+
+    def all_or_nothing(self, demand, times):
+        """
+        Toda a demanda de cada par no caminho mínimo com os tempos dados.
+        `demand` é uma lista de (origem, destino, veículos/hora). Retorna (fluxo por arco, pares sem caminho).
+        Origens com vários destinos usam uma única árvore de Dijkstra; pares isolados, A*.
+        """
+        flow = np.zeros(len(self.link_head))
+        unreachable = []
+        times = times.tolist()
+
+        by_origin = defaultdict(list)
+        for origin, destination, volume in demand:
+            if origin != destination:
+                by_origin[origin].append((destination, volume))
+
+        for origin, pairs in by_origin.items():
+            destinations = {destination for destination, _ in pairs}
+            if len(destinations) == 1:
+                destination = pairs[0][0]
+                paths = {destination: self.shortest_path(origin, destination, times)}
+            else:
+                paths = self.shortest_path_tree(origin, destinations, times)
+
+            for destination, volume in pairs:
+                path = paths.get(destination)
+                if path is None:
+                    unreachable.append((origin, destination, volume))
+                else:
+                    flow[path] += volume
+        return flow, unreachable
+
+    def assign(self, demand, progress=None):
+        """
+        Fluxos de equilíbrio por arco para a demanda [(origem, destino, veículos/hora)].
+        `progress` recebe a fração das iterações concluída.
+        """
+        flow, unreachable = self.all_or_nothing(demand, self.free_time)
+        # A conectividade não muda entre iterações: pares sem caminho saem da demanda
+        if unreachable:
+            missing = {(origin, destination) for origin, destination, _ in unreachable}
+            demand = [pair for pair in demand if (pair[0], pair[1]) not in missing]
+        relative_gap = 0.0
+        iterations = 0
+        for iterations in range(1, self.max_iterations + 1):
+            times = self.travel_time(flow)
+            target, _ = self.all_or_nothing(demand, times)
+
+            # Gap relativo: quanto o tempo total cairia se todos trocassem para o caminho mínimo atual
+            total = float(times @ flow)
+            relative_gap = (total - float(times @ target)) / total if total > 0 else 0.0
+            if progress is not None:
+                progress(iterations / self.max_iterations)
+            if relative_gap < self.gap:
+                break
+
+            step = self._line_search(flow, target - flow)
+            flow = flow + step * (target - flow)
+
+        return {
+            'link_flow': flow,
+            'iterations': iterations,
+            'relative_gap': relative_gap,
+            'total_travel_time': float(self.travel_time(flow) @ flow),
+            'unreachable': unreachable
+        }
+
+    def _line_search(self, flow, direction):
+        """Passo em [0, 1] que minimiza a função objetivo de Beckmann (bisseção na derivada)"""
+        low, high = 0.0, 1.0
+        for _ in range(self.LINE_SEARCH_STEPS):
+            middle = (low + high) / 2
+            if direction @ self.travel_time(flow + middle * direction) > 0:
+                high = middle
+            else:
+                low = middle
+        return (low + high) / 2
+
+    def approach_demand(self, link_flow):
+        """Fluxo alocado que chega a cada aproximação (veículos/hora), na ordem usada pelos simuladores"""
+        return np.bincount(self.link_approach, weights=link_flow, minlength=len(self.graph.approach_street_id))
@@ -0,0 +1,142 @@
+import numpy as np
+
+from models.demand import BINS, BIN_MINUTES, bin_label
+from simulation.queue_engine import QueueFlowSimulator
+
+PEAK_BINS = 60 // BIN_MINUTES  # intervalos numa hora
+
+
+class DailyProfileSimulator(QueueFlowSimulator):
+    """
+    O dia inteiro em intervalos de 15 minutos, com todas as aproximações e todos os
+    intervalos num único cálculo em arrays (intervalos × aproximações). Modelo de fila
+    determinística: a fila residual de um intervalo passa para o seguinte; o atraso de
+    quem não fica retido é o atraso uniforme do semáforo (HCM) ou, sem semáforo, o de
+    uma fila M/D/1.
+    """
+    MAX_RANDOM_SATURATION = 0.95  # limita o atraso M/D/1 perto da saturação
+
+    def simulate_day(self, intersections, network, profiles):
+        """
+        `profiles` é (BINS, ruas) com os veículos/hora de cada rua de `network.streets`
+        em cada intervalo. Retorna os indicadores por intervalo, a hora de pico da rede
+        e o resumo de cada intersecção.
+        """
+        approaches = self._build_approaches(intersections, network)
+        columns = [network.street_index[street_id] for street_id in approaches['street_id']]
+        totals = self._run_day(approaches, np.asarray(profiles, dtype=float)[:, columns])
+        return self._summarize_day(intersections, approaches, totals)
+
+    def _run_day(self, approaches, demand):
+        """Fila determinística por intervalo; `demand` é (BINS, aproximações) em veículos/hora"""
+        seconds = BIN_MINUTES * 60
+        signalized = approaches['has_light']
+        green_ratio = np.where(signalized, approaches['green'] / approaches['cycle'], 1.0)
+        service = approaches['capacity'] * green_ratio  # veículos/s
+
+        arrivals = demand / 3600 * seconds
+        served = np.empty_like(arrivals)
+        queue = np.zeros((len(arrivals) + 1, arrivals.shape[1]))
+        # Única dependência entre intervalos: a fila residual (vetorizada nas aproximações)
+        for index in range(len(arrivals)):
+            available = queue[index] + arrivals[index]
+            served[index] = np.minimum(available, service * seconds)
+            queue[index + 1] = available - served[index]
+
+        saturation = np.divide(demand / 3600, service, out=np.full_like(demand, np.inf), where=service > 0)
+        capped = np.minimum(saturation, 1.0)
+        denominator = np.broadcast_to(1 - capped * green_ratio, demand.shape)
+        uniform = np.divide(0.5 * approaches['cycle'] * (1 - green_ratio) ** 2, denominator,
+                            out=np.zeros_like(demand), where=denominator > 0)
+        random_capped = np.minimum(saturation, self.MAX_RANDOM_SATURATION)
+        random_delay = np.divide(random_capped, 2 * service * (1 - random_capped),
+                                 out=np.zeros_like(demand), where=service > 0)
+        delay = np.where(signalized, uniform, random_delay)
+
+        # Atraso de quem chega + tempo parado na fila residual (área sob a fila no intervalo)
+        wait = delay * arrivals + (queue[:-1] + queue[1:]) / 2 * seconds
+        return {
+            'arrived': arrivals,
+            'served': served,
+            'wait': wait,
+            'queue': queue[1:],
+            'oversaturated': saturation > 1
+        }
+
+    def _summarize_day(self, intersections, approaches, totals):
+        count = len(intersections)
+        owner = approaches['owner']
+
+        def per_intersection(values):
+            """(BINS, aproximações) → (BINS, intersecções)"""
+            index = (owner[None, :] + count * np.arange(BINS)[:, None]).ravel()
+            return np.bincount(index, weights=values.ravel(), minlength=BINS * count).reshape(BINS, count)
+
+        arrived = totals['arrived'].sum(axis=1)
+        served = totals['served'].sum(axis=1)
+        wait = totals['wait'].sum(axis=1)
+        intervals = [{
+            'start': bin_label(index),
+            'vehicles_arriving': float(arrived[index]),
+            'cars_passing': float(served[index]),
+            'total_waiting_time': float(wait[index]),
+            'average_wait_per_car': float(wait[index] / served[index]) if served[index] > 0 else 0,
+            'residual_queue': float(totals['queue'][index].sum()),
+            'oversaturated_approaches': int(totals['oversaturated'][index].sum())
+        } for index in range(BINS)]
+
+        results = []
+        intersection_arrived = per_intersection(totals['arrived'])
+        intersection_served = per_intersection(totals['served'])
+        intersection_wait = per_intersection(totals['wait'])
+        peak_starts = self._peak_hour_starts(intersection_arrived)
+        for index, intersection in enumerate(intersections):
+            start = peak_starts[index]
+            peak = slice(start, start + PEAK_BINS)
+            peak_served = float(intersection_served[peak, index].sum())
+            peak_wait = float(intersection_wait[peak, index].sum())
+            average_wait = peak_wait / peak_served if peak_served > 0 else 0
+            results.append({
+                'intersection_id': self._get_intersection_id(intersection),
+                'peak_hour_start': bin_label(start),
+                'peak_cars_per_hour': peak_served,
+                'peak_average_waiting_time': average_wait,
+                'peak_hour_factor': self._peak_hour_factor(intersection_arrived[peak, index]),
+                'traffic_condition': self._classify_traffic_condition(average_wait),
+                'daily_cars_passing': float(intersection_served[:, index].sum()),
+                'daily_waiting_time': float(intersection_wait[:, index].sum())
+            })
+
+        start = int(self._peak_hour_starts(arrived[:, None])[0])
+        peak = slice(start, start + PEAK_BINS)
+        return {
+            'interval_minutes': BIN_MINUTES,
+            'intervals': intervals,
+            'peak_hour': {
+                'start': bin_label(start),
+                'end': bin_label(start + PEAK_BINS),
+                'vehicles_arriving': float(arrived[peak].sum()),
+                'cars_passing': float(served[peak].sum()),
+                'total_waiting_time': float(wait[peak].sum()),
+                'average_wait_per_car': float(wait[peak].sum() / served[peak].sum()) if served[peak].sum() > 0 else 0,
+                'peak_hour_factor': self._peak_hour_factor(arrived[peak])
+            },
+            'daily': {
+                'vehicles_arriving': float(arrived.sum()),
+                'cars_passing': float(served.sum()),
+                'total_waiting_time': float(wait.sum()),
+                'average_wait_per_car': float(wait.sum() / served.sum()) if served.sum() > 0 else 0
+            },
+            'intersections': results
+        }
+
+    def _peak_hour_starts(self, arrived):
+        """Primeiro intervalo da hora (PEAK_BINS intervalos seguidos) de maior chegada, por coluna"""
+        cumulative = np.vstack([np.zeros((1, arrived.shape[1])), np.cumsum(arrived, axis=0)])
+        hourly = cumulative[PEAK_BINS:] - cumulative[:-PEAK_BINS]
+        return np.argmax(hourly, axis=0).tolist()
+
+    def _peak_hour_factor(self, peak_arrivals):
+        """Volume da hora ÷ (4 × maior volume de 15 min): 1 = demanda uniforme na hora"""
+        highest = float(np.max(peak_arrivals))
+        return float(np.sum(peak_arrivals)) / (PEAK_BINS * highest) if highest > 0 else 0
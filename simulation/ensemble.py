@@ -0,0 +1,148 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from simulation_engine import TrafficFlowSimulator
+from simulation.queue_engine import QueueFlowSimulator
+
+# Valores críticos da t de Student (bicaudal, 95%) por graus de liberdade
+T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093,
+    20: 2.086, 21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060, 26: 2.056, 27: 2.052, 28: 2.048,
+    29: 2.045, 30: 2.042
+}
+Z_95 = 1.959964  # quantil 97,5% da normal padrão
+
+
+def t_critical_95(degrees_of_freedom):
+    """
+    Valor crítico da t de Student (bicaudal, 95%). Até 30 graus de liberdade vem da tabela;
+    acima, da expansão de Cornish–Fisher em torno da normal (erro < 0,001 para df > 30).
+    """
+    if degrees_of_freedom in T_CRITICAL_95:
+        return T_CRITICAL_95[degrees_of_freedom]
+    df, z = degrees_of_freedom, Z_95
+    return z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+
+
+def run_replications(mode, seeds, network, tick=1.0):
+    """
+    Executa uma réplica por semente (cada uma com seu próprio gerador) sobre o NetworkSnapshot.
+    Retorna, por réplica, (carros, espera total) por intersecção como arrays (I,).
+    """
+    intersections = network.intersections
+    replications = []
+    for seed in seeds:
+        if mode == 'queue':
+            simulator = QueueFlowSimulator(tick=tick, rng=np.random.default_rng(seed))
+            flow_results = simulator.simulate_network(intersections, network)
+        else:
+            simulator = TrafficFlowSimulator(rng=random.Random(seed.generate_state(2).tobytes()))
+            flow_results = [simulator.simulate_intersection_flow(intersection, network)
+                            for intersection in intersections]
+
+        replications.append((
+            np.array([result['total_cars_passing'] for result in flow_results], dtype=float),
+            np.array([result['total_waiting_time'] for result in flow_results], dtype=float)
+        ))
+    return replications
+
+
+def summarize(samples):
+    """Média, desvio padrão amostral e intervalo de confiança de 95% ao longo do eixo 0"""
+    samples = np.asarray(samples, dtype=float)
+    count = samples.shape[0]
+    mean = samples.mean(axis=0)
+    std = samples.std(axis=0, ddof=1) if count > 1 else np.zeros_like(mean)
+    t_value = t_critical_95(count - 1) if count > 1 else 0.0
+    margin = t_value * std / math.sqrt(count)
+    return {'mean': mean, 'std': std, 'ci_low': mean - margin, 'ci_high': mean + margin}
+
+
+def _stats_at(stats, index=None):
+    """Extrai as estatísticas de uma posição (ou escalares) como floats"""
+    return {key: float(value if index is None else value[index]) for key, value in stats.items()}
+
+
+class EnsembleRunner:
+    """Réplicas Monte Carlo semeadas, distribuídas num ProcessPoolExecutor"""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def run(self, network, seed, replications, mode='classic', tick=1.0, progress=None):
+        """
+        Roda `replications` réplicas com fluxos aleatórios independentes derivados de `seed`.
+        A mesma semente produz sempre o mesmo resultado, independente do número de processos.
+        `progress`, se informado, recebe a fração de réplicas concluídas.
+        """
+        child_seeds = np.random.SeedSequence(seed).spawn(replications)
+
+        workers = min(self.max_workers or os.cpu_count() or 1, replications)
+        if workers <= 1:
+            if progress is None:
+                samples = run_replications(mode, child_seeds, network, tick)
+            else:
+                samples = []
+                for seed_sequence in child_seeds:
+                    samples.extend(run_replications(mode, [seed_sequence], network, tick))
+                    progress(len(samples) / replications)
+        else:
+            # Um lote contíguo de réplicas por processo; a rede é enviada uma vez por lote
+            chunk = math.ceil(replications / workers)
+            batches = [child_seeds[start:start + chunk] for start in range(0, replications, chunk)]
+            results = [None] * len(batches)
+            executor = ProcessPoolExecutor(max_workers=len(batches))
+            try:
+                futures = {executor.submit(run_replications, mode, batch, network, tick): index
+                           for index, batch in enumerate(batches)}
+                done = 0
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    done += len(results[futures[future]])
+                    if progress is not None:
+                        progress(done / replications)
+            finally:
+                # Em erro ou cancelamento, descarta os lotes que ainda não começaram
+                executor.shutdown(cancel_futures=True)
+            samples = [sample for batch in results for sample in batch]
+
+        return self._aggregate(network.intersections, samples, seed, replications, mode)
+
+    def _aggregate(self, intersections, samples, seed, replications, mode):
+        """Estatísticas por intersecção e para o fluxo geral"""
+        cars = np.array([sample[0] for sample in samples]).reshape(replications, len(intersections))
+        wait = np.array([sample[1] for sample in samples]).reshape(replications, len(intersections))
+        wait_per_car = np.divide(wait, cars, out=np.zeros_like(wait), where=cars > 0)
+
+        cars_stats = summarize(cars)
+        wait_stats = summarize(wait_per_car)
+
+        total_cars = cars.sum(axis=1)
+        total_wait = wait.sum(axis=1)
+        overall_wait_per_car = np.divide(total_wait, total_cars, out=np.zeros_like(total_wait), where=total_cars > 0)
+
+        simulator = TrafficFlowSimulator()
+        return {
+            'ensemble': {
+                'seed': seed,
+                'replications': replications,
+                'mode': mode,
+                'confidence_level': 0.95
+            },
+            'intersections': [{
+                'intersection_data': intersection,
+                'intersection_id': simulator._get_intersection_id(intersection),
+                'total_cars_passing': _stats_at(cars_stats, index),
+                'average_waiting_time': _stats_at(wait_stats, index)
+            } for index, intersection in enumerate(intersections)],
+            'overall_flow': {
+                'total_cars_passing': _stats_at(summarize(total_cars)),
+                'total_waiting_time': _stats_at(summarize(total_wait)),
+                'average_wait_per_car': _stats_at(summarize(overall_wait_per_car))
+            }
+        }
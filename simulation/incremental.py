@@ -0,0 +1,100 @@
+import random
+from collections import defaultdict
+
+import numpy as np
+
+from simulation_engine import TrafficFlowSimulator
+from simulation.queue_engine import QueueFlowSimulator
+
+
+def intersection_result_key(intersection):
+    """Identifica um cruzamento: as duas ruas e o ponto (ruas que se cruzam duas vezes têm dois)"""
+    return (*intersection['streets'], *intersection['point'])
+
+
+class IncrementalFlowState:
+    """
+    Últimos resultados de simulate-flow por intersecção, para uma configuração (modo, seed, tick).
+    Depois de uma alteração na rede só as intersecções das ruas alteradas são simuladas de
+    novo, e os totais gerais são atualizados por delta.
+
+    Com seed, cada intersecção do modo clássico tem o próprio gerador (derivado da seed e do
+    cruzamento), então o resultado de uma intersecção não depende de quais outras foram
+    re-simuladas. No modo fila sem seed as chegadas são determinísticas e o resultado é exato.
+    """
+
+    def __init__(self, mode='classic', seed=None, tick=1.0):
+        self.mode = mode
+        self.seed = seed
+        self.tick = tick
+        self.revision = None
+        self.results = {}                  # chave → (intersecção, resultado)
+        self.by_street = defaultdict(set)  # rua → chaves das suas intersecções
+        self.total_cars = 0
+        self.total_wait = 0.0
+
+    def rebuild(self, network):
+        """Simula a rede inteira (NetworkSnapshot) e substitui o estado"""
+        self.results.clear()
+        self.by_street.clear()
+        self.total_cars = 0
+        self.total_wait = 0.0
+        for intersection, result in self._simulate(network, network.revision):
+            self._add(intersection, result)
+        self.revision = network.revision
+        return len(self.results)
+
+    def update(self, network, changed_streets, revision):
+        """
+        Aplica as alterações das ruas `changed_streets`: `network` é o NetworkSnapshot só com
+        as intersecções dessas ruas. Retorna (resultados novos, intersecções removidas).
+        """
+        stale = set().union(*(self.by_street.get(street_id, ()) for street_id in changed_streets))
+        discarded = {key: self._discard(key) for key in stale}
+
+        updated = []
+        for intersection, result in self._simulate(network, revision):
+            self._add(intersection, result)
+            discarded.pop(intersection_result_key(intersection), None)
+            updated.append({'intersection_data': intersection, 'flow_results': result})
+
+        self.revision = revision
+        return updated, list(discarded.values())
+
+    def items(self):
+        return [{'intersection_data': intersection, 'flow_results': result}
+                for intersection, result in self.results.values()]
+
+    def _simulate(self, network, revision):
+        intersections = network.intersections
+        if self.mode == 'queue':
+            # Com seed, um gerador por revisão: a amostra muda a cada alteração
+            rng = np.random.default_rng([self.seed, revision]) if self.seed is not None else None
+            simulator = QueueFlowSimulator(tick=self.tick, rng=rng)
+            return zip(intersections, simulator.simulate_network(intersections, network))
+
+        simulator = TrafficFlowSimulator()
+        results = []
+        for intersection in intersections:
+            if self.seed is not None:
+                simulator.rng = random.Random(f'{self.seed}:{intersection_result_key(intersection)}')
+            results.append((intersection, simulator.simulate_intersection_flow(intersection, network)))
+        return results
+
+    def _add(self, intersection, result):
+        key = intersection_result_key(intersection)
+        if key in self.results:
+            self._discard(key)
+        self.results[key] = (intersection, result)
+        for street_id in intersection['streets']:
+            self.by_street[street_id].add(key)
+        self.total_cars += result['total_cars_passing']
+        self.total_wait += result['total_waiting_time']
+
+    def _discard(self, key):
+        intersection, result = self.results.pop(key)
+        for street_id in intersection['streets']:
+            self.by_street[street_id].discard(key)
+        self.total_cars -= result['total_cars_passing']
+        self.total_wait -= result['total_waiting_time']
+        return intersection
@@ -0,0 +1,120 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Levantada dentro do trabalho quando o cancelamento foi pedido"""
+
+
+class Job:
+    """Simulação em segundo plano: estado, progresso (0 a 1) e resultado"""
+    __slots__ = ('id', 'kind', 'status', 'progress', 'result', 'error', 'created_at', 'started_at',
+                 'finished_at', 'body', 'future', 'cancel_event')
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'  # queued → running → done | failed | cancelled
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.body = None  # resultado já serializado, reaproveitado entre leituras
+        self.future = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def report(self, progress):
+        """Callback de progresso passado ao trabalho; interrompe-o se o job foi cancelado"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        self.progress = min(max(float(progress), 0.0), 1.0)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobManager:
+    """
+    Fila de simulações num pool limitado de threads. Jobs terminados ficam guardados
+    (no máximo `retention`, os mais antigos saem primeiro) para leituras repetidas do resultado.
+    """
+
+    def __init__(self, max_workers=2, retention=100):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='simulation-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, function, *args, **kwargs):
+        """Agenda function(*args, progress=job.report, **kwargs) e retorna o Job imediatamente"""
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        job.future = self._executor.submit(self._run, job, function, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Pede o cancelamento; jobs na fila saem na hora, os em execução param no próximo progresso"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        if job.future.cancel():
+            self._finish(job, 'cancelled')
+        return job
+
+    def _run(self, job, function, args, kwargs):
+        if job.cancel_event.is_set():
+            self._finish(job, 'cancelled')
+            return
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = function(*args, progress=job.report, **kwargs)
+        except JobCancelled:
+            self._finish(job, 'cancelled')
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, 'failed')
+        else:
+            job.progress = 1.0
+            self._finish(job, 'done')
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        """Descarta os jobs terminados mais antigos acima do limite de retenção"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.retention)]:
+            del self._jobs[job_id]
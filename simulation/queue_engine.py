@@ -0,0 +1,174 @@
+import numpy as np
+
+from metrics import STAGE_DURATION, timed
+from models.network import NetworkSnapshot
+from simulation_engine import TrafficFlowSimulator
+
+
+class QueueFlowSimulator(TrafficFlowSimulator):
+    """
+    Simulação em passos de tempo fixos: cada aproximação (rua em uma intersecção)
+    mantém uma fila, alimentada por vehicles_per_hour e escoada pelas faixas
+    durante o verde do semáforo
+    """
+    SATURATION_FLOW = 1800   # veículos/hora por faixa com sinal verde
+    UNSIGNALIZED_FLOW = 1200  # veículos/hora por faixa sem semáforo (preferência/PARE)
+
+    def __init__(self, tick=1.0, rng=None, progress=None):
+        super().__init__()
+        self.tick = tick
+        self.rng = rng  # numpy Generator: chegadas Poisson; None: chegadas determinísticas
+        self.progress = progress  # callback opcional com a fração simulada (0 a 1)
+
+    @timed(STAGE_DURATION, stage='simulate_network')
+    def simulate_network(self, intersections, streets, traffic_lights=(), demand=None):
+        """
+        Simula todas as intersecções juntas durante simulation_time.
+        `streets` pode ser um NetworkSnapshot ou a lista de ruas com `traffic_lights`.
+        `demand` (opcional) substitui vehicles_per_hour: veículos/hora por aproximação,
+        na ordem de _build_approaches (ex.: RoadGraph.propagate).
+        Retorna uma lista de resultados no formato de simulate_intersection_flow.
+        """
+        network = NetworkSnapshot.coerce(streets, traffic_lights)
+        approaches = self._build_approaches(intersections, network, demand)
+        totals = self._run(approaches, self.rng)
+        return self._collect_results(intersections, approaches, totals)
+
+    def _build_approaches(self, intersections, network, demand=None):
+        """Monta os arrays por aproximação (uma entrada por rua de cada intersecção)"""
+        owner, street_ids, rate, capacity, has_light, green, cycle, offset = [], [], [], [], [], [], [], []
+        for index, intersection in enumerate(intersections):
+            intersection_id = self._get_intersection_id(intersection)
+            # Semáforos da mesma intersecção abrem em sequência dentro do ciclo
+            elapsed_green = 0
+            for street_id in intersection['streets']:
+                street = network.street(street_id)
+                if not street:
+                    continue
+                lanes = street.lanes
+                tl = network.light_at(intersection_id, street_id)
+
+                owner.append(index)
+                street_ids.append(street_id)
+                rate.append((street.vehicles_per_hour if demand is None else demand[len(rate)]) / 3600)
+                if tl:
+                    cycle_time = max(tl.cycle_time, 1)
+                    green_time = tl.green_time
+                    capacity.append(lanes * self.SATURATION_FLOW / 3600)
+                    has_light.append(True)
+                    green.append(green_time)
+                    cycle.append(cycle_time)
+                    offset.append(elapsed_green % cycle_time)
+                    elapsed_green += green_time
+                else:
+                    capacity.append(lanes * self.UNSIGNALIZED_FLOW / 3600)
+                    has_light.append(False)
+                    green.append(1)
+                    cycle.append(1)
+                    offset.append(0)
+
+        return {
+            'owner': np.array(owner, dtype=np.intp),
+            'street_id': street_ids,
+            'rate': np.array(rate, dtype=float),
+            'capacity': np.array(capacity, dtype=float),
+            'has_light': np.array(has_light, dtype=bool),
+            'green': np.array(green, dtype=float),
+            'cycle': np.array(cycle, dtype=float),
+            'offset': np.array(offset, dtype=float)
+        }
+
+    def _run(self, approaches, rng):
+        """Laço de passos de tempo, vetorizado sobre todas as aproximações"""
+        dt = self.tick
+        count = len(approaches['rate'])
+        queue = np.zeros(count)
+        served_total = np.zeros(count)
+        arrived_total = np.zeros(count)
+        wait_total = np.zeros(count)
+        max_queue = np.zeros(count)
+
+        mean_arrivals = approaches['rate'] * dt
+        max_service = approaches['capacity'] * dt
+        signalized = approaches['has_light']
+        green, cycle, offset = approaches['green'], approaches['cycle'], approaches['offset']
+
+        steps = int(round(self.simulation_time / dt))
+        report_every = max(1, steps // 100)
+        for step in range(steps):
+            if self.progress is not None and step % report_every == 0:
+                self.progress(step / steps)
+
+            # Em aproximações sem semáforo o "verde" é permanente
+            phase = (step * dt - offset) % cycle
+            open_now = ~signalized | (phase < green)
+
+            arrivals = rng.poisson(mean_arrivals) if rng is not None else mean_arrivals
+            queue += arrivals
+            arrived_total += arrivals
+
+            served = np.minimum(queue, max_service * open_now)
+            queue -= served
+            served_total += served
+
+            # Quem continua na fila espera mais um passo
+            wait_total += queue * dt
+            np.maximum(max_queue, queue, out=max_queue)
+
+        return {
+            'served': served_total,
+            'arrived': arrived_total,
+            'queue': queue,
+            'wait': wait_total,
+            'max_queue': max_queue
+        }
+
+    def _collect_results(self, intersections, approaches, totals):
+        """Converte os arrays no dicionário de resultados usado pelo frontend"""
+        results = []
+        for intersection in intersections:
+            results.append({
+                'intersection_id': self._get_intersection_id(intersection),
+                'total_cars_passing': 0,
+                'total_waiting_time': 0,
+                'average_waiting_time': 0,
+                'cars_per_hour': 0,
+                'flow_efficiency': 'ALTA',
+                'street_flows': {},
+                'traffic_condition': 'FLUÍDO'
+            })
+
+        # Vazão efetiva média (verde/ciclo) para estimar a espera máxima
+        green_ratio = np.where(approaches['has_light'], approaches['green'] / approaches['cycle'], 1.0)
+        effective_flow = approaches['capacity'] * green_ratio
+        max_wait = np.divide(totals['max_queue'], effective_flow,
+                             out=np.zeros_like(effective_flow), where=effective_flow > 0)
+        max_wait = max_wait + np.where(approaches['has_light'], approaches['cycle'] - approaches['green'], 0)
+
+        demand = [0] * len(intersections)
+        for k, index in enumerate(approaches['owner'].tolist()):
+            cars_passing = int(totals['served'][k])
+            total_waiting_time = float(totals['wait'][k])
+            has_light = bool(approaches['has_light'][k])
+
+            results[index]['street_flows'][approaches['street_id'][k]] = {
+                'cars_passing': cars_passing,
+                'cars_waiting': int(round(totals['queue'][k])),
+                'average_wait_time': total_waiting_time / cars_passing if cars_passing > 0 else 0,
+                'total_waiting_time': total_waiting_time,
+                'flow_status': 'CONTROLADO' if has_light else 'LIVRE',
+                'has_traffic_light': has_light,
+                'wait_time_range': f"0-{int(round(max_wait[k]))} segundos"
+            }
+            results[index]['total_cars_passing'] += cars_passing
+            results[index]['total_waiting_time'] += total_waiting_time
+            demand[index] += float(totals['arrived'][k])
+
+        for index, result in enumerate(results):
+            total_cars = result['total_cars_passing']
+            result['cars_per_hour'] = total_cars
+            result['average_waiting_time'] = result['total_waiting_time'] / total_cars if total_cars > 0 else 0
+            result['traffic_condition'] = self._classify_traffic_condition(result['average_waiting_time'])
+            result['flow_efficiency'] = self._classify_flow_efficiency(total_cars, demand[index])
+
+        return results
@@ -0,0 +1,230 @@
+import math
+
+import numpy as np
+
+from simulation.queue_engine import QueueFlowSimulator
+from simulation_engine import TrafficFlowSimulator
+
+
+class RoadGraph:
+    """
+    Rede compilada num grafo dirigido em arrays CSR: nós são as intersecções de
+    network.intersections (na mesma ordem) e arestas são os trechos de rua entre
+    duas intersecções consecutivas, no sentido em que a rua foi desenhada.
+
+    Cada aproximação (rua em uma intersecção) segue a ordem de
+    QueueFlowSimulator._build_approaches, então os arrays por aproximação podem ser
+    passados direto aos simuladores.
+    """
+    MAX_ITERATIONS = 500
+    TOLERANCE = 1e-3  # veículos/hora
+
+    def __init__(self, network):
+        self.network = network
+        intersections = network.intersections
+
+        # Aproximações agrupadas por nó (approach_ptr é o CSR nó → aproximações)
+        node_of, street_index, street_ids, points, counts = [], [], [], [], []
+        for node, intersection in enumerate(intersections):
+            count = 0
+            for street_id in intersection['streets']:
+                index = network.street_index.get(street_id)
+                if index is None:
+                    continue
+                node_of.append(node)
+                street_index.append(index)
+                street_ids.append(street_id)
+                points.append(intersection['point'])
+                count += 1
+            counts.append(count)
+
+        self.approach_ptr = np.concatenate(([0], np.cumsum(counts, dtype=np.intp)))
+        self.approach_node = np.array(node_of, dtype=np.intp)
+        self.approach_street = np.array(street_index, dtype=np.intp)
+        self.approach_street_id = street_ids
+        points = np.array(points, dtype=float).reshape(-1, 2)
+        self.node_point = np.array([intersection['point'] for intersection in intersections], dtype=float).reshape(-1, 2)
+
+        fraction = self._positions_along_streets(points)
+        self.approach_position = fraction
+
+        # Aproximações consecutivas da mesma rua (ordenadas pela posição) formam uma aresta
+        order = np.lexsort((fraction, self.approach_street))
+        same_street = self.approach_street[order[1:]] == self.approach_street[order[:-1]]
+        source = order[:-1][same_street]
+        target = order[1:][same_street]
+
+        count = len(street_ids)
+        self.downstream = np.full(count, -1, dtype=np.intp)
+        self.upstream = np.full(count, -1, dtype=np.intp)
+        self.downstream[source] = target
+        self.upstream[target] = source
+
+        # Posição de cada aproximação ao longo da sua rua (0 = primeira intersecção)
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = ~same_street
+        starts = np.flatnonzero(first)
+        self.rank = np.empty(count, dtype=np.intp)
+        self.rank[order] = np.arange(count) - np.repeat(starts, np.diff(np.append(starts, count)))
+
+        # CSR nó → arestas de saída
+        source_node = self.approach_node[source]
+        by_source = np.argsort(source_node, kind='stable')
+        self.edge_source = source[by_source]
+        self.edge_target = target[by_source]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(source_node, minlength=len(intersections)))))
+        self.indices = self.approach_node[self.edge_target]
+        self.edge_street = self.approach_street[self.edge_source]
+
+        lengths = np.array([street.length_km for street in network.streets], dtype=float)
+        self.edge_length_km = (fraction[self.edge_target] - fraction[self.edge_source]) * lengths[self.edge_street]
+
+    @classmethod
+    def of(cls, network):
+        """Grafo do NetworkSnapshot, compilado uma única vez por snapshot"""
+        if network.road_graph is None:
+            network.road_graph = cls(network)
+        return network.road_graph
+
+    @property
+    def node_count(self):
+        return len(self.indptr) - 1
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    def _positions_along_streets(self, points):
+        """
+        Fração (0 a 1) do comprimento da rua em que cada ponto cai, projetando-o no
+        segmento mais próximo. Vetorizado sobre todos os pares (aproximação, segmento da sua rua).
+        """
+        count = len(points)
+        if count == 0:
+            return np.zeros(0)
+
+        streets = self.network.streets
+        sizes = np.array([len(street.coordinates) for street in streets], dtype=np.intp)
+        coords = np.array([point for street in streets for point in street.coordinates], dtype=float).reshape(-1, 2)
+
+        # Longitude em escala de distância para projetar corretamente
+        scale = math.cos(math.radians(float(coords[:, 0].mean()))) if len(coords) else 1.0
+        coords = coords * (1.0, scale)
+        points = points * (1.0, scale)
+
+        # Segmentos de todas as ruas concatenados; seg_ptr é o CSR rua → segmentos
+        point_ptr = np.concatenate(([0], np.cumsum(sizes)))
+        segment_sizes = np.maximum(sizes - 1, 0)
+        seg_ptr = np.concatenate(([0], np.cumsum(segment_sizes)))
+        owner = np.repeat(np.arange(len(streets)), segment_sizes)
+        start = point_ptr[owner] + np.arange(seg_ptr[-1]) - seg_ptr[owner]
+        a, b = coords[start], coords[start + 1]
+        seg_length = np.hypot(*(b - a).T)
+        before = np.cumsum(seg_length) - seg_length
+        before -= before[seg_ptr[owner]] if len(owner) else 0
+        total = np.bincount(owner, weights=seg_length, minlength=len(streets))
+
+        # Todos os segmentos da rua de cada aproximação
+        per_approach = segment_sizes[self.approach_street]
+        group = np.repeat(np.arange(count), per_approach)
+        group_start = np.cumsum(per_approach) - per_approach
+        segment = seg_ptr[self.approach_street][group] + np.arange(len(group)) - group_start[group]
+
+        direction = b[segment] - a[segment]
+        squared = np.einsum('ij,ij->i', direction, direction)
+        t = np.divide(np.einsum('ij,ij->i', points[group] - a[segment], direction), squared,
+                      out=np.zeros(len(group)), where=squared > 0).clip(0, 1)
+        distance = np.sum((a[segment] + t[:, None] * direction - points[group]) ** 2, axis=1)
+
+        # Segmento mais próximo de cada aproximação (o primeiro, em caso de empate)
+        has_segments = per_approach > 0
+        nearest = np.full(count, np.inf)
+        nearest[has_segments] = np.minimum.reduceat(distance, group_start[has_segments])
+        closest = np.flatnonzero(distance <= nearest[group])
+        _, first_closest = np.unique(group[closest], return_index=True)
+        best = closest[first_closest]
+
+        fraction = np.zeros(count)
+        chosen = segment[best]
+        street_total = total[owner[chosen]]
+        fraction[group[best]] = np.divide(before[chosen] + t[best] * seg_length[chosen], street_total,
+                                          out=np.zeros(len(best)), where=street_total > 0)
+        return fraction
+
+    def capacity(self):
+        """Vazão máxima de cada aproximação (veículos/hora), com as regras do QueueFlowSimulator"""
+        network = self.network
+        lanes = np.array([street.lanes for street in network.streets], dtype=float)[self.approach_street]
+        capacity = lanes * QueueFlowSimulator.UNSIGNALIZED_FLOW
+        simulator = TrafficFlowSimulator()
+        for k in np.flatnonzero(np.frombuffer(bytes(network.light_bitmap), dtype=np.uint8)[self.approach_street]):
+            intersection_id = simulator._get_intersection_id(network.intersections[self.approach_node[k]])
+            light = network.light_at(intersection_id, self.approach_street_id[k])
+            if light:
+                capacity[k] = lanes[k] * QueueFlowSimulator.SATURATION_FLOW * light.green_time / max(light.cycle_time, 1)
+        return capacity
+
+    def propagate(self, turn_share=0.0):
+        """
+        Demanda que chega a cada aproximação (veículos/hora) quando a vazão de saída de
+        cada intersecção alimenta as seguintes. A demanda externa (vehicles_per_hour)
+        entra na primeira intersecção de cada rua; cada aproximação deixa passar no
+        máximo a sua capacidade.
+
+        Sem conversões (turn_share=0) o grafo das aproximações é acíclico e uma única
+        passada em ordem topológica resolve; com conversões, a fração turn_share da
+        saída se divide entre as outras ruas do nó e o cálculo itera até convergir.
+        """
+        count = len(self.approach_street_id)
+        capacity = self.capacity()
+        external = np.array([street.vehicles_per_hour for street in self.network.streets],
+                            dtype=float)[self.approach_street]
+        external[self.upstream >= 0] = 0
+
+        if not turn_share:
+            arrivals = external.copy()
+            outflow = np.zeros(count)
+            by_rank = np.argsort(self.rank, kind='stable')
+            level_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.rank, minlength=1))))
+            for level in range(len(level_ptr) - 1):
+                members = by_rank[level_ptr[level]:level_ptr[level + 1]]
+                if level > 0:
+                    arrivals[members] = outflow[self.upstream[members]]
+                outflow[members] = np.minimum(arrivals[members], capacity[members])
+            return arrivals
+
+        source, target, weight = self._transfers(turn_share)
+        arrivals = external
+        for _ in range(self.MAX_ITERATIONS):
+            outflow = np.minimum(arrivals, capacity)
+            updated = external + np.bincount(target, weights=outflow[source] * weight, minlength=count)
+            converged = np.max(np.abs(updated - arrivals), initial=0) < self.TOLERANCE
+            arrivals = updated
+            if converged:
+                break
+        return arrivals
+
+    def _transfers(self, turn_share):
+        """
+        Matriz esparsa (origem, destino, peso) da saída de cada aproximação para as
+        aproximações seguintes: 1 - turn_share segue na mesma rua e turn_share se divide
+        igualmente entre as arestas de saída das outras ruas do nó
+        """
+        node = self.approach_node
+        out_degree = np.diff(self.indptr)[node]
+        repeats = out_degree
+        source = np.repeat(np.arange(len(node)), repeats)
+        offsets = np.arange(len(source)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        edge = self.indptr[node][source] + offsets
+
+        target = self.edge_target[edge]
+        straight = self.edge_street[edge] == self.approach_street[source]
+        others = (out_degree - (self.downstream >= 0))[source]
+        continues = np.where(others > 0, 1.0 - turn_share, 1.0)
+        weight = np.where(straight, continues, turn_share / np.maximum(others, 1))
+        return source, target, weight
+
+    def demand_at(self, node, arrivals):
+        """Demanda por rua {street_id: veículos/hora} no nó, no formato aceito por simulate_intersection_flow"""
+        return {self.approach_street_id[k]: float(arrivals[k])
+                for k in range(self.approach_ptr[node], self.approach_ptr[node + 1])}
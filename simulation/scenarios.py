@@ -0,0 +1,201 @@
+import math
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from models.network import NetworkOverlay, StreetRecord, TrafficLightRecord, intersection_key
+from simulation_engine import TrafficFlowSimulator
+from simulation.incremental import intersection_result_key
+from simulation.queue_engine import QueueFlowSimulator
+
+# Critério de ordenação → maior é melhor
+RANKINGS = {
+    'average_wait_per_car': False,
+    'total_waiting_time': False,
+    'total_cars_passing': True
+}
+
+
+def simulate_intersections(network, intersections, mode='queue', seed=0, tick=1.0):
+    """
+    (carros, espera total) de cada intersecção como arrays (I,). O modo fila roda com
+    chegadas determinísticas; o clássico usa um gerador por intersecção derivado da seed,
+    então uma intersecção que o cenário não altera dá o mesmo resultado que na base.
+    """
+    if not intersections:
+        return np.zeros(0), np.zeros(0)
+    if mode == 'queue':
+        results = QueueFlowSimulator(tick=tick).simulate_network(intersections, network)
+    else:
+        simulator = TrafficFlowSimulator()
+        results = []
+        for intersection in intersections:
+            simulator.rng = random.Random(f'{seed}:{intersection_result_key(intersection)}')
+            results.append(simulator.simulate_intersection_flow(intersection, network))
+    return (np.array([result['total_cars_passing'] for result in results], dtype=float),
+            np.array([result['total_waiting_time'] for result in results], dtype=float))
+
+
+def build_overlay(network, scenario):
+    """
+    NetworkOverlay do cenário: `lights` é {(intersection_id, street_id): (verde, ciclo) ou None}
+    e `demand` é {street_id: multiplicador de vehicles_per_hour}
+    """
+    lights = {(intersection_id, street_id): TrafficLightRecord(intersection_id, street_id, *timing) if timing else None
+              for (intersection_id, street_id), timing in scenario['lights'].items()}
+    streets = {}
+    for street_id, factor in scenario['demand'].items():
+        street = network.street(street_id)
+        if street is not None:
+            streets[street_id] = StreetRecord(street.id, street.name, street.coordinates, street.length_km,
+                                              street.lanes, street.vehicles_per_hour * factor, street.average_speed)
+    return NetworkOverlay(network, lights, streets)
+
+
+def evaluate_scenarios(network, scenarios, baseline, mode='queue', seed=0, tick=1.0):
+    """
+    Totais (carros, espera, intersecções simuladas) de cada cenário. Só as intersecções
+    que o overlay altera são simuladas; as demais entram com o resultado da base.
+    """
+    cars, wait = baseline
+    total_cars, total_wait = float(cars.sum()), float(wait.sum())
+
+    by_key, by_street = defaultdict(list), defaultdict(list)
+    simulator = TrafficFlowSimulator()
+    for index, intersection in enumerate(network.intersections):
+        by_key[intersection_key(simulator._get_intersection_id(intersection))].append(index)
+        for street_id in intersection['streets']:
+            by_street[street_id].append(index)
+
+    overlays, affected_sets = [], []
+    for scenario in scenarios:
+        overlay = build_overlay(network, scenario)
+        affected = set()
+        for intersection_id, _ in scenario['lights']:
+            affected.update(by_key.get(intersection_key(intersection_id), ()))
+        for street_id in scenario['demand']:
+            affected.update(by_street.get(street_id, ()))
+        if mode == 'classic':
+            # O modo clássico só vê se a rua tem semáforo em alguma intersecção
+            for _, street_id in scenario['lights']:
+                if overlay.has_traffic_light(street_id) != network.has_traffic_light(street_id):
+                    affected.update(by_street.get(street_id, ()))
+        overlays.append(overlay)
+        affected_sets.append(sorted(affected))
+
+    if mode == 'queue':
+        simulated = _queue_batch(network, overlays, affected_sets, tick)
+    else:
+        simulated = [simulate_intersections(overlay, [network.intersections[index] for index in affected], mode, seed)
+                     for overlay, affected in zip(overlays, affected_sets)]
+
+    totals = []
+    for affected, (new_cars, new_wait) in zip(affected_sets, simulated):
+        totals.append((total_cars - float(cars[affected].sum()) + float(new_cars.sum()),
+                       total_wait - float(wait[affected].sum()) + float(new_wait.sum()),
+                       len(affected)))
+    return totals
+
+
+def _queue_batch(network, overlays, affected_sets, tick):
+    """
+    Intersecções alteradas de todos os cenários num único laço do QueueFlowSimulator:
+    as aproximações são independentes, então os arrays de cada overlay são concatenados.
+    Retorna (carros, espera) por cenário, somados como em simulate_intersections.
+    """
+    simulator = QueueFlowSimulator(tick=tick)
+    parts = [simulator._build_approaches([network.intersections[index] for index in affected], overlay)
+             for overlay, affected in zip(overlays, affected_sets)]
+    sizes = [len(part['rate']) for part in parts]
+    combined = {key: np.concatenate([part[key] for part in parts]) for key in
+                ('rate', 'capacity', 'has_light', 'green', 'cycle', 'offset')}
+    totals = simulator._run(combined, None)
+
+    # Como em _collect_results: carros inteiros por aproximação
+    bounds = np.cumsum([0] + sizes)
+    served = np.floor(totals['served'])
+    return [(served[start:end], totals['wait'][start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class ScenarioRunner:
+    """
+    Compara cenários "e se" sobre a mesma rede: cada cenário é um NetworkOverlay da base
+    (nada é gravado no banco nem recalculado na geometria). A base é simulada uma vez e
+    os cenários são avaliados em lotes num ProcessPoolExecutor.
+    """
+    BATCH_SIZE = 25  # cenários por lote na execução sem processos
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def run(self, network, scenarios, mode='queue', seed=0, tick=1.0, rank_by='average_wait_per_car', progress=None):
+        """
+        `scenarios` é uma lista de {name, lights, demand} (ver build_overlay).
+        Retorna a base e a tabela de cenários ordenada por `rank_by`.
+        """
+        baseline = simulate_intersections(network, network.intersections, mode, seed, tick)
+
+        count = len(scenarios)
+        workers = min(self.max_workers or os.cpu_count() or 1, count)
+        if workers <= 1:
+            # Lotes de BATCH_SIZE cenários (um único laço de simulação por lote no modo fila)
+            totals = []
+            for start in range(0, count, self.BATCH_SIZE):
+                totals.extend(evaluate_scenarios(network, scenarios[start:start + self.BATCH_SIZE], baseline,
+                                                 mode, seed, tick))
+                if progress is not None:
+                    progress(len(totals) / count)
+        else:
+            # Um lote contíguo de cenários por processo; a rede é enviada uma vez por lote
+            chunk = math.ceil(count / workers)
+            batches = [scenarios[start:start + chunk] for start in range(0, count, chunk)]
+            results = [None] * len(batches)
+            executor = ProcessPoolExecutor(max_workers=len(batches))
+            try:
+                futures = {executor.submit(evaluate_scenarios, network, batch, baseline, mode, seed, tick): index
+                           for index, batch in enumerate(batches)}
+                done = 0
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    done += len(results[futures[future]])
+                    if progress is not None:
+                        progress(done / count)
+            finally:
+                executor.shutdown(cancel_futures=True)
+            totals = [total for batch in results for total in batch]
+
+        return self._rank(scenarios, baseline, totals, mode, rank_by)
+
+    def _rank(self, scenarios, baseline, totals, mode, rank_by):
+        def summary(cars, wait):
+            return {
+                'total_cars_passing': cars,
+                'total_waiting_time': wait,
+                'average_wait_per_car': wait / cars if cars > 0 else 0
+            }
+
+        base = summary(float(baseline[0].sum()), float(baseline[1].sum()))
+        rows = []
+        for scenario, (cars, wait, simulated) in zip(scenarios, totals):
+            row = {'name': scenario['name'], **summary(cars, wait)}
+            row.update({
+                'wait_change': wait - base['total_waiting_time'],
+                'wait_change_percent': ((wait - base['total_waiting_time']) / base['total_waiting_time'] * 100
+                                        if base['total_waiting_time'] > 0 else 0),
+                'cars_change': cars - base['total_cars_passing'],
+                'intersections_simulated': simulated
+            })
+            rows.append(row)
+
+        rows.sort(key=lambda row: row[rank_by], reverse=RANKINGS[rank_by])
+        for rank, row in enumerate(rows, 1):
+            row['rank'] = rank
+        return {
+            'mode': mode,
+            'ranked_by': rank_by,
+            'baseline': base,
+            'scenarios': rows
+        }
@@ -0,0 +1,276 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulation.queue_engine import QueueFlowSimulator
+
+
+def evaluate_timings(kernel, cycles, greens, tick=1.0):
+    """
+    Espera total (s) e carros atendidos de cada candidato, simulados juntos num único
+    laço vetorizado. `kernel` vem de SignalOptimizer._plans; `cycles` é (K,) e `greens` é (K, P).
+    """
+    base = kernel['approaches']
+    cycles = np.asarray(cycles, dtype=float)
+    greens = np.asarray(greens, dtype=float)
+    count, approaches = len(cycles), len(base['rate'])
+
+    # Mesmas regras do QueueFlowSimulator: verdes da intersecção abrem em sequência
+    signalized = base['has_light']
+    phase = kernel['phase']
+    green = np.where(signalized, greens[:, np.maximum(phase, 0)], 1.0)
+    cycle = np.where(signalized, cycles[:, None], 1.0)
+    offset = np.where(signalized, (greens @ kernel['precedes'].T) % cycles[:, None], 0.0)
+
+    tiled = {
+        'rate': np.tile(base['rate'], count),
+        'capacity': np.tile(base['capacity'], count),
+        'has_light': np.tile(signalized, count),
+        'green': green.ravel(),
+        'cycle': cycle.ravel(),
+        'offset': offset.ravel()
+    }
+    simulator = QueueFlowSimulator(tick=tick)
+    totals = simulator._run(tiled, None)
+    return (totals['wait'].reshape(count, approaches).sum(axis=1),
+            totals['served'].reshape(count, approaches).sum(axis=1))
+
+
+class SignalOptimizer:
+    """
+    Busca ciclo e divisão de verdes por intersecção: ponto de partida pela fórmula de
+    Webster, refinado por busca local sobre a espera simulada (QueueFlowSimulator
+    determinístico). Os candidatos de cada rodada são avaliados num ProcessPoolExecutor.
+    """
+    LOST_TIME = 4       # segundos perdidos por fase (amarelo + vermelho geral)
+    MIN_GREEN = 7
+    MIN_CYCLE = 30
+    MAX_CYCLE = 180
+    MAX_ROUNDS = 50
+
+    def __init__(self, tick=1.0, max_workers=None, chunk_size=32):
+        self.tick = tick
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.simulator = QueueFlowSimulator(tick=tick)
+
+    def optimize(self, network):
+        """Melhores tempos para cada intersecção semaforizada do NetworkSnapshot"""
+        states = []
+        for plan in self._plans(network):
+            baseline = self.simulator._run(plan['kernel']['approaches'], None)
+            cycle, greens = self.webster(plan)
+            states.append({
+                'plan': plan,
+                'baseline': (float(baseline['wait'].sum()), float(baseline['served'].sum())),
+                'webster': (cycle, greens),
+                'best': None,
+                'best_wait': math.inf,
+                'cycle_step': 10,
+                'green_step': 5,
+                'evaluations': 0,
+                'done': not plan['streets']
+            })
+
+        workers = self.max_workers
+        executor = ProcessPoolExecutor(max_workers=workers) if workers is None or workers > 1 else None
+        try:
+            # Ponto de partida: Webster
+            self._evaluate_round(executor, [(state, [state['webster']]) for state in states if not state['done']])
+
+            for _ in range(self.MAX_ROUNDS):
+                active = [state for state in states if not state['done']]
+                if not active:
+                    break
+                batch = [(state, self._neighbors(*state['best'], state['cycle_step'], state['green_step']))
+                         for state in active]
+                for state, moved in zip(active, self._evaluate_round(executor, batch)):
+                    if moved:
+                        continue
+                    # Sem melhora: refina o passo até 1 s e então para
+                    if state['cycle_step'] == 1 and state['green_step'] == 1:
+                        state['done'] = True
+                    state['cycle_step'] = max(1, state['cycle_step'] // 2)
+                    state['green_step'] = max(1, state['green_step'] // 2)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return [self._result(state) for state in states]
+
+    def webster(self, plan):
+        """
+        Ciclo ótimo de Webster C = (1,5 L + 5) / (1 - Y), com verdes proporcionais
+        às razões de fluxo y = q / s de cada fase
+        """
+        phases = len(plan['streets'])
+        if not phases:
+            return 0, ()
+        ratios = np.array(plan['flow_ratios'])
+        lost = self.LOST_TIME * phases
+        total_ratio = ratios.sum()
+
+        if total_ratio >= 0.95:
+            cycle = self.MAX_CYCLE
+        else:
+            cycle = (1.5 * lost + 5) / (1 - total_ratio)
+        cycle = int(round(min(max(cycle, self.MIN_CYCLE, lost + self.MIN_GREEN * phases), self.MAX_CYCLE)))
+
+        shares = ratios / total_ratio if total_ratio > 0 else np.full(phases, 1 / phases)
+        return cycle, self._split(cycle, shares)
+
+    def _split(self, cycle, shares):
+        """Verdes inteiros proporcionais a `shares`, somando no máximo cycle - tempo perdido"""
+        available = cycle - self.LOST_TIME * len(shares)
+        greens = np.maximum(self.MIN_GREEN, np.floor(available * np.asarray(shares))).astype(int)
+        while greens.sum() > available and greens.max() > self.MIN_GREEN:
+            greens[greens.argmax()] -= 1
+        return tuple(int(green) for green in greens)
+
+    def _plans(self, network):
+        """Agrupa as intersecções por id e pré-calcula os arrays das aproximações"""
+        groups = {}
+        for intersection in network.intersections:
+            groups.setdefault(self.simulator._get_intersection_id(intersection), []).append(intersection)
+
+        plans = []
+        for intersection_id, intersections in groups.items():
+            approaches = self.simulator._build_approaches(intersections, network)
+
+            # Fases: ruas com semáforo, na ordem em que abrem no ciclo
+            streets = []
+            for street_id, has_light in zip(approaches['street_id'], approaches['has_light']):
+                if has_light and street_id not in streets:
+                    streets.append(street_id)
+
+            count = len(approaches['street_id'])
+            phase = np.full(count, -1, dtype=np.intp)
+            precedes = np.zeros((count, len(streets)))
+            opened = {}
+            for k, (owner, street_id) in enumerate(zip(approaches['owner'].tolist(), approaches['street_id'])):
+                if approaches['has_light'][k]:
+                    phase[k] = streets.index(street_id)
+                    for previous in opened.get(owner, ()):
+                        precedes[k, previous] = 1
+                    opened.setdefault(owner, []).append(phase[k])
+
+            flow_ratios = [0.0] * len(streets)
+            for k in np.flatnonzero((phase >= 0) & (approaches['capacity'] > 0)):
+                flow_ratios[phase[k]] = max(flow_ratios[phase[k]],
+                                            approaches['rate'][k] / approaches['capacity'][k])
+
+            plans.append({
+                'intersection_id': intersection_id,
+                'intersection_data': intersections[0],
+                'streets': streets,
+                'flow_ratios': flow_ratios,
+                'current': [network.light_at(intersection_id, street_id) for street_id in streets],
+                # Só o necessário para avaliar candidatos (enviado aos processos)
+                'kernel': {'approaches': approaches, 'phase': phase, 'precedes': precedes}
+            })
+        return plans
+
+    def _neighbors(self, cycle, greens, cycle_step, green_step):
+        """Vizinhança da busca local: ciclo ± passo (mesma divisão) e verde trocado entre fases"""
+        candidates = []
+        lost = self.LOST_TIME * len(greens)
+        for delta in (-cycle_step, cycle_step):
+            new_cycle = cycle + delta
+            if self.MIN_CYCLE <= new_cycle <= self.MAX_CYCLE and new_cycle - lost >= self.MIN_GREEN * len(greens):
+                candidates.append((new_cycle, self._split(new_cycle, np.array(greens) / sum(greens))))
+
+        for i in range(len(greens)):
+            for j in range(len(greens)):
+                if i != j and greens[j] - green_step >= self.MIN_GREEN:
+                    new_greens = list(greens)
+                    new_greens[i] += green_step
+                    new_greens[j] -= green_step
+                    candidates.append((cycle, tuple(new_greens)))
+
+            # Verde ocioso no fim do ciclo pode ir para qualquer fase
+            if sum(greens) + green_step <= cycle - lost:
+                new_greens = list(greens)
+                new_greens[i] += green_step
+                candidates.append((cycle, tuple(new_greens)))
+        return list(dict.fromkeys(candidates))
+
+    def _evaluate_round(self, executor, batch):
+        """
+        Avalia os candidatos de todas as intersecções (em lotes, no pool de processos)
+        e move cada uma para o seu melhor candidato se ele reduzir a espera.
+        Retorna, por item de `batch`, se houve movimento.
+        """
+        jobs = [(state, candidates[start:start + self.chunk_size])
+                for state, candidates in batch
+                for start in range(0, len(candidates), self.chunk_size)]
+        arguments = ([state['plan']['kernel'] for state, _ in jobs],
+                     [[cycle for cycle, _ in chunk] for _, chunk in jobs],
+                     [[greens for _, greens in chunk] for _, chunk in jobs],
+                     [self.tick] * len(jobs))
+        if executor is None:
+            outputs = list(map(evaluate_timings, *arguments))
+        else:
+            outputs = list(executor.map(evaluate_timings, *arguments))
+
+        moved = set()
+        for (state, chunk), (waits, _) in zip(jobs, outputs):
+            state['evaluations'] += len(chunk)
+            index = int(np.argmin(waits))
+            if waits[index] < state['best_wait'] - 1e-9:
+                state['best'] = chunk[index]
+                state['best_wait'] = float(waits[index])
+                moved.add(id(state))
+        return [id(state) in moved for state, _ in batch]
+
+    def _result(self, state):
+        plan = state['plan']
+        baseline_wait, baseline_served = state['baseline']
+        entry = {
+            'intersection_id': plan['intersection_id'],
+            'intersection_data': plan['intersection_data'],
+            'evaluations': state['evaluations']
+        }
+        if not plan['streets']:
+            entry.update({'optimized': False, 'message': 'Intersecção sem semáforos'})
+            return entry
+
+        cycle, greens = state['best']
+        improved = state['best_wait'] < baseline_wait - 1e-9
+        if improved:
+            optimized_wait, optimized_served = evaluate_timings(plan['kernel'], [cycle], [greens], self.tick)
+            optimized_wait, optimized_served = float(optimized_wait[0]), float(optimized_served[0])
+            timings = [{'street_id': street_id, 'cycle_time': cycle, 'green_time': green}
+                       for street_id, green in zip(plan['streets'], greens)]
+        else:
+            # A busca não superou os tempos atuais: recomenda mantê-los
+            optimized_wait, optimized_served = baseline_wait, baseline_served
+            timings = [{'street_id': light.street_id, 'cycle_time': light.cycle_time, 'green_time': light.green_time}
+                       for light in plan['current']]
+
+        webster_cycle, webster_greens = state['webster']
+        entry.update({
+            'optimized': improved,
+            'timings': timings,
+            'webster': {
+                'cycle_time': webster_cycle,
+                'green_times': dict(zip(plan['streets'], webster_greens))
+            },
+            'baseline': _wait_summary(baseline_wait, baseline_served),
+            'predicted': _wait_summary(optimized_wait, optimized_served),
+            'wait_change': optimized_wait - baseline_wait,
+            'wait_change_percent': _percent(optimized_wait, baseline_wait)
+        })
+        return entry
+
+
+def _wait_summary(total_wait, served):
+    return {
+        'total_waiting_time': total_wait,
+        'total_cars_passing': int(served),
+        'average_waiting_time': total_wait / served if served > 0 else 0
+    }
+
+
+def _percent(value, baseline):
+    return (value - baseline) / baseline * 100 if baseline > 0 else 0.0
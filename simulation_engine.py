@@ -1,17 +1,47 @@
+import logging
 import math
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import chain
+import numpy as np
 import requests
 import urllib.parse
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from metrics import GEOCODING_DURATION, INTERSECTIONS_FOUND, SEGMENT_PAIR_TESTS, STAGE_DURATION, timed
+from models.geocoding_cache import GeocodingCache, cache_key
+from models.network import NetworkSnapshot, StreetRecord
+
+logger = logging.getLogger(__name__)
+
+def haversine_km(points1, points2):
+    """Distância de Haversine (km) entre arrays de [lat, lon] em graus, ponto a ponto"""
+    lat1, lon1 = np.radians(points1).T
+    lat2, lon2 = np.radians(points2).T
+    
+    R = 6371  # Raio da Terra em km
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return R * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
 class TrafficFlowSimulator:
-    def __init__(self):
+    def __init__(self, rng=None):
         self.simulation_time = 3600  # 1 hora em segundos
+        self.rng = rng or random  # random.Random semeado para resultados reprodutíveis
         
-    def simulate_intersection_flow(self, intersection, streets, traffic_lights):
+    @timed(STAGE_DURATION, stage='simulate_intersection')
+    def simulate_intersection_flow(self, intersection, streets, traffic_lights=(), demand=None):
         """
         Simula o fluxo em uma intersecção - FOCADO EM TEMPO DE PARADA E FLUXO
+        
+        `streets` pode ser um NetworkSnapshot (preferível) ou a lista de ruas
+        acompanhada de `traffic_lights`. `demand` ({street_id: veículos/hora}, opcional)
+        substitui vehicles_per_hour, ex.: a demanda propagada pelo RoadGraph.
         """
+        network = NetworkSnapshot.coerce(streets, traffic_lights)
         intersection_id = self._get_intersection_id(intersection)
         
         results = {
@@ -28,10 +58,13 @@ class TrafficFlowSimulator:
         # Obter ruas da intersecção
         intersection_streets = []
         for street_id in intersection['streets']:
-            street = next((s for s in streets if s['id'] == street_id), None)
+            street = network.street(street_id)
             if street:
                 intersection_streets.append(street)
         
+        def street_demand(street):
+            return demand[street.id] if demand is not None else street.vehicles_per_hour
+        
         if not intersection_streets:
             return results
         
@@ -39,12 +72,12 @@ class TrafficFlowSimulator:
         total_wait_time = 0
         
         for street in intersection_streets:
-            street_id = street['id']
-            has_traffic_light = any(tl for tl in traffic_lights if tl['street_id'] == street_id)
+            street_id = street.id
+            has_traffic_light = network.has_traffic_light(street_id)
             
             # Dados da rua
-            cars_per_hour = street.get('vehicles_per_hour', 500)
-            lanes = street.get('lanes', 2)
+            cars_per_hour = street_demand(street)
+            lanes = street.lanes
             
             # Simulação baseada na presença de semáforo
             if has_traffic_light:
@@ -64,7 +97,7 @@ class TrafficFlowSimulator:
         
         # Classificar condições de tráfego
         results['traffic_condition'] = self._classify_traffic_condition(results['average_waiting_time'])
-        results['flow_efficiency'] = self._classify_flow_efficiency(total_cars, sum(s.get('vehicles_per_hour', 500) for s in intersection_streets))
+        results['flow_efficiency'] = self._classify_flow_efficiency(total_cars, sum(street_demand(s) for s in intersection_streets))
         
         return results
     
@@ -75,7 +108,7 @@ class TrafficFlowSimulator:
         cars_passing = int(base_flow * (lanes / 2))
         
         # Tempo de espera com semáforo (mais previsível)
-        avg_wait_per_car = random.uniform(15, 45)  # 15-45 segundos
+        avg_wait_per_car = self.rng.uniform(15, 45)  # 15-45 segundos
         total_waiting_time = cars_passing * avg_wait_per_car
         
         return {
@@ -95,7 +128,7 @@ class TrafficFlowSimulator:
         cars_passing = int(base_flow * (lanes / 2))
         
         # Tempo de espera sem semáforo (mais variável)
-        avg_wait_per_car = random.uniform(5, 25)  # 5-25 segundos
+        avg_wait_per_car = self.rng.uniform(5, 25)  # 5-25 segundos
         total_waiting_time = cars_passing * avg_wait_per_car
         
         return {
@@ -158,8 +191,61 @@ class TrafficLightManager:
         """Retorna semáforos de uma intersecção"""
         return self.intersection_lights.get(intersection_id, {})
 
+# Índice espacial para acelerar a busca de intersecções
+class SegmentGrid:
+    """Grade uniforme (spatial hash) sobre as caixas envolventes de segmentos [lat, lon]"""
+    
+    # Folga nas caixas para não perder toques no limite por erro de arredondamento
+    PADDING = 1e-9
+    
+    def __init__(self, boxes, cell_size=None):
+        # Caixas (min_lon, min_lat, max_lon, max_lat) já com a folga aplicada
+        self.boxes = boxes
+        
+        self.cell_size = cell_size or self._default_cell_size()
+        self.cells = {}
+        for index, box in enumerate(self.boxes):
+            min_cx, min_cy, max_cx, max_cy = self._cell_range(box)
+            for cx in range(min_cx, max_cx + 1):
+                for cy in range(min_cy, max_cy + 1):
+                    self.cells.setdefault((cx, cy), []).append(index)
+    
+    def _default_cell_size(self):
+        """Tamanho da célula igual à extensão média dos segmentos"""
+        if not self.boxes:
+            return 1.0
+        extent = sum(max(box[2] - box[0], box[3] - box[1]) for box in self.boxes) / len(self.boxes)
+        return max(extent, 1e-6)
+    
+    def _cell_range(self, box):
+        size = self.cell_size
+        return (math.floor(box[0] / size), math.floor(box[1] / size),
+                math.floor(box[2] / size), math.floor(box[3] / size))
+    
+    def candidate_pairs(self):
+        """Gera pares (a, b), a < b, de segmentos com caixas sobrepostas, sem repetição"""
+        boxes = self.boxes
+        size = self.cell_size
+        for (cx, cy), members in self.cells.items():
+            count = len(members)
+            for i in range(count):
+                a = members[i]
+                box_a = boxes[a]
+                for j in range(i + 1, count):
+                    b = members[j]
+                    box_b = boxes[b]
+                    if box_a[0] > box_b[2] or box_b[0] > box_a[2] or box_a[1] > box_b[3] or box_b[1] > box_a[3]:
+                        continue
+                    # O par só é emitido na célula que contém o canto inferior da sobreposição
+                    if math.floor(max(box_a[0], box_b[0]) / size) != cx or math.floor(max(box_a[1], box_b[1]) / size) != cy:
+                        continue
+                    yield (a, b) if a < b else (b, a)
+
 # Classe para gerenciar o mapa e geometria (MANTIDA)
 class MapManager:
+    # Pares de segmentos a partir dos quais o cálculo vetorizado compensa o custo fixo do NumPy
+    BATCH_MIN_PAIRS = 100
+    
     def __init__(self):
         self.streets = []
         self.intersections = []
@@ -186,34 +272,153 @@ class MapManager:
         
         return total_length
     
+    def calculate_street_lengths(self, coordinates_list):
+        """Comprimento (km) de várias ruas de uma vez, com Haversine vetorizado"""
+        if not coordinates_list:
+            return []
+        
+        # Todas as coordenadas concatenadas num único array (P, 2)
+        counts = np.array([len(coordinates) for coordinates in coordinates_list], dtype=np.intp)
+        points = np.fromiter(chain.from_iterable(chain.from_iterable(coordinates_list)),
+                             dtype=float, count=2 * int(counts.sum())).reshape(-1, 2)
+        owners = np.repeat(np.arange(len(coordinates_list)), counts)
+        
+        # Segmentos entre pontos consecutivos da mesma rua
+        same_street = owners[:-1] == owners[1:]
+        distances = haversine_km(points[:-1][same_street], points[1:][same_street])
+        
+        lengths = np.bincount(owners[:-1][same_street], weights=distances, minlength=len(coordinates_list))
+        return lengths.tolist()
+    
     def find_intersections(self, streets):
-        """Encontra intersecções entre ruas"""
-        intersections = []
+        """Encontra intersecções entre ruas (lista de ruas ou NetworkSnapshot)"""
+        streets = self._street_records(streets)
+        return self._build_intersections(streets, self._find_crossings(streets))
+    
+    def find_street_intersections(self, street, other_streets):
+        """Encontra apenas as intersecções de uma rua com as demais (ex.: rua recém-criada)"""
+        street = self._street_records([street])[0]
+        bounds = self._street_bounds(street)
+        if not bounds:
+            return []
         
-        for i, street1 in enumerate(streets):
-            for j, street2 in enumerate(streets):
-                if i >= j:  # Evitar duplicatas
-                    continue
-                
-                coords1 = street1.get('coordinates', [])
-                coords2 = street2.get('coordinates', [])
-                
-                # Verificar intersecções entre todos os segmentos
-                intersections_found = self.find_intersections_between_streets(coords1, coords2)
-                
-                for intersection_point in intersections_found:
-                    intersections.append({
-                        'point': intersection_point,
-                        'streets': [street1['id'], street2['id']],
-                        'street_names': [street1.get('name', 'Rua ' + str(street1['id'])), 
-                                       street2.get('name', 'Rua ' + str(street2['id']))],
-                        'type': 'INTERSECTION'
-                    })
+        # Descartar ruas cuja caixa envolvente não toca a da rua nova
+        nearby = []
+        for other in self._street_records(other_streets):
+            other_bounds = self._street_bounds(other)
+            if other_bounds and not (other_bounds[0] > bounds[2] or bounds[0] > other_bounds[2] or
+                                     other_bounds[1] > bounds[3] or bounds[1] > other_bounds[3]):
+                nearby.append(other)
+        
+        streets = nearby + [street]
+        return self._build_intersections(streets, self._find_crossings(streets, targets={len(nearby)}))
+    
+    def find_new_intersections(self, new_streets, existing_streets):
+        """Encontra as intersecções que envolvem ao menos uma das ruas novas"""
+        existing_streets = self._street_records(existing_streets)
+        streets = existing_streets + self._street_records(new_streets)
+        targets = set(range(len(existing_streets), len(streets)))
+        return self._build_intersections(streets, self._find_crossings(streets, targets=targets))
+    
+    def _street_records(self, streets):
+        """Normaliza a entrada (snapshot, registros ou dicionários) para StreetRecord"""
+        if isinstance(streets, NetworkSnapshot):
+            return streets.streets
+        return [street if isinstance(street, StreetRecord) else StreetRecord.from_dict(street) for street in streets]
+    
+    def _street_bounds(self, street):
+        """Caixa envolvente (min_lat, min_lon, max_lat, max_lon) da rua, com folga"""
+        coords = street.coordinates
+        if len(coords) < 2:
+            return None
+        padding = SegmentGrid.PADDING
+        points = np.asarray(coords, dtype=float)
+        (min_lat, min_lon), (max_lat, max_lon) = points.min(axis=0).tolist(), points.max(axis=0).tolist()
+        return (min_lat - padding, min_lon - padding, max_lat + padding, max_lon + padding)
+    
+    @timed(STAGE_DURATION, stage='find_intersections')
+    def _find_crossings(self, streets, targets=None):
+        """
+        Lista (rua_a, rua_b, segmento_a, segmento_b, ponto) ordenada como a varredura
+        por pares; com targets (índices de ruas), só pares envolvendo alguma delas
+        """
+        owners, numbers, coords, grid = self._segment_arrays(streets)
+        
+        # Testar apenas pares de segmentos cujas caixas envolventes se sobrepõem
+        pairs = []
+        for a, b in grid.candidate_pairs():
+            street_a = owners[a]
+            street_b = owners[b]
+            if street_a == street_b:
+                continue
+            if targets is not None and street_a not in targets and street_b not in targets:
+                continue
+            pairs.append((a, b) if street_a < street_b else (b, a))
+        SEGMENT_PAIR_TESTS.inc(len(pairs))
+        
+        first, second = np.array(pairs, dtype=np.intp).reshape(-1, 2).T
+        mask, points = self.segment_intersections_batch(coords[first], coords[second])
+        hits = np.flatnonzero(mask)
+        
+        found = []
+        for a, b, intersection_point in zip(first[hits].tolist(), second[hits].tolist(), points[hits].tolist()):
+            found.append((owners[a], owners[b], numbers[a], numbers[b], intersection_point))
+        
+        # Mesma ordem da varredura por pares de ruas e de segmentos
+        found.sort(key=lambda item: item[:4])
+        INTERSECTIONS_FOUND.inc(len(found))
+        return found
+    
+    def _segment_arrays(self, streets):
+        """
+        Segmentos de todas as ruas de uma vez: rua e número de cada segmento,
+        array (S, 2, 2) de pontos [lat, lon] e a grade sobre suas caixas
+        """
+        arrays = [np.asarray(street.coordinates, dtype=float).reshape(-1, 2) for street in streets]
+        counts = np.array([len(points) for points in arrays], dtype=np.intp)
+        points = np.concatenate(arrays) if arrays else np.empty((0, 2))
+        
+        # Pares de pontos consecutivos da mesma rua
+        point_owner = np.repeat(np.arange(len(streets)), counts)
+        same_street = point_owner[:-1] == point_owner[1:]
+        owners = point_owner[:-1][same_street]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.intp)
+        numbers = np.flatnonzero(same_street) - starts[owners]
+        coords = np.stack([points[:-1][same_street], points[1:][same_street]], axis=1)
+        
+        padding = SegmentGrid.PADDING
+        lat, lon = coords[:, :, 0], coords[:, :, 1]
+        boxes = np.stack([lon.min(axis=1) - padding, lat.min(axis=1) - padding,
+                          lon.max(axis=1) + padding, lat.max(axis=1) + padding], axis=1)
+        
+        return owners.tolist(), numbers.tolist(), coords, SegmentGrid(boxes.tolist())
+    
+    def _build_intersections(self, streets, crossings):
+        """Monta os dicionários de intersecção a partir dos cruzamentos encontrados"""
+        intersections = []
+        for street_a, street_b, _, _, intersection_point in crossings:
+            street1 = streets[street_a]
+            street2 = streets[street_b]
+            intersections.append({
+                'point': intersection_point,
+                'streets': [street1.id, street2.id],
+                'street_names': [street1.name, street2.name],
+                'type': 'INTERSECTION'
+            })
         
         return intersections
     
     def find_intersections_between_streets(self, coords1, coords2):
         """Encontra todas as intersecções entre duas ruas"""
+        n1, n2 = len(coords1) - 1, len(coords2) - 1
+        if n1 > 0 and n2 > 0 and n1 * n2 >= self.BATCH_MIN_PAIRS:
+            # Todos os pares de segmentos de uma vez, na ordem (i, j) do laço escalar
+            segments1 = np.stack([coords1[:-1], coords1[1:]], axis=1).astype(float)
+            segments2 = np.stack([coords2[:-1], coords2[1:]], axis=1).astype(float)
+            mask, points = self.segment_intersections_batch(np.repeat(segments1, n2, axis=0),
+                                                            np.tile(segments2, (n1, 1, 1)))
+            return points[mask].tolist()
+        
         intersections = []
         
         for i in range(len(coords1) - 1):
@@ -229,6 +434,28 @@ class MapManager:
         
         return intersections
     
+    def segment_intersections_batch(self, segments1, segments2):
+        """
+        Versão vetorizada de segment_intersection para arrays (N, 2, 2) de pontos [lat, lon].
+        Retorna (máscara de intersecção, pontos (N, 2) em [lat, lon]).
+        """
+        x1, y1 = segments1[:, 0, 1], segments1[:, 0, 0]  # lon, lat
+        x2, y2 = segments1[:, 1, 1], segments1[:, 1, 0]
+        x3, y3 = segments2[:, 0, 1], segments2[:, 0, 0]
+        x4, y4 = segments2[:, 1, 1], segments2[:, 1, 0]
+        
+        # Mesmas operações (e na mesma ordem) do cálculo escalar
+        denom = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+        parallel = np.abs(denom) < 1e-10  # Linhas são paralelas
+        safe_denom = np.where(parallel, 1.0, denom)
+        
+        t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / safe_denom
+        u = -((x1 - x2) * (y1 - y3) - (y1 - y2) * (x1 - x3)) / safe_denom
+        
+        mask = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+        points = np.stack([y1 + t * (y2 - y1), x1 + t * (x2 - x1)], axis=1)
+        return mask, points
+    
     def segment_intersection(self, p1, p2, p3, p4):
         """Calcula intersecção entre dois segmentos de linha"""
         x1, y1 = p1[1], p1[0]  # lon, lat
@@ -256,15 +483,62 @@ class MapManager:
         return None
 
 # Classes de geocoding (MANTIDAS)
+class TokenBucket:
+    """Limitador de taxa compartilhado entre threads: `rate` fichas por segundo, rajada de até `capacity`"""
+    
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Bloqueia até haver uma ficha disponível e a consome"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 class GeocodingService:
-    def __init__(self):
-        self.nominatim_url = "https://nominatim.openstreetmap.org/search"
+    TIMEOUT = (3.05, 10)  # (conexão, leitura) em segundos
+    
+    def __init__(self, nominatim_url="https://nominatim.openstreetmap.org/search", cache=None, timeout=None,
+                 rate_limiter=None):
+        self.nominatim_url = nominatim_url
         self.headers = {
             'User-Agent': 'TrafficSimulator/1.0'
         }
+        self.cache = cache if cache is not None else GeocodingCache()
+        self.timeout = timeout or self.TIMEOUT
+        # Política de uso do Nominatim: no máximo 1 requisição por segundo (acertos de cache não contam)
+        self.rate_limiter = rate_limiter or TokenBucket(rate=1.0)
+        
+        # Sessão com pool de conexões keep-alive e novas tentativas com backoff exponencial
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
-    def search_street(self, street_name, city="São Paulo", country="Brasil", limit=5):
-        """Busca ruas reais usando Nominatim"""
+    def search_street(self, street_name, city="São Paulo", country="Brasil", limit=5, raise_errors=False):
+        """
+        Busca ruas reais usando Nominatim (resultados em cache por consulta normalizada).
+        Com raise_errors=True, falhas de rede são propagadas em vez de virar lista vazia.
+        """
+        key = cache_key(street_name, city, country, limit)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
         query = f"{street_name}, {city}, {country}"
         
         params = {
@@ -276,10 +550,13 @@ class GeocodingService:
         }
         
         try:
-            response = requests.get(self.nominatim_url, params=params, headers=self.headers)
+            self.rate_limiter.acquire()
+            start = time.perf_counter()  # sem a espera do limitador
+            response = self.session.get(self.nominatim_url, params=params, timeout=self.timeout)
             response.raise_for_status()
             
             results = response.json()
+            GEOCODING_DURATION.observe(time.perf_counter() - start, outcome='ok')
             filtered_results = []
             
             for result in results:
@@ -294,15 +571,20 @@ class GeocodingService:
                         'importance': result.get('importance', 0)
                     })
             
+            # Só respostas bem-sucedidas entram no cache (falhas são tentadas de novo)
+            self.cache.put(key, filtered_results)
             return filtered_results
             
-        except requests.RequestException as e:
-            print(f"Erro na busca: {e}")
+        except (requests.RequestException, ValueError) as e:
+            GEOCODING_DURATION.observe(time.perf_counter() - start, outcome='error')
+            if raise_errors:
+                raise
+            logger.warning('Erro na busca de %r: %s', street_name, e)
             return []
 
 class RealStreetImporter:
-    def __init__(self):
-        self.geocoder = GeocodingService()
+    def __init__(self, geocoder=None):
+        self.geocoder = geocoder or GeocodingService()
         self.map_manager = MapManager()
     
     def import_real_street(self, street_name, city="São Paulo", vehicles_per_hour=800, average_speed=50, lanes=2):
@@ -312,14 +594,64 @@ class RealStreetImporter:
         if not results:
             return None, "Rua não encontrada"
         
-        # Cria rua simulada baseada na localização real
-        result = results[0]
+        return self._street_from_result(street_name, results[0], vehicles_per_hour, average_speed, lanes), \
+            "Rua importada com sucesso"
+    
+    def import_real_streets(self, items, max_workers=4):
+        """
+        Importa várias ruas. `items` são dicionários com street_name, city e, opcionalmente,
+        vehicles_per_hour, average_speed e lanes. Consultas idênticas (após normalização)
+        são geocodificadas uma única vez, num pool limitado de threads; o TokenBucket do
+        geocoder mantém a taxa dentro da política do Nominatim.
+        Retorna, na ordem de entrada, {'status', 'message', 'street_data'}, com status
+        'imported', 'duplicate' (com 'duplicate_of': índice da entrada original), 'not_found' ou 'error'.
+        """
+        keys = [cache_key(item['street_name'], item.get('city', 'São Paulo'), 'Brasil', 1) for item in items]
+        first_index = {}
+        for index, key in enumerate(keys):
+            first_index.setdefault(key, index)
+        
+        def geocode(index):
+            item = items[index]
+            try:
+                return self.geocoder.search_street(item['street_name'], item.get('city', 'São Paulo'), limit=1,
+                                                   raise_errors=True), None
+            except (requests.RequestException, ValueError) as e:
+                return None, str(e)
+        
+        unique_indexes = list(first_index.values())
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_indexes)))) as executor:
+            lookups = dict(zip(unique_indexes, executor.map(geocode, unique_indexes)))
+        
+        imported = []
+        for index, (item, key) in enumerate(zip(items, keys)):
+            if first_index[key] != index:
+                imported.append({'status': 'duplicate', 'message': "Consulta repetida na mesma importação",
+                                 'street_data': None, 'duplicate_of': first_index[key]})
+                continue
+            
+            results, error = lookups[index]
+            if error is not None:
+                imported.append({'status': 'error', 'message': f"Erro na busca: {error}", 'street_data': None})
+            elif not results:
+                imported.append({'status': 'not_found', 'message': "Rua não encontrada", 'street_data': None})
+            else:
+                street_data = self._street_from_result(item['street_name'], results[0],
+                                                       item.get('vehicles_per_hour', 800),
+                                                       item.get('average_speed', 50), item.get('lanes', 2))
+                imported.append({'status': 'imported', 'message': "Rua importada com sucesso",
+                                 'street_data': street_data})
+        
+        return imported
+    
+    def _street_from_result(self, street_name, result, vehicles_per_hour, average_speed, lanes):
+        """Cria rua simulada baseada na localização real"""
         center_lat, center_lon = result['lat'], result['lon']
         
         # Cria segmento de rua
         coordinates = self._create_street_segment(center_lat, center_lon)
         
-        street_data = {
+        return {
             'name': f"{street_name} (Real)",
             'coordinates': coordinates,
             'vehicles_per_hour': vehicles_per_hour,
@@ -327,8 +659,6 @@ class RealStreetImporter:
             'lanes': lanes,
             'real_street_data': result
         }
-        
-        return street_data, "Rua importada com sucesso"
     
     def _create_street_segment(self, center_lat, center_lon, length_km=0.3):
         """Cria um segmento de rua simulado"""
@@ -1,7 +1,10 @@
 // Mapa e estado da aplicação
 let map;
 let currentStreet = null;
-let streets = [];
+let streets = [];            // ruas da área visível (geometria simplificada para o zoom)
+let streetsById = new Map();  // todas as ruas já carregadas, para consultar nomes e atributos
+let streetLoadSequence = 0;   // descarta respostas de carregamentos que já foram substituídos
+let streetReloadTimer = null;
 let intersections = [];
 let currentPolyline = null;
 let isDrawing = false;
@@ -11,6 +14,10 @@ let trafficLightLayerGroup = L.layerGroup();
 let drawingMarkers = [];
 let selectedIntersection = null;
 
+// Resultados de fluxo exibidos: revisão da rede que eles refletem (atualização incremental após edições)
+let flowResultsShown = false;
+let flowRevision = null;
+
 // Variáveis para busca de ruas
 let currentSearchResults = [];
 let selectedSearchResult = null;
@@ -76,6 +83,12 @@ function setupMapEvents() {
         }
     });
 
+    // Ao mover ou dar zoom, recarregar só as ruas visíveis
+    map.on('moveend', function() {
+        clearTimeout(streetReloadTimer);
+        streetReloadTimer = setTimeout(loadVisibleStreets, 250);
+    });
+
     // Evento de duplo clique para finalizar
     map.on('dblclick', function(e) {
         if (isDrawing) {
@@ -261,6 +274,7 @@ async function finishStreetDrawing() {
             currentStreet.id = result.id;
             currentStreet.length_km = result.length_km;
             streets.push(currentStreet);
+            streetsById.set(currentStreet.id, currentStreet);
             
             // Limpar marcadores de desenho
             clearDrawingMarkers();
@@ -275,6 +289,7 @@ async function finishStreetDrawing() {
             
             // Buscar intersecções automaticamente
             findIntersections();
+            refreshFlowSimulation();
         }
     } catch (error) {
         console.error('Erro ao salvar rua:', error);
@@ -358,10 +373,7 @@ function removeLastPoint() {
 // Carregar ruas existentes
 async function loadExistingStreets() {
     try {
-        const response = await fetch('/api/streets');
-        streets = await response.json();
-        drawAllStreets();
-        updateStreetCount();
+        await loadVisibleStreets();
         
         // Atualizar lista de semáforos na sidebar
         updateTrafficLightsSidebar();
@@ -373,6 +385,36 @@ async function loadExistingStreets() {
     }
 }
 
+// Carregar as ruas da área visível (com margem), página a página, simplificadas para o zoom atual
+async function loadVisibleStreets() {
+    const sequence = ++streetLoadSequence;
+    const bounds = map.getBounds().pad(0.25);
+    const params = new URLSearchParams({
+        bbox: [bounds.getSouth(), bounds.getWest(), bounds.getNorth(), bounds.getEast()].join(','),
+        zoom: map.getZoom(),
+        limit: 2000
+    });
+    
+    try {
+        const visible = [];
+        let cursor = null;
+        do {
+            if (cursor !== null) params.set('cursor', cursor);
+            const response = await fetch(`/api/streets?${params}`);
+            const page = await response.json();
+            if (sequence !== streetLoadSequence) return;  // o mapa mudou: um carregamento mais novo assume
+            visible.push(...page.streets);
+            cursor = page.next_cursor;
+        } while (cursor !== null);
+        
+        streets = visible;
+        streets.forEach(street => streetsById.set(street.id, street));
+        drawAllStreets();
+    } catch (error) {
+        console.error('Erro ao carregar ruas:', error);
+    }
+}
+
 // Desenhar todas as ruas no mapa
 function drawAllStreets() {
     streetLayerGroup.clearLayers();
@@ -474,7 +516,7 @@ function getIntersectionId(intersection) {
 // Obter nomes das ruas da intersecção
 function getIntersectionStreetNames(intersection) {
     const streetNames = intersection.streets.map(streetId => {
-        const street = streets.find(s => s.id === streetId);
+        const street = streetsById.get(streetId);
         return street ? street.name : `Rua ${streetId}`;
     });
     return streetNames.join(' e ');
@@ -538,7 +580,7 @@ function updateTrafficLightsSidebar() {
     let html = '<div class="traffic-lights-list">';
     
     intersectionTrafficLights.forEach(light => {
-        const street = streets.find(s => s.id === light.street_id);
+        const street = streetsById.get(light.street_id);
         const streetName = street ? street.name : `Rua ${light.street_id}`;
         
         html += `
@@ -588,6 +630,7 @@ async function removeTrafficLightFromSidebar(intersectionId, streetId) {
         if (result.success) {
             await loadIntersectionTrafficLights();
             updateStatus('Semáforo removido com sucesso!');
+            refreshFlowSimulation();
         }
     } catch (error) {
         console.error('Erro ao remover semáforo:', error);
@@ -616,7 +659,7 @@ function showTrafficLightModal() {
     
     // Adicionar controles para cada rua da intersecção
     selectedIntersection.streets.forEach(streetId => {
-        const street = streets.find(s => s.id === streetId);
+        const street = streetsById.get(streetId);
         if (!street) return;
         
         const existingLight = intersectionTrafficLights.find(light => 
@@ -718,6 +761,7 @@ async function addTrafficLight(intersectionId, streetId) {
             await loadIntersectionTrafficLights(intersectionId);
             showTrafficLightModal(); // Recarregar modal
             updateStatus('Semáforo adicionado à intersecção!');
+            refreshFlowSimulation();
         } else {
             alert('Erro: ' + result.error);
         }
@@ -744,6 +788,7 @@ async function removeTrafficLight(intersectionId, streetId) {
             await loadIntersectionTrafficLights(intersectionId);
             showTrafficLightModal(); // Recarregar modal
             updateStatus('Semáforo removido da intersecção!');
+            refreshFlowSimulation();
         }
     } catch (error) {
         console.error('Erro ao remover semáforo:', error);
@@ -753,7 +798,7 @@ async function removeTrafficLight(intersectionId, streetId) {
 
 // ========== SISTEMA DE SIMULAÇÃO DE FLUXO ==========
 
-// Executar simulação de fluxo
+// Executar simulação de fluxo (resultados chegam em NDJSON e aparecem à medida que ficam prontos)
 async function runFlowSimulation() {
     if (intersections.length === 0) {
         alert('É necessário ter intersecções para simular.');
@@ -768,13 +813,43 @@ async function runFlowSimulation() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Accept': 'application/x-ndjson'
             },
-            body: JSON.stringify({})
+            body: JSON.stringify({ stream: 'ndjson' })
         });
 
-        const results = await response.json();
-        displayFlowResults(results);
+        if (!response.ok) {
+            const result = await response.json();
+            throw new Error(result.error);
+        }
+        
+        let total = 0;
+        let received = 0;
+        await readNdjson(response, records => {
+            const items = [];
+            records.forEach(record => {
+                if (record.type === 'start') {
+                    total = record.count;
+                    displayFlowResults({ intersections: [] });
+                    showLoading(false);
+                } else if (record.type === 'intersection') {
+                    items.push(record);
+                } else if (record.type === 'overall_flow') {
+                    updateFlowSummary(record.overall_flow);
+                } else if (record.type === 'error') {
+                    throw new Error(record.error);
+                }
+            });
+            
+            if (items.length > 0) {
+                appendFlowResults(items);
+                received += items.length;
+                updateStatus(`Simulando fluxo de tráfego... ${received}/${total}`);
+            }
+        });
         updateStatus('Simulação de fluxo concluída!');
+        flowResultsShown = true;
+        flowRevision = null;
         
     } catch (error) {
         console.error('Erro na simulação:', error);
@@ -785,119 +860,196 @@ async function runFlowSimulation() {
     }
 }
 
-// Mostrar resultados de fluxo
+// Atualiza os resultados exibidos depois de uma edição: o servidor só recalcula as intersecções
+// das ruas alteradas e, se já temos a revisão anterior, envia apenas as diferenças
+async function refreshFlowSimulation() {
+    if (!flowResultsShown) return;
+    
+    try {
+        const response = await fetch('/api/simulate-flow', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ incremental: true, since_revision: flowRevision })
+        });
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error);
+        }
+        
+        if (result.incremental) {
+            result.removed.forEach(intersection => {
+                document.querySelector(`[data-flow-key="${flowKey(intersection)}"]`)?.remove();
+            });
+            result.intersections.forEach(item => {
+                const card = document.querySelector(`[data-flow-key="${flowKey(item.intersection_data)}"]`);
+                if (card) {
+                    card.outerHTML = renderIntersectionFlow(item);
+                } else {
+                    appendFlowResults([item]);
+                }
+            });
+            updateFlowSummary(result.overall_flow);
+        } else {
+            displayFlowResults(result);
+        }
+        
+        flowRevision = result.revision;
+        updateStatus(`Simulação atualizada (${result.recomputed} intersecções recalculadas)`);
+    } catch (error) {
+        console.error('Erro ao atualizar simulação:', error);
+    }
+}
+
+// Identifica o cartão de uma intersecção nos resultados (ruas e ponto do cruzamento)
+function flowKey(intersection) {
+    return `${intersection.streets.join('-')}@${intersection.point.join(',')}`;
+}
+
+// Lê uma resposta NDJSON em partes, entregando os registros completos de cada parte
+async function readNdjson(response, onRecords) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        onRecords(lines.filter(line => line.trim()).map(line => JSON.parse(line)));
+    }
+    
+    if (buffer.trim()) {
+        onRecords([JSON.parse(buffer)]);
+    }
+}
+
+// Mostrar resultados de fluxo (completos ou o esqueleto inicial de uma simulação em andamento)
 function displayFlowResults(results) {
     const resultsDiv = document.getElementById('results');
     const contentDiv = document.getElementById('resultsContent');
     
-    let html = '';
+    contentDiv.innerHTML = `<div id="flowSummary">${results.overall_flow ? renderFlowSummary(results.overall_flow) : ''}</div>`;
     
-    // Estatísticas gerais
-    if (results.overall_flow) {
-        const flow = results.overall_flow;
-        
-        html += `
-            <div class="flow-summary">
-                <h3><i class="fas fa-chart-line"></i> Resumo do Fluxo</h3>
-                <div class="flow-stats">
-                    <div class="flow-stat">
-                        <div class="stat-icon">🚗</div>
-                        <div class="stat-info">
-                            <div class="stat-value">${flow.total_cars_passing?.toLocaleString() || 0}</div>
-                            <div class="stat-label">Carros Passando</div>
-                        </div>
+    // Resultados por intersecção
+    if (results.intersections && results.intersections.length > 0) {
+        appendFlowResults(results.intersections);
+    }
+    
+    resultsDiv.style.display = 'block';
+    resultsDiv.scrollIntoView({ behavior: 'smooth' });
+}
+
+// Acrescenta intersecções aos resultados já exibidos
+function appendFlowResults(items) {
+    let container = document.getElementById('intersectionFlows');
+    if (!container) {
+        document.getElementById('resultsContent').insertAdjacentHTML('beforeend', `<div class="intersection-flows" id="intersectionFlows">
+            <h3><i class="fas fa-crosshairs"></i> Fluxo por Intersecção</h3></div>`);
+        container = document.getElementById('intersectionFlows');
+    }
+    container.insertAdjacentHTML('beforeend', items.map(renderIntersectionFlow).join(''));
+}
+
+function updateFlowSummary(flow) {
+    document.getElementById('flowSummary').innerHTML = renderFlowSummary(flow);
+}
+
+// Estatísticas gerais
+function renderFlowSummary(flow) {
+    return `
+        <div class="flow-summary">
+            <h3><i class="fas fa-chart-line"></i> Resumo do Fluxo</h3>
+            <div class="flow-stats">
+                <div class="flow-stat">
+                    <div class="stat-icon">🚗</div>
+                    <div class="stat-info">
+                        <div class="stat-value">${flow.total_cars_passing?.toLocaleString() || 0}</div>
+                        <div class="stat-label">Carros Passando</div>
                     </div>
-                    <div class="flow-stat">
-                        <div class="stat-icon">⏱️</div>
-                        <div class="stat-info">
-                            <div class="stat-value">${flow.average_wait_per_car?.toFixed(1) || 0}s</div>
-                            <div class="stat-label">Tempo Médio de Espera</div>
-                        </div>
+                </div>
+                <div class="flow-stat">
+                    <div class="stat-icon">⏱️</div>
+                    <div class="stat-info">
+                        <div class="stat-value">${flow.average_wait_per_car?.toFixed(1) || 0}s</div>
+                        <div class="stat-label">Tempo Médio de Espera</div>
                     </div>
-                    <div class="flow-stat">
-                        <div class="stat-icon">🕒</div>
-                        <div class="stat-info">
-                            <div class="stat-value">${Math.round(flow.total_waiting_time / 60) || 0}min</div>
-                            <div class="stat-label">Tempo Total de Espera</div>
-                        </div>
+                </div>
+                <div class="flow-stat">
+                    <div class="stat-icon">🕒</div>
+                    <div class="stat-info">
+                        <div class="stat-value">${Math.round(flow.total_waiting_time / 60) || 0}min</div>
+                        <div class="stat-label">Tempo Total de Espera</div>
                     </div>
                 </div>
             </div>
-        `;
-    }
+        </div>
+    `;
+}
+
+function renderIntersectionFlow(item) {
+    const intersection = item.intersection_data;
+    const flow = item.flow_results;
+    const streetNames = getIntersectionStreetNames(intersection);
     
-    // Resultados por intersecção
-    if (results.intersections && results.intersections.length > 0) {
-        html += `<div class="intersection-flows">
-            <h3><i class="fas fa-crosshairs"></i> Fluxo por Intersecção</h3>`;
-        
-        results.intersections.forEach((item, index) => {
-            const intersection = item.intersection_data;
-            const flow = item.flow_results;
-            const streetNames = getIntersectionStreetNames(intersection);
-            
-            // Determinar cor baseada na condição do tráfego
-            const conditionClass = getTrafficConditionClass(flow.traffic_condition);
+    // Determinar cor baseada na condição do tráfego
+    const conditionClass = getTrafficConditionClass(flow.traffic_condition);
+    
+    return `
+        <div class="intersection-flow ${conditionClass}" data-flow-key="${flowKey(intersection)}">
+            <div class="flow-header">
+                <h4>${streetNames}</h4>
+                <span class="traffic-condition ${conditionClass}">
+                    ${flow.traffic_condition}
+                </span>
+            </div>
             
-            html += `
-                <div class="intersection-flow ${conditionClass}">
-                    <div class="flow-header">
-                        <h4>${streetNames}</h4>
-                        <span class="traffic-condition ${conditionClass}">
-                            ${flow.traffic_condition}
-                        </span>
+            <div class="flow-visual">
+                <div class="cars-flowing">
+                    <div class="flow-icon">🚗</div>
+                    <div class="flow-info">
+                        <strong>${flow.cars_per_hour?.toLocaleString() || 0} carros/hora</strong>
+                        <span>passando pela intersecção</span>
+                    </div>
+                </div>
+                
+                <div class="waiting-time">
+                    <div class="time-icon">⏱️</div>
+                    <div class="time-info">
+                        <strong>${flow.average_waiting_time?.toFixed(1) || 0} segundos</strong>
+                        <span>de espera média por carro</span>
                     </div>
+                </div>
+            </div>
+            
+            <div class="street-breakdown">
+                <h5>Detalhes por Rua:</h5>
+                ${Object.entries(flow.street_flows || {}).map(([streetId, streetFlow]) => {
+                    const street = streetsById.get(Number(streetId));
+                    const streetName = street ? street.name : `Rua ${streetId}`;
+                    const hasLight = streetFlow.has_traffic_light;
                     
-                    <div class="flow-visual">
-                        <div class="cars-flowing">
-                            <div class="flow-icon">🚗</div>
-                            <div class="flow-info">
-                                <strong>${flow.cars_per_hour?.toLocaleString() || 0} carros/hora</strong>
-                                <span>passando pela intersecção</span>
+                    return `
+                        <div class="street-flow-detail">
+                            <div class="street-name">
+                                ${streetName}
+                                ${hasLight ? '<span class="traffic-light-indicator" title="Com semáforo">🚦</span>' : ''}
                             </div>
-                        </div>
-                        
-                        <div class="waiting-time">
-                            <div class="time-icon">⏱️</div>
-                            <div class="time-info">
-                                <strong>${flow.average_waiting_time?.toFixed(1) || 0} segundos</strong>
-                                <span>de espera média por carro</span>
+                            <div class="street-stats">
+                                <span class="cars">${streetFlow.cars_passing} carros/h</span>
+                                <span class="wait-time">${streetFlow.average_wait_time?.toFixed(1)}s espera</span>
+                                <span class="flow-status ${streetFlow.flow_status.toLowerCase()}">${streetFlow.flow_status}</span>
                             </div>
                         </div>
-                    </div>
-                    
-                    <div class="street-breakdown">
-                        <h5>Detalhes por Rua:</h5>
-                        ${Object.entries(flow.street_flows || {}).map(([streetId, streetFlow]) => {
-                            const street = streets.find(s => s.id == streetId);
-                            const streetName = street ? street.name : `Rua ${streetId}`;
-                            const hasLight = streetFlow.has_traffic_light;
-                            
-                            return `
-                                <div class="street-flow-detail">
-                                    <div class="street-name">
-                                        ${streetName}
-                                        ${hasLight ? '<span class="traffic-light-indicator" title="Com semáforo">🚦</span>' : ''}
-                                    </div>
-                                    <div class="street-stats">
-                                        <span class="cars">${streetFlow.cars_passing} carros/h</span>
-                                        <span class="wait-time">${streetFlow.average_wait_time?.toFixed(1)}s espera</span>
-                                        <span class="flow-status ${streetFlow.flow_status.toLowerCase()}">${streetFlow.flow_status}</span>
-                                    </div>
-                                </div>
-                            `;
-                        }).join('')}
-                    </div>
-                </div>
-            `;
-        });
-        
-        html += `</div>`;
-    }
-    
-    contentDiv.innerHTML = html;
-    resultsDiv.style.display = 'block';
-    resultsDiv.scrollIntoView({ behavior: 'smooth' });
+                    `;
+                }).join('')}
+            </div>
+        </div>
+    `;
 }
 
 // Analisar intersecção específica
@@ -905,13 +1057,13 @@ async function analyzeIntersection(intersectionId) {
     try {
         showLoading(true);
         
-        // Executar simulação completa
+        // Simular apenas esta intersecção
         const simulationResponse = await fetch('/api/simulate-flow', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({})
+            body: JSON.stringify({ intersection_id: intersectionId })
         });
         
         const results = await simulationResponse.json();
@@ -980,7 +1132,7 @@ function showIntersectionAnalysis(flowResults, intersection) {
             <div class="street-analysis">
                 <h5>Fluxo por Rua:</h5>
                 ${Object.entries(flowResults.street_flows || {}).map(([streetId, streetFlow]) => {
-                    const street = streets.find(s => s.id == streetId);
+                    const street = streetsById.get(Number(streetId));
                     const streetName = street ? street.name : `Rua ${streetId}`;
                     const hasLight = streetFlow.has_traffic_light;
                     
@@ -1309,11 +1461,14 @@ function showLoading(show) {
 function clearMap() {
     // Limpar dados
     streets = [];
+    streetsById = new Map();
     intersections = [];
     intersectionTrafficLights = [];
     currentSearchResults = [];
     selectedSearchResult = null;
     selectedIntersection = null;
+    flowResultsShown = false;
+    flowRevision = null;
     
     // Limpar layers
     streetLayerGroup.clearLayers();
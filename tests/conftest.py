@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@pytest.fixture
+def app_module(tmp_path):
+    """Módulo app apontando para um banco temporário recém-inicializado"""
+    import app
+    from models.database import Database
+    from models.geometry import SimplifiedGeometryCache
+    from response_cache import ResponseCache
+
+    previous = app.db
+    app.db = Database(str(tmp_path / 'traffic.db'))
+    app.network_cache['snapshot'] = None
+    app.response_cache = ResponseCache()
+    app.flow_states.clear()
+    app.simplified_geometry_cache = SimplifiedGeometryCache()
+    app.init_db()
+    yield app
+    app.db = previous
+    app.network_cache['snapshot'] = None
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,89 @@
+import pytest
+
+from models.network import NetworkSnapshot, TrafficLightRecord
+from simulation.assignment import TrafficAssignment
+from simulation_engine import MapManager
+
+# Quadrado de duas ruas horizontais (1, 2) e duas verticais (3, 4); nós na ordem de find_intersections:
+# 0 = 1×3, 1 = 1×4, 2 = 2×3, 3 = 2×4. De 0 a 3 há duas rotas iguais, por 1 e por 2.
+STREETS = [
+    {'id': 1, 'coordinates': [[-23.55, -46.645], [-23.55, -46.625]]},
+    {'id': 2, 'coordinates': [[-23.56, -46.645], [-23.56, -46.625]]},
+    {'id': 3, 'coordinates': [[-23.565, -46.64], [-23.545, -46.64]]},
+    {'id': 4, 'coordinates': [[-23.565, -46.63], [-23.545, -46.63]]}
+]
+
+
+def square(traffic_lights=()):
+    map_manager = MapManager()
+    streets = [dict(street, lanes=1, length_km=map_manager.calculate_street_length(street['coordinates']))
+               for street in STREETS]
+    return NetworkSnapshot(streets, traffic_lights, map_manager.find_intersections(streets))
+
+
+def arriving(assignment, flow, node):
+    return float(flow[assignment.link_head == node].sum())
+
+
+def test_astar_matches_dijkstra_tree():
+    assignment = TrafficAssignment(square())
+    path = assignment.shortest_path(0, 3, assignment.free_time)
+    tree = assignment.shortest_path_tree(0, {1, 3}, assignment.free_time.tolist())
+
+    assert len(path) == 2
+    assert sum(assignment.free_time[path]) == pytest.approx(sum(assignment.free_time[tree[3]]))
+    assert assignment.link_head[tree[1]].tolist() == [1]
+
+
+def test_equilibrium_splits_symmetric_routes():
+    assignment = TrafficAssignment(square())
+    result = assignment.assign([(0, 3, 3000.0)])
+    flow = result['link_flow']
+
+    assert result['relative_gap'] < TrafficAssignment.GAP
+    assert not result['unreachable']
+    assert arriving(assignment, flow, 3) == pytest.approx(3000)
+    assert arriving(assignment, flow, 1) == pytest.approx(1500, rel=1e-3)
+    assert arriving(assignment, flow, 2) == pytest.approx(1500, rel=1e-3)
+    assert assignment.approach_demand(flow).sum() == pytest.approx(flow.sum())
+
+
+def test_short_green_pushes_flow_to_the_other_route():
+    # Pouco verde para a rua 4 no nó 3: a rota por 1 e 4 perde capacidade
+    assignment = TrafficAssignment(square([TrafficLightRecord('intersection_2-4', 4, 15, 90),
+                                           TrafficLightRecord('intersection_2-4', 2, 70, 90)]))
+    flow = assignment.assign([(0, 3, 3000.0)])['link_flow']
+
+    assert arriving(assignment, flow, 2) > arriving(assignment, flow, 1) + 500
+
+
+def test_one_way_reports_unreachable_pairs():
+    # Na mão do desenho, do nó 0 só se chega ao nó 1 (rua 1), que não tem saída
+    assignment = TrafficAssignment(square(), two_way=False)
+    result = assignment.assign([(0, 3, 800.0), (2, 1, 400.0)])
+
+    assert result['unreachable'] == [(0, 3, 800.0)]
+    assert arriving(assignment, result['link_flow'], 1) == pytest.approx(400)
+
+
+def test_assign_traffic_route(client):
+    response = client.post('/api/streets/bulk', json={'streets': [
+        {'name': f"Rua {street['id']}", 'coordinates': street['coordinates'], 'lanes': 1} for street in STREETS]})
+    assert response.status_code == 200
+
+    response = client.post('/api/assign-traffic', json={
+        'od': [{'origin': 'intersection_1-3', 'destination': 'intersection_2-4', 'vehicles_per_hour': 1200}],
+        'seed': 1
+    })
+    assert response.status_code == 200
+    body = response.json
+    assert body['assignment']['unassigned'] == []
+    arrivals = sum(flow['vehicles_per_hour'] for flow in body['street_flows']
+                   if flow['intersection_id'] == 'intersection_2-4')
+    assert arrivals == pytest.approx(1200)
+    assert body['overall_flow']
+
+    response = client.post('/api/assign-traffic', json={
+        'od': [{'origin': 'intersection_1-3', 'destination': 'intersection_7-8', 'vehicles_per_hour': 10}]
+    })
+    assert response.status_code == 400
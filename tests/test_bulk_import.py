@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from simulation_engine import RealStreetImporter, TokenBucket
+
+
+class FakeGeocoder:
+    """Geocoder em memória: registra as consultas e responde conforme o nome da rua"""
+
+    def __init__(self):
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def search_street(self, street_name, city='São Paulo', country='Brasil', limit=5, raise_errors=False):
+        with self.lock:
+            self.queries.append((street_name, city))
+        if street_name == 'Rua Instável':
+            raise requests.ConnectionError('sem conexão')
+        if street_name == 'Rua Inexistente':
+            return []
+        offset = len(street_name) * 0.001
+        return [{'display_name': street_name, 'lat': -23.55 + offset, 'lon': -46.63, 'type': 'residential',
+                 'class': 'highway', 'importance': 0.5}]
+
+
+@pytest.fixture
+def geocoder(app_module, monkeypatch):
+    fake = FakeGeocoder()
+    monkeypatch.setattr(app_module, 'real_street_importer', RealStreetImporter(fake))
+    return fake
+
+
+def test_bulk_import_reports_status_per_name(client, geocoder):
+    response = client.post('/api/import-street/bulk', json={'streets': [
+        'Avenida Paulista',
+        {'street_name': 'Rua Inexistente'},
+        '  avenida   PAULISTA ',
+        {'street_name': 'Rua Augusta', 'lanes': 3},
+        'Rua Instável'
+    ]})
+
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [result['status'] for result in results] == ['imported', 'not_found', 'duplicate', 'imported', 'error']
+    assert results[2]['duplicate_of'] == 0
+    assert results[2]['street_id'] == results[0]['street_id']
+    assert response.json['imported'] == 2
+    assert response.json['failed'] == 2
+    # Consultas repetidas (após normalização) vão uma vez ao geocoder
+    assert len(geocoder.queries) == 4
+
+    streets = {street['name']: street for street in client.get('/api/streets').json}
+    assert set(streets) == {'Avenida Paulista (Real)', 'Rua Augusta (Real)'}
+    assert streets['Rua Augusta (Real)']['lanes'] == 3
+
+
+@pytest.mark.parametrize('body', [{}, {'streets': []}, {'streets': [{'city': 'Santos'}]},
+                                  {'streets': ['Rua'] * 1001}])
+def test_bulk_import_rejects_invalid_body(client, geocoder, body):
+    assert client.post('/api/import-street/bulk', json=body).status_code == 400
+    assert geocoder.queries == []
+
+
+def test_token_bucket_limits_the_rate_across_threads():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # A primeira ficha já está disponível; as outras 10 chegam a 50 por segundo
+    assert time.monotonic() - start >= 0.19
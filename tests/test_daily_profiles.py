@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from models.demand import BINS, default_profiles, normalize_profile, pack_profile, unpack_profile
+from models.network import NetworkSnapshot
+from simulation.daily import DailyProfileSimulator
+from simulation_engine import MapManager
+
+STREETS = [
+    {'name': 'A', 'coordinates': [[-23.55, -46.64], [-23.55, -46.62]], 'vehicles_per_hour': 600},
+    {'name': 'B', 'coordinates': [[-23.56, -46.63], [-23.54, -46.63]], 'vehicles_per_hour': 300}
+]
+
+
+def crossing():
+    streets = [dict(street, id=index) for index, street in enumerate(STREETS, start=1)]
+    return NetworkSnapshot(streets, (), MapManager().find_intersections(streets))
+
+
+def test_hourly_profile_is_repeated_per_quarter_hour():
+    profile = normalize_profile(list(range(24)))
+    assert profile.shape == (BINS,)
+    assert profile[:5].tolist() == [0, 0, 0, 0, 1]
+    assert len(pack_profile(profile)) == 384
+    assert unpack_profile(pack_profile(profile)).tolist() == profile.tolist()
+
+
+@pytest.mark.parametrize('values', [[1] * 23, [1] * 95 + [-1], [True] * 24, 'x' * 24, None])
+def test_invalid_profiles_are_rejected(values):
+    with pytest.raises(ValueError):
+        normalize_profile(values)
+
+
+def test_default_profiles():
+    urban = default_profiles([600, 300])
+    assert urban.shape == (BINS, 2)
+    assert urban.max(axis=0).tolist() == [600, 300]
+    assert default_profiles([600], 'flat')[:, 0].tolist() == [600] * BINS
+
+
+def test_flat_demand_below_capacity_leaves_no_queue():
+    network = crossing()
+    result = DailyProfileSimulator().simulate_day(network.intersections, network, default_profiles([600, 300], 'flat'))
+
+    assert result['daily']['vehicles_arriving'] == pytest.approx(900 * 24)
+    assert result['daily']['cars_passing'] == pytest.approx(900 * 24)
+    assert all(interval['residual_queue'] == 0 for interval in result['intervals'])
+    assert result['peak_hour']['peak_hour_factor'] == pytest.approx(1)
+
+
+def test_oversaturated_interval_carries_its_queue_over():
+    network = crossing()
+    profiles = default_profiles([600, 300], 'flat')
+    profiles[40, 0] = 1_000_000  # 10:00–10:15 muito acima da capacidade da rua A
+
+    result = DailyProfileSimulator().simulate_day(network.intersections, network, profiles)
+    intervals = result['intervals']
+    assert intervals[40]['oversaturated_approaches'] == 1
+    assert intervals[40]['residual_queue'] > 0
+    assert intervals[41]['cars_passing'] > intervals[41]['vehicles_arriving']
+    assert intervals[41]['average_wait_per_car'] > intervals[39]['average_wait_per_car']
+    assert result['peak_hour']['start'] in ('09:15', '09:30', '09:45', '10:00')
+    assert result['peak_hour']['peak_hour_factor'] < 0.5
+
+
+def test_demand_profile_routes(client):
+    client.post('/api/streets/bulk', json={'streets': STREETS})
+
+    default = client.get('/api/streets/1/demand-profile').json
+    assert default['custom'] is False
+    assert max(default['vehicles_per_hour']) == 600
+
+    hourly = [100] * 24
+    hourly[3] = 2000
+    assert client.put('/api/streets/1/demand-profile', json={'vehicles_per_hour': hourly}).status_code == 200
+    stored = client.get('/api/streets/1/demand-profile').json
+    assert stored['custom'] is True
+    assert stored['vehicles_per_hour'][12:17] == [2000, 2000, 2000, 2000, 100]
+
+    day = client.post('/api/simulate-day', json={}).json
+    assert day['custom_profiles'] == 1
+    assert day['peak_hour']['start'] == '03:00'
+
+    assert client.put('/api/streets/1/demand-profile', json={'vehicles_per_hour': [1, 2]}).status_code == 400
+    assert client.put('/api/streets/99/demand-profile', json={'vehicles_per_hour': hourly}).status_code == 404
+    assert client.delete('/api/streets/1/demand-profile').status_code == 200
+    assert client.get('/api/streets/1/demand-profile').json['custom'] is False
+
+
+def test_bulk_import_validates_profiles(client):
+    response = client.post('/api/streets/bulk', json={'streets': [dict(STREETS[0], demand_profile=[5] * 10)]})
+    assert response.status_code == 400
+
+    response = client.post('/api/streets/bulk', json={'streets': [dict(STREETS[0], demand_profile=[5] * 24)]})
+    assert response.status_code == 200
+    assert np.allclose(client.get('/api/streets/1/demand-profile').json['vehicles_per_hour'], 5)
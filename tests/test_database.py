@@ -0,0 +1,22 @@
+import time
+
+import pytest
+
+from metrics import STAGE_DURATION
+
+
+def stage_seconds(stage):
+    """Soma acumulada do histograma de etapas para `stage`"""
+    prefix = f'{STAGE_DURATION.name}_sum{{stage="{stage}"}} '
+    return next((float(line[len(prefix):]) for line in STAGE_DURATION.render() if line.startswith(prefix)), 0.0)
+
+
+@pytest.mark.parametrize('block, stage', [('read', 'sqlite_read'), ('transaction', 'sqlite_write')])
+def test_sqlite_stages_exclude_caller_work(app_module, block, stage):
+    before = stage_seconds(stage)
+
+    with getattr(app_module.db, block)() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM streets').fetchall()
+        time.sleep(0.2)  # trabalho do chamador (ex.: jsonify) dentro do with
+
+    assert 0 < stage_seconds(stage) - before < 0.1
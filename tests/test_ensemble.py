@@ -0,0 +1,28 @@
+import math
+
+import numpy as np
+import pytest
+
+from simulation.ensemble import summarize, t_critical_95
+
+
+# Quantis 97,5% de referência da t de Student
+@pytest.mark.parametrize('df, expected', [(1, 12.706), (30, 2.042), (31, 2.0395), (40, 2.0211),
+                                          (60, 2.0003), (120, 1.9799), (999, 1.9623)])
+def test_t_critical_95(df, expected):
+    assert t_critical_95(df) == pytest.approx(expected, abs=1e-3)
+
+
+def test_t_critical_95_decreases_towards_the_normal_quantile():
+    values = [t_critical_95(df) for df in range(1, 1000)]
+    assert all(a > b for a, b in zip(values, values[1:]))
+    assert values[-1] > 1.96
+
+
+def test_summarize_uses_the_t_quantile_of_the_sample_size():
+    samples = np.arange(50, dtype=float)
+    stats = summarize(samples)
+
+    margin = t_critical_95(49) * samples.std(ddof=1) / math.sqrt(50)
+    assert stats['ci_high'] - stats['mean'] == pytest.approx(margin)
+    assert summarize([3.0])['ci_low'] == summarize([3.0])['ci_high'] == 3.0
@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from models import geocoding_cache
+from models.database import Database
+from models.geocoding_cache import GeocodingCache
+from simulation_engine import GeocodingService, TokenBucket
+
+NOMINATIM_RESULT = [{'display_name': 'Avenida Paulista, São Paulo', 'lat': '-23.5614', 'lon': '-46.6559',
+                     'type': 'primary', 'class': 'highway', 'importance': 0.8}]
+
+
+class StubNominatim:
+    """Servidor HTTP local no lugar do Nominatim: responde com os status de `statuses`, depois 200"""
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = []  # instante de cada requisição recebida
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(time.monotonic())
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                body = json.dumps(NOMINATIM_RESULT if status == 200 else {'error': 'indisponível'}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/search'
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    """Substitui o módulo time em models.geocoding_cache para avançar o relógio do TTL"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def stub():
+    server = StubNominatim()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(geocoding_cache, 'time', fake)
+    return fake
+
+
+def geocoder(stub, cache):
+    return GeocodingService(stub.url, cache=cache, rate_limiter=TokenBucket(rate=1000, capacity=1000))
+
+
+def test_cache_hit_skips_the_request(stub):
+    service = geocoder(stub, GeocodingCache())
+
+    first = service.search_street('Avenida Paulista')
+    second = service.search_street('  avenida   PAULISTA ')
+
+    assert first == second == [{'display_name': 'Avenida Paulista, São Paulo', 'lat': -23.5614, 'lon': -46.6559,
+                                'type': 'primary', 'class': 'highway', 'importance': 0.8}]
+    assert len(stub.requests) == 1
+
+
+def test_sqlite_cache_survives_a_new_process(stub, tmp_path):
+    database = Database(str(tmp_path / 'traffic.db'))
+    database.init_schema()
+    geocoder(stub, GeocodingCache(database)).search_street('Avenida Paulista')
+
+    # Nova instância (memória vazia): resultado vem da tabela geocoding_cache
+    assert geocoder(stub, GeocodingCache(database)).search_street('Avenida Paulista')
+    assert len(stub.requests) == 1
+
+
+@pytest.mark.parametrize('use_database', [False, True])
+def test_expired_entry_is_fetched_again(stub, clock, tmp_path, use_database):
+    database = None
+    if use_database:
+        database = Database(str(tmp_path / 'traffic.db'))
+        database.init_schema()
+    service = geocoder(stub, GeocodingCache(database, ttl_seconds=60))
+
+    service.search_street('Avenida Paulista')
+    clock.now += 59
+    service.search_street('Avenida Paulista')
+    assert len(stub.requests) == 1
+
+    clock.now += 2
+    service.search_street('Avenida Paulista')
+    assert len(stub.requests) == 2
+
+
+def test_retries_with_backoff_until_success(stub):
+    stub.statuses = [503, 503]
+    service = geocoder(stub, GeocodingCache())
+
+    assert service.search_street('Avenida Paulista')
+    assert len(stub.requests) == 3
+    # Backoff exponencial (backoff_factor=0.5): a segunda nova tentativa espera ~1 s
+    assert stub.requests[2] - stub.requests[1] >= 0.9
+
+
+def test_failures_are_not_cached(stub, caplog):
+    stub.statuses = [404]
+    service = geocoder(stub, GeocodingCache())
+
+    with caplog.at_level('WARNING', logger='simulation_engine'):
+        assert service.search_street('Avenida Paulista') == []
+    assert "Erro na busca de 'Avenida Paulista'" in caplog.text
+    with pytest.raises(requests.HTTPError):
+        stub.statuses = [404]
+        service.search_street('Avenida Paulista', raise_errors=True)
+    assert service.search_street('Avenida Paulista')
+    assert len(stub.requests) == 3
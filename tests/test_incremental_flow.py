@@ -0,0 +1,88 @@
+import pytest
+
+# Rua 1 horizontal, cruzada pelas ruas 2 e 3
+STREETS = [
+    {'name': 'A', 'coordinates': [[-23.55, -46.64], [-23.55, -46.60]], 'vehicles_per_hour': 900},
+    {'name': 'B', 'coordinates': [[-23.56, -46.63], [-23.54, -46.63]], 'vehicles_per_hour': 400},
+    {'name': 'C', 'coordinates': [[-23.56, -46.61], [-23.54, -46.61]], 'vehicles_per_hour': 600}
+]
+
+
+@pytest.fixture
+def network(client):
+    client.post('/api/streets/bulk', json={'streets': STREETS})
+    return client
+
+
+def simulate(client, **body):
+    response = client.post('/api/simulate-flow', json={'incremental': True, 'seed': 5, **body})
+    assert response.status_code == 200
+    return response.json
+
+
+def crossing(result):
+    return result['intersection_data']['streets']
+
+
+def test_only_changed_intersections_are_recomputed(network, app_module):
+    first = simulate(network)
+    assert first['incremental'] is False
+    assert first['recomputed'] == 2
+
+    network.post('/api/intersection-traffic-lights', json={'intersection_id': 'intersection_1-2', 'street_id': 2,
+                                                           'cycle_time': 90, 'green_time': 20})
+    second = simulate(network, since_revision=first['revision'])
+    assert second['incremental'] is True
+    assert second['revision'] == first['revision'] + 1
+    assert second['recomputed'] == 1
+    assert [crossing(result) for result in second['intersections']] == [[1, 2]]
+    assert second['removed'] == []
+
+    # Os totais atualizados por delta coincidem com uma execução completa do zero
+    app_module.flow_states.clear()
+    full = simulate(network)
+    assert full['incremental'] is False
+    assert full['overall_flow'] == pytest.approx(second['overall_flow'])
+
+
+def test_removed_street_drops_its_intersections(network):
+    first = simulate(network)
+    network.delete('/api/streets?id=3')
+
+    second = simulate(network, since_revision=first['revision'])
+    assert second['recomputed'] == 0
+    assert [removed['streets'] for removed in second['removed']] == [[1, 3]]
+    assert second['overall_flow']['total_cars_passing'] < first['overall_flow']['total_cars_passing']
+
+
+def test_unknown_changes_fall_back_to_a_full_run(network, app_module):
+    first = simulate(network)
+    with app_module.db.transaction() as cursor:
+        app_module.revision_repository.bump(cursor)
+
+    second = simulate(network, since_revision=first['revision'])
+    assert second['incremental'] is False
+    assert second['recomputed'] == 2
+    assert len(second['intersections']) == 2
+
+
+def test_changed_streets_since_revision(app_module):
+    repository = app_module.revision_repository
+    with app_module.db.transaction() as cursor:
+        start = repository.current(cursor)
+        repository.bump(cursor, [3, 1])
+        repository.bump(cursor, ['2'])
+    with app_module.db.read() as cursor:
+        assert repository.changed_streets(cursor, start) == {1, 2, 3}
+        assert repository.changed_streets(cursor, start + 1) == {2}
+        assert repository.changed_streets(cursor, start + 2) == set()
+
+    with app_module.db.transaction() as cursor:
+        repository.bump(cursor)
+    with app_module.db.read() as cursor:
+        assert repository.changed_streets(cursor, start) is None
+
+
+def test_incremental_rejects_subsets(network):
+    response = network.post('/api/simulate-flow', json={'incremental': True, 'bbox': [-24, -47, -23, -46]})
+    assert response.status_code == 400
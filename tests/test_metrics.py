@@ -0,0 +1,71 @@
+from metrics import INTERSECTIONS_FOUND, Counter, Histogram, Registry
+from simulation_engine import MapManager
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('latency_seconds', 'Latência', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, route='/a')
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 4.25' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+
+
+def test_counter_keeps_one_series_per_label_set():
+    registry = Registry()
+    counter = registry.counter('hits_total', 'Consultas', ('cache', 'result'))
+    counter.inc(cache='geo', result='hit')
+    counter.inc(2, cache='geo', result='hit')
+    counter.inc(cache='geo', result='miss')
+    counter.inc(cache='say "x"', result='miss')
+
+    assert counter.value(cache='geo', result='hit') == 3
+    text = registry.render()
+    assert '# TYPE hits_total counter' in text
+    assert 'hits_total{cache="geo",result="hit"} 3.0' in text
+    assert 'hits_total{cache="geo",result="miss"} 1.0' in text
+    assert 'hits_total{cache="say \\"x\\"",result="miss"} 1.0' in text
+
+
+def test_unlabelled_counter_renders_without_braces():
+    counter = Counter('events_total', 'Eventos')
+    counter.inc()
+    assert counter.render() == ['events_total 1.0']
+
+
+def test_find_intersections_counts_results():
+    before = INTERSECTIONS_FOUND.value()
+    MapManager().find_intersections([
+        {'id': 1, 'coordinates': [[0.0, 0.0], [0.0, 2.0]]},
+        {'id': 2, 'coordinates': [[-1.0, 1.0], [1.0, 1.0]]}
+    ])
+    assert INTERSECTIONS_FOUND.value() == before + 1
+
+
+def test_metrics_endpoint_reports_routes_and_stages(client):
+    assert client.get('/api/streets').status_code == 200
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'traffic_http_request_duration_seconds_count{method="GET",route="/api/streets",status="200"}' in text
+    assert 'traffic_stage_duration_seconds_count{stage="sqlite_read"}' in text
+
+
+def test_profile_requires_opt_in(client, app_module):
+    response = client.get('/api/streets?profile=1')
+    assert response.is_json
+
+    app_module.app.config['PROFILING_ENABLED'] = True
+    try:
+        response = client.get('/api/streets', headers={'X-Profile': '1'})
+    finally:
+        app_module.app.config['PROFILING_ENABLED'] = False
+    assert response.mimetype == 'text/plain'
+    assert response.headers['X-Profiled-Status'] == '200'
+    assert 'GET /api/streets' in response.get_data(as_text=True)
@@ -0,0 +1,126 @@
+import bz2
+import io
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from models.osm import OSMStreetReader, highway_attributes, merge_shared_vertices, parse_lanes, parse_speed
+from simulation_engine import MapManager
+
+
+@pytest.mark.parametrize('value, expected', [('3', 3), ('3;2', 3), (' 4 ', 4), ('0', 2), ('two', 2), (None, 2)])
+def test_parse_lanes(value, expected):
+    assert parse_lanes(value, 2) == expected
+
+
+@pytest.mark.parametrize('value, expected', [('50', 50), ('60 km/h', 60), ('30 mph', 48.3), ('BR:urban', 40), (None, 40)])
+def test_parse_speed(value, expected):
+    assert parse_speed(value, 40) == expected
+
+
+def test_link_roads_use_their_main_class_with_one_lane():
+    assert highway_attributes('primary', {}) == (2, 50, 1000)
+    assert highway_attributes('primary_link', {}) == (1, 50, 500)
+    assert highway_attributes('primary_link', {'lanes': '2', 'maxspeed': '40'}) == (2, 40, 500)
+
+
+def test_reader_skips_non_vehicle_ways_and_reads_compressed_extracts(tmp_path):
+    path = tmp_path / 'extract.osm.bz2'
+    with open(os.path.join(FIXTURES, 'shared_nodes.osm'), 'rb') as source:
+        path.write_bytes(bz2.compress(source.read()))
+
+    reader = OSMStreetReader(str(path))
+    streets = list(reader.streets())
+    assert reader.way_count == 3
+    assert [street['osm_id'] for street in streets] == [10, 11, 12]
+    assert streets[2]['name'] == 'tertiary 12 (Real)'
+    assert streets[1]['coordinates'] == [[-23.56, -46.63], [-23.55, -46.63], [-23.54, -46.63]]
+
+
+def test_ways_clipped_by_the_extract_keep_their_remaining_nodes(tmp_path):
+    path = tmp_path / 'clipped.osm'
+    path.write_text('''<osm>
+  <node id="1" lat="-23.55" lon="-46.64"/>
+  <node id="2" lat="-23.55" lon="-46.63"/>
+  <way id="1"><nd ref="1"/><nd ref="2"/><nd ref="99"/><tag k="highway" v="residential"/><tag k="ref" v="SP-1"/></way>
+  <way id="2"><nd ref="2"/><nd ref="98"/><tag k="highway" v="residential"/></way>
+</osm>''')
+
+    reader = OSMStreetReader(str(path))
+    street, = reader.streets()
+    assert street['name'] == 'SP-1 (Real)'
+    assert street['coordinates'] == [[-23.55, -46.64], [-23.55, -46.63]]
+    assert reader.skipped == 1
+
+
+def test_shared_vertex_is_merged_only_by_the_importer():
+    # Vias em cruz com o nó do meio em comum: quatro pares de segmentos tocam o mesmo ponto
+    streets = [{'id': 1, 'coordinates': [[0.0, 0.0], [0.0, 1.0], [0.0, 2.0]]},
+               {'id': 2, 'coordinates': [[-1.0, 1.0], [0.0, 1.0], [1.0, 1.0]]}]
+    found = MapManager().find_intersections(streets)
+    assert len(found) == 4
+    assert {tuple(intersection['point']) for intersection in found} == {(0.0, 1.0)}
+
+    merged = merge_shared_vertices(found + [dict(found[0], point=[0.0, 1.0 + 1e-9]),
+                                            dict(found[0], streets=[1, 3])])
+    assert merged == [found[0], dict(found[0], streets=[1, 3])]
+
+
+def intersection_rows(app_module):
+    with app_module.db.read() as cursor:
+        cursor.execute('SELECT street_a_id, street_b_id, lat, lon FROM intersections ORDER BY id')
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def test_shared_node_gives_one_intersection_per_junction(app_module):
+    summary = app_module.import_osm_extract(os.path.join(FIXTURES, 'shared_nodes.osm'))
+
+    assert summary == {'ways_found': 3, 'imported': 3, 'skipped': 0, 'intersections_found': 2}
+    rows = intersection_rows(app_module)
+    assert [(a, b) for a, b, _, _ in rows] == [(1, 2), (1, 3)]
+    assert rows[0][2:] == (-23.55, -46.63)
+    assert rows[1][2:] == (-23.55, -46.62)
+
+
+def test_batches_give_the_same_intersections(app_module):
+    app_module.import_osm_extract(os.path.join(FIXTURES, 'shared_nodes.osm'), batch_size=1)
+
+    assert [(a, b) for a, b, _, _ in intersection_rows(app_module)] == [(1, 2), (1, 3)]
+
+
+def test_streets_keep_the_way_geometry_and_tags(client, app_module):
+    app_module.import_osm_extract(os.path.join(FIXTURES, 'shared_nodes.osm'))
+
+    streets = {street['name']: street for street in client.get('/api/streets').json}
+    assert set(streets) == {'Rua A (Real)', 'Avenida B (Real)', 'tertiary 12 (Real)'}
+    assert streets['Rua A (Real)']['coordinates'] == [[-23.55, -46.64], [-23.55, -46.63], [-23.55, -46.62]]
+    assert streets['Avenida B (Real)']['lanes'] == 3
+    assert streets['tertiary 12 (Real)']['lanes'] == 2
+
+
+@pytest.mark.parametrize('filename, form', [('extract.pbf', {}), ('extract.osm', {'batch_size': '0'}),
+                                            ('extract.osm', {'batch_size': 'x'})])
+def test_import_osm_rejects_invalid_uploads(client, filename, form):
+    response = client.post('/api/import-osm', data={'file': (io.BytesIO(b'<osm/>'), filename), **form})
+    assert response.status_code == 400
+
+
+def test_cli_imports_into_the_given_database(app_module, tmp_path, monkeypatch, capsys):
+    import import_osm
+    from models.database import Database
+
+    target = str(tmp_path / 'offline.db')
+    monkeypatch.setattr('sys.argv', ['import_osm.py', os.path.join(FIXTURES, 'shared_nodes.osm'),
+                                     '--database', target, '--batch-size', '2'])
+    previous = app_module.db
+    import_osm.main()
+
+    assert app_module.db is previous
+    assert '3 ruas importadas' in capsys.readouterr().out
+    with Database(target).read() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM streets')
+        assert cursor.fetchone()[0] == 3
+    with app_module.db.read() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM streets')
+        assert cursor.fetchone()[0] == 0
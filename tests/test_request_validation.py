@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.mark.parametrize('tick', [0, -1, 0.01, 61, 'a', True])
+@pytest.mark.parametrize('body', [{}, {'incremental': True}, {'mode': 'queue'}])
+def test_simulate_flow_rejects_invalid_tick(client, body, tick):
+    response = client.post('/api/simulate-flow', json={**body, 'tick_seconds': tick})
+
+    assert response.status_code == 400
+    assert 'tick_seconds' in response.json['error']
+
+
+def test_assign_traffic_rejects_invalid_tick(client):
+    response = client.post('/api/assign-traffic', json={'od': [{}], 'tick_seconds': 0})
+
+    assert response.status_code == 400
+    assert 'tick_seconds' in response.json['error']
+
+
+def test_simulate_flow_accepts_tick_in_range(client):
+    response = client.post('/api/simulate-flow', json={'mode': 'queue', 'tick_seconds': 0.5})
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('workers', ['x', 0, 1.5, 100000])
+def test_simulate_ensemble_rejects_invalid_workers(client, workers):
+    response = client.post('/api/simulate-ensemble', json={'workers': workers})
+
+    assert response.status_code == 400
+    assert 'workers' in response.json['error']
+
+
+def test_simulate_ensemble_rejects_invalid_tick(client):
+    response = client.post('/api/simulate-ensemble', json={'tick_seconds': 0})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('body', [{'workers': 'x'}, {'workers': 0}, {'tick_seconds': 0}, {'tick_seconds': 'a'}])
+def test_optimize_signals_rejects_invalid_options(client, body):
+    response = client.post('/api/optimize-signals', json=body)
+
+    assert response.status_code == 400
+    assert set(body) & set(response.json['error'].split())
+
+
+@pytest.mark.parametrize('body', [{'workers': 'x'}, {'workers': -1}, {'tick_seconds': 0}, {'tick_seconds': 1000}])
+def test_compare_scenarios_rejects_invalid_options(client, body):
+    response = client.post('/api/compare-scenarios', json={'scenarios': [{'name': 'a'}], **body})
+
+    assert response.status_code == 400
+    assert set(body) & set(response.json['error'].split())
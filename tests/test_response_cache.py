@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import pytest
+
+import response_cache
+from response_cache import MIN_COMPRESS_BYTES, ResponseCache, encode, negotiate_encoding
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate', 'gzip'),
+    ('deflate', None),
+    ('gzip;q=0', None),
+    ('', None),
+    (None, None)
+])
+def test_negotiate_encoding(header, expected, monkeypatch):
+    # Sem depender de o brotli estar instalado
+    monkeypatch.delitem(response_cache.COMPRESSORS, 'br', raising=False)
+    assert negotiate_encoding(header) == expected
+
+
+def test_small_bodies_are_not_compressed():
+    assert encode(b'{}', 'gzip') == (b'{}', None)
+    body = b'x' * MIN_COMPRESS_BYTES
+    compressed, used = encode(body, 'gzip')
+    assert used == 'gzip' and gzip.decompress(compressed) == body
+
+
+def test_cache_keeps_only_the_current_revision():
+    cache = ResponseCache()
+    body = b'[' + b'1, ' * 1000 + b'1]'
+    cache.put('/a', 1, body)
+    assert cache.get('/a', 1) == (body, None)
+
+    compressed, used = cache.get('/a', 1, 'gzip')
+    assert used == 'gzip' and gzip.decompress(compressed) == body
+    assert cache.get('/a', 1, 'gzip')[0] is compressed  # comprimido uma única vez
+
+    cache.put('/b', 2, b'[]')
+    assert cache.get('/a', 2) is None
+    assert cache.get('/a', 1) is None
+
+    # Resposta atrasada de uma revisão anterior não entra no cache
+    cache.put('/a', 1, body)
+    assert cache.get('/a', 1) is None and cache.get('/b', 2) == (b'[]', None)
+
+
+def add_streets(client, count, offset=0):
+    client.post('/api/streets/bulk', json={'streets': [
+        {'name': f'Rua {offset + index}', 'coordinates': [[-23.55 + (offset + index) * 0.001, -46.64],
+                                                          [-23.55 + (offset + index) * 0.001, -46.63]]}
+        for index in range(count)]})
+
+
+def test_etag_revalidation_and_invalidation(client):
+    add_streets(client, 3)
+    first = client.get('/api/streets')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert len(first.json) == 3
+
+    not_modified = client.get('/api/streets', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+    add_streets(client, 1, offset=3)
+    changed = client.get('/api/streets', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert len(changed.json) == 4
+
+
+def test_each_url_is_cached_separately(client):
+    add_streets(client, 3)
+    assert len(client.get('/api/streets').json) == 3
+    assert len(client.get('/api/streets?limit=2').json['streets']) == 2
+    assert client.get('/api/intersections').json == []
+
+
+def test_gzip_negotiation(client):
+    add_streets(client, 30)
+    plain = client.get('/api/streets')
+    compressed = client.get('/api/streets', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert json.loads(gzip.decompress(compressed.data)) == plain.json
+    assert len(compressed.data) < len(plain.data)
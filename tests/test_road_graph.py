@@ -0,0 +1,21 @@
+import pytest
+
+from models.network import NetworkSnapshot, TrafficLightRecord
+from simulation.queue_engine import QueueFlowSimulator
+from simulation.road_graph import RoadGraph
+from simulation_engine import MapManager
+
+
+@pytest.mark.parametrize('order', [[1, 2], [2, 1]])
+def test_capacity_uses_the_light_of_each_approach(order):
+    streets = [{'id': 1, 'coordinates': [[-23.55, -46.64], [-23.55, -46.62]], 'lanes': 2},
+               {'id': 2, 'coordinates': [[-23.56, -46.63], [-23.54, -46.63]], 'lanes': 1}]
+    intersection, = MapManager().find_intersections(streets)
+    # A ordem das ruas na intersecção não muda o semáforo encontrado
+    intersection['streets'] = order
+    lights = [TrafficLightRecord('intersection_1-2', 1, 30, 90)]
+    graph = RoadGraph(NetworkSnapshot(streets, lights, [intersection]))
+
+    capacity = dict(zip(graph.approach_street_id, graph.capacity().tolist()))
+    assert capacity[1] == pytest.approx(2 * QueueFlowSimulator.SATURATION_FLOW * 30 / 90)
+    assert capacity[2] == pytest.approx(QueueFlowSimulator.UNSIGNALIZED_FLOW)
@@ -0,0 +1,102 @@
+import pytest
+
+from models.network import NetworkOverlay, NetworkSnapshot, TrafficLightRecord
+from simulation.scenarios import ScenarioRunner, evaluate_scenarios, simulate_intersections
+from simulation_engine import MapManager
+
+# Rua 1 horizontal, cruzada pelas ruas 2 e 3; semáforos em 1-2
+STREETS = [
+    {'name': 'A', 'coordinates': [[-23.55, -46.64], [-23.55, -46.60]], 'vehicles_per_hour': 1100, 'lanes': 2},
+    {'name': 'B', 'coordinates': [[-23.56, -46.63], [-23.54, -46.63]], 'vehicles_per_hour': 500, 'lanes': 1},
+    {'name': 'C', 'coordinates': [[-23.56, -46.61], [-23.54, -46.61]], 'vehicles_per_hour': 700, 'lanes': 1}
+]
+LIGHTS = [TrafficLightRecord('intersection_1-2', 1, 50, 90), TrafficLightRecord('intersection_1-2', 2, 30, 90)]
+
+# Cenário: verde maior para a rua 2, semáforo novo na rua 3 e 50% mais demanda na rua 3
+SCENARIO = {
+    'name': 'mudança',
+    'lights': {('intersection_1-2', 2): (40, 90), ('intersection_1-3', 3): (45, 90)},
+    'demand': {3: 1.5}
+}
+
+
+def base_network():
+    streets = [dict(street, id=index) for index, street in enumerate(STREETS, start=1)]
+    return NetworkSnapshot(streets, LIGHTS, MapManager().find_intersections(streets))
+
+
+def applied_network():
+    """A mesma alteração do cenário gravada numa rede nova"""
+    streets = [dict(street, id=index) for index, street in enumerate(STREETS, start=1)]
+    streets[2]['vehicles_per_hour'] *= 1.5
+    lights = [LIGHTS[0], TrafficLightRecord('intersection_1-2', 2, 40, 90),
+              TrafficLightRecord('intersection_1-3', 3, 45, 90)]
+    return NetworkSnapshot(streets, lights, MapManager().find_intersections(streets))
+
+
+def test_overlay_leaves_the_base_untouched():
+    network = base_network()
+    overlay = NetworkOverlay(network, {('intersection_2-1', 2): None, ('intersection_1-3', 3): LIGHTS[0]})
+
+    assert overlay.light_at('intersection_1-2', 2) is None
+    assert not overlay.has_traffic_light(2)
+    assert overlay.has_traffic_light(3)
+    assert network.light_at('intersection_1-2', 2) is LIGHTS[1]
+    assert network.has_traffic_light(2) and not network.has_traffic_light(3)
+    assert overlay.streets is network.streets
+
+
+@pytest.mark.parametrize('mode', ['queue', 'classic'])
+def test_scenario_deltas_match_a_full_run(mode):
+    network = base_network()
+    baseline = simulate_intersections(network, network.intersections, mode, seed=3)
+    (cars, wait, simulated), = evaluate_scenarios(network, [SCENARIO], baseline, mode, seed=3)
+
+    expected = applied_network()
+    expected_cars, expected_wait = simulate_intersections(expected, expected.intersections, mode, seed=3)
+    assert simulated == 2
+    assert cars == pytest.approx(expected_cars.sum())
+    assert wait == pytest.approx(expected_wait.sum())
+
+
+def test_only_touched_intersections_are_simulated():
+    network = base_network()
+    baseline = simulate_intersections(network, network.intersections)
+    (cars, wait, simulated), = evaluate_scenarios(network, [{'lights': {}, 'demand': {2: 0.0}}], baseline)
+
+    assert simulated == 1
+    assert cars < baseline[0].sum()
+
+
+def test_scenarios_are_ranked():
+    scenarios = [
+        {'name': 'sem mudança', 'lights': {}, 'demand': {}},
+        {'name': 'menos tráfego', 'lights': {}, 'demand': {1: 0.5, 2: 0.5, 3: 0.5}},
+        {'name': 'mais tráfego', 'lights': {}, 'demand': {1: 1.5}}
+    ]
+    result = ScenarioRunner(max_workers=1).run(base_network(), scenarios, rank_by='total_cars_passing')
+
+    rows = result['scenarios']
+    assert [row['name'] for row in rows] == ['mais tráfego', 'sem mudança', 'menos tráfego']
+    assert [row['rank'] for row in rows] == [1, 2, 3]
+    assert rows[1]['wait_change'] == 0 and rows[1]['intersections_simulated'] == 0
+
+
+def test_compare_scenarios_route(client):
+    client.post('/api/streets/bulk', json={'streets': STREETS})
+    for light in LIGHTS:
+        client.post('/api/intersection-traffic-lights', json=light.to_dict())
+
+    response = client.post('/api/compare-scenarios', json={'workers': 1, 'scenarios': [
+        {'name': 'remover', 'remove_lights': [{'intersection_id': 'intersection_1-2', 'street_id': 2}]},
+        {'name': 'ajustar', 'timings': [{'intersection_id': 'intersection_2-1', 'street_id': 2, 'green_time': 40}]}
+    ]})
+    assert response.status_code == 200
+    assert {row['name'] for row in response.json['scenarios']} == {'remover', 'ajustar'}
+
+    for scenario in ({'add_lights': [{'intersection_id': 'intersection_1-2', 'street_id': 1}]},
+                     {'timings': [{'intersection_id': 'intersection_1-3', 'street_id': 3}]},
+                     {'remove_lights': [{'intersection_id': 'intersection_7-8', 'street_id': 7}]},
+                     {'demand': {'99': 2}}):
+        response = client.post('/api/compare-scenarios', json={'scenarios': [scenario]})
+        assert response.status_code == 400, scenario
@@ -0,0 +1,88 @@
+import random
+
+import numpy as np
+import pytest
+
+from simulation_engine import MapManager
+
+# Pares de segmentos [[lat, lon], [lat, lon]] nos casos de borda
+DEGENERATE = {
+    'parallel': ([[0, 0], [0, 1]], [[1, 0], [1, 1]]),
+    'collinear_overlapping': ([[0, 0], [0, 2]], [[0, 1], [0, 3]]),
+    'collinear_disjoint': ([[0, 0], [0, 1]], [[0, 2], [0, 3]]),
+    'identical': ([[0, 0], [1, 1]], [[0, 0], [1, 1]]),
+    'zero_length': ([[0.5, 0.5], [0.5, 0.5]], [[0, 0], [1, 1]]),
+    'endpoint_touching': ([[0, 0], [0, 1]], [[0, 1], [1, 1]]),
+    't_junction': ([[0, 0], [0, 2]], [[0, 1], [1, 1]]),
+    'shared_start': ([[0, 0], [1, 0]], [[0, 0], [0, 1]]),
+    'crossing': ([[0, 0], [1, 1]], [[0, 1], [1, 0]]),
+    'near_miss': ([[0, 0], [0, 1]], [[1e-9, 1.0 + 1e-9], [1, 2]])
+}
+
+
+def assert_batch_matches_scalar(manager, first, second):
+    mask, points = manager.segment_intersections_batch(np.asarray(first, dtype=float),
+                                                       np.asarray(second, dtype=float))
+    for index, (segment1, segment2) in enumerate(zip(first, second)):
+        expected = manager.segment_intersection(*segment1, *segment2)
+        assert bool(mask[index]) == (expected is not None), (segment1, segment2)
+        if expected is not None:
+            assert points[index].tolist() == expected, (segment1, segment2)
+
+
+@pytest.mark.parametrize('case', list(DEGENERATE))
+def test_batch_matches_scalar_on_degenerate_segments(case):
+    segment1, segment2 = DEGENERATE[case]
+
+    assert_batch_matches_scalar(MapManager(), [segment1, segment2], [segment2, segment1])
+
+
+def test_batch_matches_scalar_on_random_segments():
+    rng = random.Random(7)
+    # Coordenadas numa grade grossa: muitos toques em vértices e segmentos colineares
+    def point():
+        return [-23.5 + rng.randint(0, 20) * 0.001, -46.6 + rng.randint(0, 20) * 0.001]
+
+    first = [[point(), point()] for _ in range(5000)]
+    second = [[point(), point()] for _ in range(5000)]
+
+    assert_batch_matches_scalar(MapManager(), first, second)
+
+
+def scalar_intersections(manager, coords1, coords2):
+    """Laço escalar sobre todos os pares de segmentos, como na implementação original"""
+    found = []
+    for i in range(len(coords1) - 1):
+        for j in range(len(coords2) - 1):
+            point = manager.segment_intersection(coords1[i], coords1[i + 1], coords2[j], coords2[j + 1])
+            if point:
+                found.append(point)
+    return found
+
+
+def test_find_intersections_between_streets_matches_scalar_loop():
+    rng = random.Random(11)
+    # Ruas curtas e longas: pares abaixo e acima de BATCH_MIN_PAIRS
+    streets = [[[-23.5 + rng.random() * 0.01, -46.6 + rng.random() * 0.01] for _ in range(rng.randint(2, 30))]
+               for _ in range(40)]
+    manager = MapManager()
+    found = [manager.find_intersections_between_streets(a, b) for a in streets for b in streets]
+
+    assert found == [scalar_intersections(manager, a, b) for a in streets for b in streets]
+    assert any(found)
+
+
+def test_short_street_pairs_skip_the_batch_kernel(monkeypatch):
+    manager = MapManager()
+    calls = []
+    batch = manager.segment_intersections_batch
+    monkeypatch.setattr(manager, 'segment_intersections_batch', lambda *args: calls.append(args) or batch(*args))
+    cross = [[0, 0], [1, 1]], [[0, 1], [1, 0]]
+
+    assert manager.find_intersections_between_streets(*cross) == [[0.5, 0.5]]
+    assert not calls
+
+    zigzag = [[index % 2, index * 0.1] for index in range(12)]
+    across = [[0.5, -1], [0.5, 2]] + [[0.5 + index, 2] for index in range(1, 11)]
+    manager.find_intersections_between_streets(zigzag, across)
+    assert len(calls) == 1
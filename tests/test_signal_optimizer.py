@@ -0,0 +1,66 @@
+import pytest
+
+from simulation.signal_optimizer import SignalOptimizer
+
+INTERSECTION = 'intersection_1-2'
+
+
+@pytest.fixture
+def signalized(client):
+    """Duas ruas que se cruzam, a rua 1 com quatro vezes o volume da rua 2, e semáforos ruins"""
+    client.post('/api/streets/bulk', json={'streets': [
+        {'name': 'A', 'coordinates': [[-23.55, -46.64], [-23.55, -46.62]], 'vehicles_per_hour': 1200, 'lanes': 2},
+        {'name': 'B', 'coordinates': [[-23.56, -46.63], [-23.54, -46.63]], 'vehicles_per_hour': 300, 'lanes': 1}
+    ]})
+    for street_id, green_time in ((1, 30), (2, 50)):
+        client.post('/api/intersection-traffic-lights', json={'intersection_id': INTERSECTION, 'street_id': street_id,
+                                                              'cycle_time': 90, 'green_time': green_time})
+    return client
+
+
+def test_optimized_timings_beat_the_stored_ones(signalized):
+    result = signalized.post('/api/optimize-signals', json={'workers': 1}).json
+    intersection, = result['intersections']
+
+    assert intersection['optimized']
+    assert intersection['predicted']['total_waiting_time'] < intersection['baseline']['total_waiting_time']
+    timings = {timing['street_id']: timing for timing in intersection['timings']}
+    cycle = timings[1]['cycle_time']
+    assert SignalOptimizer.MIN_CYCLE <= cycle <= SignalOptimizer.MAX_CYCLE
+    assert all(timing['cycle_time'] == cycle and timing['green_time'] >= SignalOptimizer.MIN_GREEN
+               for timing in timings.values())
+    assert sum(timing['green_time'] + SignalOptimizer.LOST_TIME for timing in timings.values()) <= cycle
+    # A rua mais carregada recebe mais verde
+    assert timings[1]['green_time'] > timings[2]['green_time']
+    assert result['overall']['wait_change'] < 0
+
+
+def test_prediction_matches_queue_simulation_with_the_new_timings(signalized):
+    intersection, = signalized.post('/api/optimize-signals', json={'workers': 1}).json['intersections']
+
+    for timing in intersection['timings']:
+        signalized.delete(f"/api/intersection-traffic-lights?intersection_id={INTERSECTION}"
+                          f"&street_id={timing['street_id']}")
+        signalized.post('/api/intersection-traffic-lights', json={'intersection_id': INTERSECTION, **timing})
+    simulated = signalized.post('/api/simulate-flow', json={'mode': 'queue'}).json
+
+    assert simulated['overall_flow']['total_waiting_time'] == pytest.approx(
+        intersection['predicted']['total_waiting_time'])
+
+
+def test_result_does_not_depend_on_the_number_of_workers(signalized, app_module):
+    network = app_module.load_network()
+
+    assert SignalOptimizer(max_workers=1).optimize(network) == SignalOptimizer(max_workers=2).optimize(network)
+
+
+def test_intersections_without_lights_are_left_alone(client):
+    client.post('/api/streets/bulk', json={'streets': [
+        {'name': 'A', 'coordinates': [[-23.55, -46.64], [-23.55, -46.62]]},
+        {'name': 'B', 'coordinates': [[-23.56, -46.63], [-23.54, -46.63]]}
+    ]})
+
+    result = client.post('/api/optimize-signals', json={'workers': 1}).json
+
+    assert all(not intersection.get('optimized') for intersection in result['intersections'])
+    assert result['overall']['wait_change'] == 0
@@ -0,0 +1,89 @@
+import pytest
+
+from models.geometry import SimplifiedGeometryCache, simplify_coordinates, zoom_tolerance
+
+# Zigue-zague de ~10 m de amplitude ao longo de ~1 km
+ZIGZAG = [[-23.55 + (0.0001 if index % 2 else 0), -46.64 + index * 0.001] for index in range(11)]
+
+
+def test_straight_line_keeps_only_its_ends():
+    line = [[-23.55, -46.64 + index * 0.001] for index in range(5)]
+    assert simplify_coordinates(line, 1e-6) == [line[0], line[-1]]
+
+
+def test_simplification_depends_on_tolerance():
+    assert simplify_coordinates(ZIGZAG, 0) == ZIGZAG
+    assert simplify_coordinates(ZIGZAG, 0.00001) == ZIGZAG
+    assert simplify_coordinates(ZIGZAG, 0.001) == [ZIGZAG[0], ZIGZAG[-1]]
+    corner = [[0.0, 0.0], [0.0, 1.0], [1.0, 1.0]]
+    assert simplify_coordinates(corner, 0.1) == corner
+
+
+def test_zoom_tolerance_halves_per_level():
+    assert zoom_tolerance(15, -23.55) == pytest.approx(zoom_tolerance(14, -23.55) / 2)
+    assert zoom_tolerance(10, 0, pixels=2) == pytest.approx(2 * zoom_tolerance(10, 0))
+
+
+def test_geometry_cache_is_a_bounded_lru():
+    cache = SimplifiedGeometryCache(max_entries=2)
+    first = cache.get(1, 12, ZIGZAG)
+    assert cache.get(1, 12, []) is first
+    cache.get(2, 12, ZIGZAG)
+    cache.get(1, 12, ZIGZAG)       # 1 passa a ser o mais recente
+    cache.get(3, 12, ZIGZAG)       # descarta 2
+    assert cache.get(1, 12, []) is first
+    assert cache.get(2, 12, []) == []
+
+
+@pytest.fixture
+def streets(client):
+    """Cinco ruas no centro e uma longe; a rua 6 é o zigue-zague"""
+    payload = [{'name': f'Centro {index}', 'coordinates': [[-23.55 + index * 0.001, -46.64],
+                                                          [-23.55 + index * 0.001, -46.63]]}
+               for index in range(4)]
+    payload.append({'name': 'Longe', 'coordinates': [[-22.90, -43.20], [-22.90, -43.19]]})
+    payload.append({'name': 'Zigue-zague', 'coordinates': ZIGZAG})
+    client.post('/api/streets/bulk', json={'streets': payload})
+    return client
+
+
+def test_bbox_returns_only_visible_streets(streets):
+    page = streets.get('/api/streets?bbox=-23.56,-46.65,-23.54,-46.62').json
+    assert [street['id'] for street in page['streets']] == [1, 2, 3, 4, 6]
+    assert page['next_cursor'] is None
+
+    streets.delete('/api/streets?id=2')
+    page = streets.get('/api/streets?bbox=-23.56,-46.65,-23.54,-46.62').json
+    assert [street['id'] for street in page['streets']] == [1, 3, 4, 6]
+
+
+def test_cursor_walks_every_page(streets):
+    seen, cursor = [], 0
+    while cursor is not None:
+        page = streets.get(f'/api/streets?limit=2&cursor={cursor}').json
+        assert len(page['streets']) <= 2
+        seen.extend(street['id'] for street in page['streets'])
+        cursor = page['next_cursor']
+    assert seen == [1, 2, 3, 4, 5, 6]
+
+
+def test_zoom_simplifies_and_drops_tiny_streets(streets):
+    detailed = streets.get('/api/streets?bbox=-23.56,-46.65,-23.54,-46.62&zoom=20').json['streets']
+    assert len(detailed[-1]['coordinates']) == len(ZIGZAG)
+
+    coarse = streets.get('/api/streets?bbox=-23.56,-46.65,-23.54,-46.62&zoom=12').json
+    assert coarse['zoom'] == 12
+    zigzag, = [street for street in coarse['streets'] if street['id'] == 6]
+    assert zigzag['coordinates'] == [ZIGZAG[0], ZIGZAG[-1]]
+
+    # No zoom 3 um pixel tem ~0,5° de longitude: nenhuma rua chega a isso
+    assert streets.get('/api/streets?bbox=-24,-47,-23,-46&zoom=3').json['streets'] == []
+
+
+def test_without_paging_arguments_returns_the_full_list(streets):
+    assert len(streets.get('/api/streets').json) == 6
+
+
+@pytest.mark.parametrize('query', ['bbox=1,2,3', 'bbox=a,b,c,d', 'zoom=23', 'zoom=x', 'limit=0', 'cursor=-1'])
+def test_invalid_page_arguments(streets, query):
+    assert streets.get(f'/api/streets?{query}').status_code == 400
@@ -0,0 +1,50 @@
+import pytest
+
+
+@pytest.mark.parametrize('query', ['', '?id=', '?id=abc'])
+def test_delete_street_requires_integer_id(client, query):
+    response = client.delete(f'/api/streets{query}')
+
+    assert response.status_code == 400
+    assert 'id' in response.json['error']
+
+
+def test_delete_street_bumps_revision(client):
+    created = client.post('/api/streets', json={'name': 'Rua A', 'coordinates': [[-23.55, -46.64], [-23.55, -46.62]]})
+    before = client.get('/api/streets').headers['ETag']
+
+    response = client.delete(f"/api/streets?id={created.json['id']}")
+
+    assert response.status_code == 200
+    assert client.get('/api/streets').json == []
+    assert client.get('/api/streets').headers['ETag'] != before
+
+
+@pytest.mark.parametrize('street', [
+    {'name': 'Rua B', 'coordinates': [[1]]},
+    {'name': 'Rua B', 'coordinates': [[-23.5, -46.6]]},
+    {'name': 'Rua B', 'coordinates': [[-23.5, -46.6], ['a', -46.5]]},
+    {'name': 'Rua B', 'coordinates': [[-23.5, -46.6], [-123.5, -46.5]]},
+    {'name': 'Rua B', 'coordinates': 'x'},
+    {'name': '', 'coordinates': [[-23.5, -46.6], [-23.4, -46.5]]},
+    {'name': 3, 'coordinates': [[-23.5, -46.6], [-23.4, -46.5]]},
+])
+def test_bulk_create_rejects_malformed_street_with_its_index(client, street):
+    valid = {'name': 'Rua A', 'coordinates': [[-23.55, -46.64], [-23.55, -46.62]]}
+
+    response = client.post('/api/streets/bulk', json={'streets': [valid, street]})
+
+    assert response.status_code == 400
+    assert response.json['error'].startswith('Rua 1:')
+    assert client.get('/api/streets').json == []
+
+
+def test_bulk_create_accepts_valid_streets(client):
+    response = client.post('/api/streets/bulk', json={'streets': [
+        {'name': 'Rua A', 'coordinates': [[-23.55, -46.64], [-23.55, -46.62]]},
+        {'name': 'Rua B', 'coordinates': [[-23.56, -46.63], [-23.54, -46.63]]}
+    ]})
+
+    assert response.status_code == 200
+    assert response.json['count'] == 2
+    assert response.json['intersections_found'] == 1
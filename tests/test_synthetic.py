@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT
+from simulation_engine import MapManager
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from synthetic import LAYOUTS, generate_network, with_traffic_attributes  # noqa: E402
+
+
+@pytest.mark.parametrize('layout', sorted(LAYOUTS))
+def test_generate_network_is_reproducible_by_seed(layout):
+    first = generate_network(layout, 60, seed=7)
+    assert generate_network(layout, 60, seed=7) == first
+    assert len(first) == 60
+    assert [street['id'] for street in first] == list(range(1, 61))
+    assert all(len(street['coordinates']) >= 2 for street in first)
+
+
+def test_random_layout_changes_with_seed():
+    assert generate_network('random', 30, seed=1) != generate_network('random', 30, seed=2)
+
+
+@pytest.mark.parametrize('layout', sorted(LAYOUTS))
+def test_layouts_produce_intersections(layout):
+    streets = generate_network(layout, 200)
+    intersections = MapManager().find_intersections(streets)
+    assert intersections
+    ids = {street['id'] for street in streets}
+    assert all(set(intersection['streets']) <= ids for intersection in intersections)
+
+
+def test_grid_counts_each_crossing_once():
+    # Malha 8 × 8 com ruas de linha inteira: 8 linhas cruzam 8 colunas
+    streets = generate_network('grid', 16, segments=8)
+    intersections = MapManager().find_intersections(streets)
+    assert len(intersections) == 64
+    assert len({tuple(sorted(intersection['streets'])) for intersection in intersections}) == 64
+
+
+def test_unknown_layout_is_rejected():
+    with pytest.raises(ValueError):
+        generate_network('hexagonal', 10)
+
+
+def test_traffic_attributes_are_reproducible():
+    streets = with_traffic_attributes(generate_network('grid', 40), seed=3)
+    again = with_traffic_attributes(generate_network('grid', 40), seed=3)
+    assert streets == again
+    for street in streets:
+        assert 1 <= street['lanes'] <= 4
+        assert 200 <= street['vehicles_per_hour'] < 1600
+        assert street['average_speed'] in (30, 40, 50, 60)